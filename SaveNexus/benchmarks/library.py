@@ -0,0 +1,183 @@
+"""
+Library scaling benchmarks
+
+Generates synthetic libraries of increasing size and times the hot paths:
+scan_saves (cold and incremental), the SFO parsers, extract_game_name,
+convert_save and the local agent's Flask endpoints via the test client.
+Results are written as JSON so runs can be compared across commits.
+
+Usage:
+    python benchmarks/library.py [--sizes 100 1000 10000 50000] [--output bench.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SAVENEXUS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(SAVENEXUS_DIR)
+sys.path.append(os.path.join(SAVENEXUS_DIR, 'gui'))
+
+from benchmarks.synthetic_library import build_library, disc_id_for
+from controller.converter import convert_save
+from core.identifier import extract_game_name
+from core.psp_sfo_parser import parse_param_sfo, read_sfo_entries
+from core.scanners import PPSSPPScanner
+
+DEFAULT_SIZES = (100, 1000, 10000)
+# Per-file benchmarks only need a sample of the library
+SAMPLE_FILES = 200
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def _result(name, size, samples, items=1):
+    return {
+        'name': name,
+        'size': size,
+        'runs': len(samples),
+        'min_ms': min(samples),
+        'median_ms': statistics.median(samples),
+        'max_ms': max(samples),
+        'per_item_us': statistics.median(samples) * 1000 / max(1, items)
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SAVENEXUS_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def bench_scan(size, savedata_dir, savestate_dir, repeat):
+    results = []
+
+    def cold():
+        PPSSPPScanner(savedata_dir, savestate_dir).scan()
+    results.append(_result('scan_saves.cold', size, _timed(cold, repeat), size))
+
+    scanner = PPSSPPScanner(savedata_dir, savestate_dir)
+    scanner.scan()
+    results.append(_result('scan_saves.incremental', size, _timed(scanner.scan, repeat), size))
+    return results
+
+def bench_parsers(size, savedata_dir, repeat):
+    folders = [os.path.join(savedata_dir, f"{disc_id_for(i)}DATA00") for i in range(min(size, SAMPLE_FILES))]
+    sfo_paths = [os.path.join(folder, 'PARAM.SFO') for folder in folders]
+    data_paths = [os.path.join(folder, 'DATA.BIN') for folder in folders]
+    sfo_blobs = []
+    for path in sfo_paths:
+        with open(path, 'rb') as f:
+            sfo_blobs.append(f.read())
+
+    def parse_files():
+        # parse_param_sfo prints; keep that out of the measurement output
+        with contextlib.redirect_stdout(io.StringIO()):
+            for path in sfo_paths:
+                parse_param_sfo(path)
+
+    def parse_bytes():
+        for blob in sfo_blobs:
+            read_sfo_entries(blob)
+
+    def identify():
+        for path in data_paths:
+            extract_game_name(path)
+
+    output_dir = tempfile.mkdtemp(prefix='savenexus-convert-')
+    def convert():
+        for path in data_paths:
+            convert_save(path, 'PSP', output_dir=output_dir)
+
+    try:
+        return [
+            _result('parse_param_sfo', size, _timed(parse_files, repeat), len(sfo_paths)),
+            _result('read_sfo_entries', size, _timed(parse_bytes, repeat), len(sfo_blobs)),
+            _result('extract_game_name', size, _timed(identify, repeat), len(data_paths)),
+            _result('convert_save', size, _timed(convert, repeat), len(data_paths)),
+        ]
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+def bench_api(size, savedata_dir, savestate_dir, repeat):
+    import local_server
+
+    agent = local_server.agent
+    agent.scanners = [PPSSPPScanner(savedata_dir, savestate_dir)]
+    agent.scan_saves()
+    agent.ready = True
+
+    client = local_server.app.test_client()
+    disc_id = disc_id_for(size // 2)
+    endpoints = [
+        ('api.status', '/api/status'),
+        ('api.games', '/api/games'),
+        ('api.game', f'/api/game/{disc_id}'),
+        ('api.icon', f'/api/icon/{disc_id}'),
+        ('api.games_batch', '/api/games/batch?ids=' + ','.join(disc_id_for(i) for i in range(min(size, 100)))),
+    ]
+
+    results = []
+    for name, url in endpoints:
+        def request():
+            response = client.get(url)
+            response.get_data()
+            response.close()
+        results.append(_result(name, size, _timed(request, repeat)))
+    return results
+
+def run(sizes=DEFAULT_SIZES, states_per_game=3, repeat=5, workdir=None):
+    results = []
+    for size in sizes:
+        root = tempfile.mkdtemp(prefix=f'savenexus-bench-{size}-', dir=workdir)
+        try:
+            started = time.perf_counter()
+            savedata_dir, savestate_dir = build_library(root, size, states_per_game)
+            print(f"[{size}] generated in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+            results += bench_scan(size, savedata_dir, savestate_dir, repeat)
+            results += bench_parsers(size, savedata_dir, repeat)
+            results += bench_api(size, savedata_dir, savestate_dir, repeat)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'timestamp': time.time(),
+        'states_per_game': states_per_game,
+        'results': results
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SaveNexus library scaling benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--states', type=int, default=3, help='Save states per game')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workdir', help='Where to generate libraries (defaults to the temp dir)')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.states, args.repeat, args.workdir)
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,180 @@
+"""
+Startup-time benchmark
+
+Measures, each in a fresh interpreter:
+  - import cost of the local agent, broken down with `python -X importtime`
+  - time until the local agent answers /api/status, and until it reports ready
+  - time until the desktop window has been shown (skipped without PyQt5)
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+SAVENEXUS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+GUI_APP_PATH = os.path.abspath(os.path.join(SAVENEXUS_DIR, '..', 'enhanced_gui_app.py'))
+
+AGENT_SNIPPET = """
+import sys
+sys.path.insert(0, 'gui')
+import local_server
+local_server.run_server({port})
+"""
+
+WINDOW_SNIPPET = """
+import importlib.util, sys, time
+sys.path.insert(0, '.')
+from PyQt5.QtWidgets import QApplication
+spec = importlib.util.spec_from_file_location('enhanced_gui_app', {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+app = QApplication(sys.argv)
+window = module.SaveTranslatorApp()
+window.show()
+app.processEvents()
+print('WINDOW_SHOWN', flush=True)
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def measure_import_time(module='gui.local_server', top=15):
+    """Run `-X importtime` on a module and return total and the slowest imports"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SAVENEXUS_DIR, capture_output=True, text=True
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append({
+            'module': name.strip(),
+            # Nested imports are indented two extra spaces per level
+            'depth': (len(name) - len(name.lstrip())) // 2,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us)
+        })
+
+    total_us = sum(i['cumulative_us'] for i in imports if i['depth'] == 0)
+    slowest = sorted(imports, key=lambda i: i['cumulative_us'], reverse=True)[:top]
+    return {
+        'module': module,
+        'ok': result.returncode == 0,
+        'total_ms': total_us / 1000,
+        'slowest': slowest
+    }
+
+def measure_agent_startup(timeout=30):
+    """Time from process spawn to first /api/status response and to ready"""
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}/api/status'
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-c', AGENT_SNIPPET.format(port=port)],
+        cwd=SAVENEXUS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    first_response = None
+    ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    status = json.loads(response.read())
+            except OSError:
+                time.sleep(0.01)
+                continue
+
+            now = time.perf_counter() - started
+            if first_response is None:
+                first_response = now
+            if status.get('ready'):
+                ready = now
+                break
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    return {
+        'first_response_ms': first_response * 1000 if first_response is not None else None,
+        'ready_ms': ready * 1000 if ready is not None else None
+    }
+
+def measure_window_startup(timeout=60):
+    """Time from process spawn until the desktop window has been shown"""
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-c', WINDOW_SNIPPET.format(path=GUI_APP_PATH)],
+        cwd=SAVENEXUS_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        for line in proc.stdout:
+            if line.strip() == 'WINDOW_SHOWN':
+                return {'window_shown_ms': (time.perf_counter() - started) * 1000}
+            if time.perf_counter() - started > timeout:
+                break
+        return {'window_shown_ms': None}
+    finally:
+        proc.kill()
+        proc.wait()
+
+def _summarize(samples):
+    values = [v for v in samples if v is not None]
+    if not values:
+        return None
+    return {
+        'min': min(values),
+        'median': statistics.median(values),
+        'max': max(values),
+        'runs': len(values)
+    }
+
+def run(runs=5):
+    results = {
+        'python': sys.version.split()[0],
+        'timestamp': time.time(),
+        'import_time': measure_import_time()
+    }
+
+    agent_runs = [measure_agent_startup() for _ in range(runs)]
+    results['agent_first_response_ms'] = _summarize([r['first_response_ms'] for r in agent_runs])
+    results['agent_ready_ms'] = _summarize([r['ready_ms'] for r in agent_runs])
+
+    try:
+        import PyQt5  # noqa: F401
+        window_runs = [measure_window_startup() for _ in range(runs)]
+        results['window_shown_ms'] = _summarize([r['window_shown_ms'] for r in window_runs])
+    except ImportError:
+        results['window_shown_ms'] = None
+
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SaveNexus startup benchmark')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,112 @@
+"""
+Synthetic PPSSPP library generator for benchmarks
+
+Builds a realistic SAVEDATA tree (valid PARAM.SFO with the usual reserved
+field sizes, a real ICON0.PNG, a DATA.BIN) plus a savestates directory
+with several .ppst files per game.
+
+Usage:
+    python benchmarks/synthetic_library.py OUTPUT_DIR --folders 1000 [--states 3]
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+import zlib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.psp_sfo_parser import build_sfo_bytes
+
+DISC_ID_PREFIXES = ("ULUS", "ULES", "NPJH", "NPUH", "NPUG", "UCUS", "UCES")
+
+# Reserved data lengths PSP games use for SAVEDATA PARAM.SFO entries
+SFO_RESERVED = {
+    "CATEGORY": 4,
+    "SAVEDATA_DETAIL": 1024,
+    "SAVEDATA_DIRECTORY": 64,
+    "SAVEDATA_FILE_LIST": 3168,
+    "SAVEDATA_PARAMS": 128,
+    "SAVEDATA_TITLE": 128,
+    "TITLE": 128,
+}
+
+WORDS = ("Tactics", "Ogre", "Monster", "Hunter", "Crisis", "Core", "Final", "Fantasy",
+         "Persona", "Portable", "Patapon", "Lumines", "Ridge", "Racer", "Wipeout", "Pulse")
+
+
+def _png(width, height, seed):
+    """Minimal valid RGB PNG with a flat colour"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    colour = bytes(((seed * 37) & 0xFF, (seed * 91) & 0xFF, (seed * 53) & 0xFF))
+    raw = b"".join(b"\x00" + colour * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+def disc_id_for(index):
+    return f"{DISC_ID_PREFIXES[index % len(DISC_ID_PREFIXES)]}{index:05d}"
+
+def build_library(root, folders, states_per_game=3, data_size=8192, state_size=4096, seed=1234):
+    """
+    Create <root>/SAVEDATA and <root>/savestates
+
+    Returns:
+        (savedata_dir, savestate_dir)
+    """
+    rng = random.Random(seed)
+    savedata_dir = os.path.join(root, "SAVEDATA")
+    savestate_dir = os.path.join(root, "savestates")
+    os.makedirs(savedata_dir, exist_ok=True)
+    os.makedirs(savestate_dir, exist_ok=True)
+
+    icon = _png(144, 80, seed)
+    data = rng.randbytes(data_size) if hasattr(rng, "randbytes") else os.urandom(data_size)
+    state = os.urandom(state_size)
+
+    for i in range(folders):
+        disc_id = disc_id_for(i)
+        folder = os.path.join(savedata_dir, f"{disc_id}DATA00")
+        os.makedirs(folder, exist_ok=True)
+
+        title = " ".join(rng.sample(WORDS, 3))
+        sfo = build_sfo_bytes({
+            "CATEGORY": "MS",
+            "PARENTAL_LEVEL": rng.randint(1, 9),
+            "SAVEDATA_DETAIL": f"Chapter {rng.randint(1, 12)}\nPlay time {rng.randint(1, 300)}h",
+            "SAVEDATA_DIRECTORY": f"{disc_id}DATA00",
+            "SAVEDATA_FILE_LIST": b"\x00" * 3168,
+            "SAVEDATA_PARAMS": b"\x00" * 128,
+            "SAVEDATA_TITLE": f"{title} Save",
+            "TITLE": title,
+        }, SFO_RESERVED)
+
+        with open(os.path.join(folder, "PARAM.SFO"), "wb") as f:
+            f.write(sfo)
+        with open(os.path.join(folder, "ICON0.PNG"), "wb") as f:
+            f.write(icon)
+        with open(os.path.join(folder, "DATA.BIN"), "wb") as f:
+            f.write(data)
+
+        for slot in range(states_per_game):
+            with open(os.path.join(savestate_dir, f"{disc_id}_1.00_{slot}.ppst"), "wb") as f:
+                f.write(state)
+
+    return savedata_dir, savestate_dir
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic PPSSPP library')
+    parser.add_argument('output')
+    parser.add_argument('--folders', type=int, default=1000)
+    parser.add_argument('--states', type=int, default=3)
+    args = parser.parse_args()
+
+    savedata_dir, savestate_dir = build_library(args.output, args.folders, args.states)
+    print(f"SAVEDATA:   {savedata_dir}")
+    print(f"savestates: {savestate_dir}")
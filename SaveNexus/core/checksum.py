@@ -1,4 +1,41 @@
 # Fix or validate checksum
 
+import hashlib
+import os
+
+CHUNK_SIZE = 1024 * 1024
+
+
 def fix_checksum(data):
-    print("Fixing checksum")
\ No newline at end of file
+    print("Fixing checksum")
+
+def hash_file(path, throttle=None, should_stop=None, chunk_size=CHUNK_SIZE):
+    """
+    SHA-256 of a file, read in chunks
+
+    throttle(n) is called after reading each chunk of n bytes (e.g. a token
+    bucket's consume). Where supported, the file's pages are dropped from the
+    OS cache afterwards so hashing doesn't evict a running game's data.
+
+    Returns:
+        Hex digest, or None if should_stop() turned true partway through
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        fd = f.fileno()
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        try:
+            while True:
+                if should_stop is not None and should_stop():
+                    return None
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                if throttle is not None:
+                    throttle(len(chunk))
+        finally:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    return digest.hexdigest()
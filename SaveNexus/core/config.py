@@ -1,24 +1,40 @@
 
-import json
 import os
 
+from core.store import open_store
+
 CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".savetranslator_config.json")
 
+# Loaded once; edits are journaled and the file rewritten atomically (see core/store.py)
+_store = open_store(CONFIG_PATH, "config")
+
 def load_config():
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, "r") as f:
-            return json.load(f)
-    return {}
+    # Callers modify and save the result, so this is always a copy
+    return _store.copy()
+
+def config_position():
+    """Changes whenever the config does; cheap enough to check on every request"""
+    return _store.position
+
+def read_config():
+    """(config, etag) for optimistic concurrency"""
+    return _store.read()
 
-def save_config(config):
-    with open(CONFIG_PATH, "w") as f:
-        json.dump(config, f, indent=4)
+def save_config(config, if_match=None):
+    return _store.replace(config, if_match)
+
+def patch_config(patch, if_match=None):
+    """Apply a JSON merge patch (null removes a key) and return the new etag"""
+    return _store.patch(patch, if_match)
 
 def get_ppsspp_path():
-    config = load_config()
-    return config.get("ppsspp_path", "")
+    return _store.get("ppsspp_path", "")
 
 def set_ppsspp_path(path):
-    config = load_config()
-    config["ppsspp_path"] = path
-    save_config(config)
+    patch_config({"ppsspp_path": path})
+
+def get_iso_dirs():
+    return list(_store.get("iso_dirs", []))
+
+def set_iso_dirs(dirs):
+    patch_config({"iso_dirs": list(dirs)})
@@ -0,0 +1,211 @@
+"""
+Random-access reader for compressed CSO / ZSO disc images
+
+Only the index pages and blocks touched by a read are loaded and
+decompressed, and recently used blocks are kept in a small LRU cache, so
+pulling a PARAM.SFO or ICON0.PNG out of a compressed image costs about as
+much as reading it from a plain ISO.
+"""
+
+import io
+import struct
+import zlib
+from collections import OrderedDict
+
+from core.schema import Schema
+
+try:
+    import lz4.block as lz4_block
+except ImportError:
+    lz4_block = None
+
+CSO_MAGIC = b"CISO"
+ZSO_MAGIC = b"ZISO"
+COMPRESSED_EXTENSIONS = (".cso", ".zso")
+
+HEADER = Schema('CsoHeader', [
+    ('magic', '4s'),
+    ('header_size', 'I'),
+    ('total_bytes', 'Q'),
+    ('block_size', 'I'),
+    ('version', 'B'),
+    ('index_shift', 'B'),
+    ('reserved', '2s'),
+])
+INDEX_FLAG = 0x80000000
+
+# What reading a damaged or unsupported image can raise
+IMAGE_ERRORS = (OSError, ValueError, RuntimeError, struct.error, zlib.error)
+if lz4_block is not None:
+    IMAGE_ERRORS += (lz4_block.LZ4BlockError,)
+INDEX_PAGE_ENTRIES = 512
+
+
+class CsoReader(io.RawIOBase):
+    """
+    Seekable, read-only file object over a CSO (v1/v2) or ZSO image
+
+    Args:
+        path: Path to the .cso / .zso file
+        cache_blocks: Maximum number of decompressed blocks kept in memory
+    """
+
+    def __init__(self, path, cache_blocks=256):
+        super().__init__()
+        self._f = open(path, "rb")
+        try:
+            header = self._f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"Not a CSO/ZSO image: {path}")
+            magic, header_size, total_bytes, block_size, version, index_shift, _ = HEADER.unpack(header)
+            if magic not in (CSO_MAGIC, ZSO_MAGIC) or not block_size:
+                raise ValueError(f"Not a CSO/ZSO image: {path}")
+        except Exception:
+            self._f.close()
+            raise
+
+        self.name = path
+        self.size = total_bytes
+        self.block_size = block_size
+        self._is_zso = magic == ZSO_MAGIC
+        self._version = version
+        self._index_shift = index_shift
+        self._index_offset = header_size if header_size >= HEADER.size else HEADER.size
+        self._num_blocks = (total_bytes + block_size - 1) // block_size
+        self._pos = 0
+
+        self._index_pages = {}
+        self._cache = OrderedDict()
+        self._cache_blocks = max(1, cache_blocks)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    # ----- io.RawIOBase interface -----
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("Negative seek position")
+        self._pos = pos
+        return pos
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        wanted = min(len(view), max(0, self.size - self._pos))
+        done = 0
+        while done < wanted:
+            block, offset = divmod(self._pos, self.block_size)
+            data = self._get_block(block)
+            chunk = min(wanted - done, len(data) - offset)
+            if chunk <= 0:
+                # Guards against spinning on a block that decoded short
+                raise ValueError(f"truncated/corrupt block {block}")
+            view[done:done + chunk] = data[offset:offset + chunk]
+            done += chunk
+            self._pos += chunk
+        return done
+
+    def close(self):
+        if not self.closed:
+            self._f.close()
+            self._cache.clear()
+            self._index_pages.clear()
+        super().close()
+
+    # ----- Block access -----
+
+    def _index_entries(self, block):
+        """Return the (start, end) raw index entries for a block"""
+        page, slot = divmod(block, INDEX_PAGE_ENTRIES)
+        entries = self._index_pages.get(page)
+        if entries is None:
+            first = page * INDEX_PAGE_ENTRIES
+            # +1 so the last block in a page can see where the next one starts
+            count = min(INDEX_PAGE_ENTRIES, self._num_blocks - first) + 1
+            self._f.seek(self._index_offset + first * 4)
+            raw = self._f.read(count * 4)
+            if len(raw) < count * 4:
+                raise ValueError(f"truncated index for block {block}")
+            entries = struct.unpack(f"<{count}I", raw)
+            self._index_pages[page] = entries
+        return entries[slot], entries[slot + 1]
+
+    def _get_block(self, block):
+        data = self._cache.get(block)
+        if data is not None:
+            self._cache.move_to_end(block)
+            self.cache_hits += 1
+            return data
+
+        self.cache_misses += 1
+        data = self._read_block(block)
+        self._cache[block] = data
+        if len(self._cache) > self._cache_blocks:
+            self._cache.popitem(last=False)
+        return data
+
+    def _read_block(self, block):
+        data = self._decode_block(block)
+        expected = min(self.block_size, self.size - block * self.block_size)
+        if len(data) != expected:
+            raise ValueError(f"truncated/corrupt block {block}")
+        return data
+
+    def _decode_block(self, block):
+        start, end = self._index_entries(block)
+        flagged = bool(start & INDEX_FLAG)
+        offset = (start & ~INDEX_FLAG) << self._index_shift
+        raw_size = ((end & ~INDEX_FLAG) << self._index_shift) - offset
+        expected = min(self.block_size, self.size - block * self.block_size)
+
+        self._f.seek(offset)
+        raw = self._f.read(raw_size)
+
+        if self._is_zso:
+            # ZSO: flag marks a stored block, everything else is LZ4
+            if flagged or raw_size >= self.block_size:
+                return raw[:expected]
+            return self._lz4(raw, expected)
+
+        if self._version >= 2:
+            # CSOv2: full-size blocks are stored, flag selects LZ4 over deflate
+            if raw_size >= self.block_size:
+                return raw[:expected]
+            if flagged:
+                return self._lz4(raw, expected)
+        elif flagged:
+            # CSOv1: flag marks a stored block
+            return raw[:expected]
+
+        return zlib.decompressobj(-15).decompress(raw, expected)
+
+    def _lz4(self, raw, expected):
+        if lz4_block is None:
+            raise RuntimeError("LZ4-compressed image blocks require the 'lz4' package")
+        return lz4_block.decompress(raw, uncompressed_size=expected)
+
+
+def is_compressed_image(path):
+    return path.lower().endswith(COMPRESSED_EXTENSIONS)
+
+def open_image(path, cache_blocks=256):
+    """Open an ISO, CSO or ZSO image as a seekable binary file object"""
+    if is_compressed_image(path):
+        return CsoReader(path, cache_blocks=cache_blocks)
+    return open(path, "rb")
@@ -0,0 +1,222 @@
+"""
+Streaming library export
+
+export_zip() builds a zip of the given games' saves, save states (with
+their screenshots) and a manifest, and yields it in chunks as it goes.
+Nothing is written to disk and memory use stays around CHUNK_SIZE
+whatever the size of the library. zipfile writes to the unseekable sink
+with a data descriptor after each entry, and entries use ZIP64 records,
+so archives over 4GB are fine.
+
+Archive layout:
+    <emulator>/saves/<save folder or file>
+    <emulator>/states/<state or screenshot>
+    manifest.json
+
+Entries that are already compressed (images, zstd/snappy save states,
+encrypted SAVEDATA) are stored as they are; recompressing them would
+only cost CPU. Everything else is deflated, unless a sample of it
+doesn't shrink.
+"""
+
+import json
+import os
+import time
+import zipfile
+import zlib
+
+from core.savestate import find_screenshot
+
+CHUNK_SIZE = 1024 * 1024
+
+STORED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.pmf', '.at3', '.ppst',
+    '.zip', '.7z', '.gz', '.zst', '.cso', '.zso'
+}
+# Deflate a file only if its first SAMPLE_SIZE bytes shrink below this ratio at level 1
+SAMPLE_SIZE = 64 * 1024
+MIN_RATIO = 0.9
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class ExportError(Exception):
+    """A file failed part way through its entry; the archive can't be finished"""
+
+
+class _Sink:
+    """Write-only file object that holds what ZipFile writes until it is drained"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compression(path, head):
+    if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    sample = head[:SAMPLE_SIZE]
+    if sample and len(zlib.compress(sample, 1)) > len(sample) * MIN_RATIO:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+def _save_files(game):
+    """(path, name inside the game's saves folder) for a save folder or a single save file"""
+    save_path = game['save_path']
+    if not os.path.isdir(save_path):
+        return [(save_path, os.path.basename(save_path))]
+    files = []
+    parent = os.path.dirname(save_path)
+    for root, dirs, names in os.walk(save_path):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            files.append((path, os.path.relpath(path, parent).replace(os.sep, '/')))
+    return files
+
+def plan_export(games):
+    """
+    Files to export
+
+    Returns:
+        (entries, manifest games): entries are (source path, archive name),
+        each source file listed once
+    """
+    entries = []
+    sources = set()
+    names = set()
+    manifest = []
+
+    def add(path, name):
+        if path in sources:
+            return None
+        # Different games can have same-named files (e.g. mGBA saves from two folders)
+        stem, ext = os.path.splitext(name)
+        unique = name
+        n = 2
+        while unique in names:
+            unique = f"{stem}~{n}{ext}"
+            n += 1
+        sources.add(path)
+        names.add(unique)
+        entries.append((path, unique))
+        return unique
+
+    for game in games:
+        emulator = game['emulator']
+        files = []
+        for path, name in _save_files(game):
+            files.append(add(path, f"{emulator}/saves/{name}"))
+        for state in game.get('save_states', ()):
+            files.append(add(state['path'], f"{emulator}/states/{os.path.basename(state['path'])}"))
+            screenshot = find_screenshot(state['path'])
+            if screenshot:
+                files.append(add(screenshot, f"{emulator}/states/{os.path.basename(screenshot)}"))
+        manifest.append({
+            'disc_id': game['disc_id'],
+            'title': game['title'],
+            'save_title': game.get('save_title', ''),
+            'emulator': emulator,
+            'platform': game.get('platform'),
+            'files': [name for name in files if name]
+        })
+    return entries, manifest
+
+def _write_entry(archive, sink, path, name, chunk_size):
+    """Add one file to the archive, yielding what's ready after each chunk"""
+    with open(path, "rb") as f:
+        fd = f.fileno()
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        try:
+            info = zipfile.ZipInfo.from_file(path, name, strict_timestamps=False)
+            chunk = f.read(chunk_size)
+            info.compress_type = _compression(path, chunk)
+            # Up to here the file can still be skipped; once its entry is
+            # started, a failure would leave a silently truncated save behind
+            written = 0
+            with archive.open(info, "w", force_zip64=True) as entry:
+                try:
+                    while chunk:
+                        entry.write(chunk)
+                        written += len(chunk)
+                        yield sink.drain()
+                        chunk = f.read(chunk_size)
+                except OSError as e:
+                    raise ExportError(f"Reading {path} failed after {written} bytes: {e}") from e
+                if written < info.file_size:
+                    raise ExportError(f"{path} shrank from {info.file_size} to {written} bytes while exporting")
+        finally:
+            # Don't let a big export push running games out of the page cache
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    yield sink.drain()
+
+def export_zip(games, chunk_size=CHUNK_SIZE, stats=None):
+    """
+    Stream a zip of the games' saves and states
+
+    Files that disappear or can't be opened are left out and listed under
+    "skipped" in the manifest. A file that fails or shrinks part way
+    through raises ExportError instead, leaving the archive unfinished
+    (no central directory) rather than holding a truncated save.
+
+    Args:
+        games: Library game records
+        stats: Optional dict filled in with files, bytes (read) and skipped counts
+
+    Yields:
+        Chunks of the archive (bytes)
+    """
+    if stats is None:
+        stats = {}
+    stats.update(files=0, bytes=0, skipped=0)
+    entries, manifest = plan_export(games)
+
+    sink = _Sink()
+    skipped = []
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for path, name in entries:
+            try:
+                for data in _write_entry(archive, sink, path, name, chunk_size):
+                    if data:
+                        yield data
+            except OSError as e:
+                print(f"Error exporting {path}: {e}")
+                skipped.append(name)
+                stats['skipped'] += 1
+                continue
+            stats['files'] += 1
+            stats['bytes'] += archive.getinfo(name).file_size
+
+        if skipped:
+            missing = set(skipped)
+            for game in manifest:
+                game['files'] = [name for name in game['files'] if name not in missing]
+        archive.writestr(MANIFEST_NAME, json.dumps({
+            'exported': time.time(),
+            'games': manifest,
+            'skipped': skipped
+        }, indent=4))
+    yield sink.drain()
+
+def write_export(games, out, chunk_size=CHUNK_SIZE):
+    """Write an export to a binary file object; returns export_zip's stats plus archive_bytes"""
+    stats = {}
+    written = 0
+    for data in export_zip(games, chunk_size, stats):
+        out.write(data)
+        written += len(data)
+    stats['archive_bytes'] = written
+    return stats
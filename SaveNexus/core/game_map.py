@@ -1,16 +1,27 @@
-import json
 import os
 
+from core.store import open_store
+
 # Adjust path to where your game_map.json is stored
 GAME_MAP_PATH = os.path.join(os.path.dirname(__file__), "..", "game_map.json")
 GAME_MAP_PATH = os.path.abspath(GAME_MAP_PATH)
 
+# Loaded once; edits are journaled and the file rewritten atomically (see core/store.py)
+_store = open_store(GAME_MAP_PATH, "game_map")
+
 def load_game_map():
-    if os.path.exists(GAME_MAP_PATH):
-        with open(GAME_MAP_PATH, "r") as f:
-            return json.load(f)
-    return {}
+    return _store.copy()
+
+def read_game_map():
+    """(game map, etag) for optimistic concurrency"""
+    return _store.read()
 
 def get_iso_for_disc_id(disc_id):
-    game_map = load_game_map()
-    return game_map.get(disc_id)
+    return _store.get(disc_id)
+
+def save_game_map(game_map, if_match=None):
+    return _store.replace(game_map, if_match)
+
+def patch_game_map(patch, if_match=None):
+    """Apply a JSON merge patch (null removes a disc ID) and return the new etag"""
+    return _store.patch(patch, if_match)
@@ -0,0 +1,230 @@
+"""
+ISO library discovery
+
+Reads just enough of each ISO9660 image, plain or CSO/ZSO compressed (the
+primary volume descriptor and a handful of directory records), to find the
+disc ID, then folds the results into game_map.json. Results are cached by path, size and mtime so rescans
+of an unchanged collection only cost a stat() per image.
+"""
+
+import json
+import os
+
+from core.config import get_iso_dirs
+from core.cso_reader import COMPRESSED_EXTENSIONS, IMAGE_ERRORS, open_image
+from core.game_map import load_game_map, patch_game_map
+from core.psp_sfo_parser import read_sfo_entries
+from core.schema import Schema
+
+ISO_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".savetranslator_iso_cache.json")
+
+ISO_EXTENSIONS = (".iso",) + COMPRESSED_EXTENSIONS
+
+SECTOR_SIZE = 2048
+PVD_SECTOR = 16
+
+# ISO9660 stores these both-endian; only the little-endian halves are used
+DIRECTORY_RECORD = Schema('IsoDirectoryRecord', [
+    ('length', 'B'),
+    ('ext_attr_length', 'B'),
+    ('extent', 'I'),
+    ('extent_be', '4s'),
+    ('size', 'I'),
+    ('size_be', '4s'),
+    ('recorded', '7s'),
+    ('flags', 'B'),
+    ('unit_size', 'B'),
+    ('interleave_gap', 'B'),
+    ('volume_sequence', 'I'),
+    ('name_length', 'B'),
+])
+ROOT_RECORD_OFFSET = 156
+
+# Anything bigger than this is not a PARAM.SFO / UMD_DATA.BIN we want to read
+MAX_METADATA_SIZE = 64 * 1024
+
+
+def _read_at(f, offset, size):
+    f.seek(offset)
+    return f.read(size)
+
+def _iter_directory(f, lba, length):
+    """Yield (name, lba, size, is_dir) for each record in a directory extent"""
+    data = _read_at(f, lba * SECTOR_SIZE, length)
+    pos = 0
+    while pos < len(data):
+        rec_len = data[pos]
+        if rec_len == 0:
+            # Records never span sectors; skip the padding to the next one
+            pos = (pos // SECTOR_SIZE + 1) * SECTOR_SIZE
+            continue
+        _, _, extent, _, size, _, _, flags, _, _, _, name_len = DIRECTORY_RECORD.unpack_from(data, pos)
+        name = data[pos + DIRECTORY_RECORD.size:pos + DIRECTORY_RECORD.size + name_len]
+        pos += rec_len
+
+        if name in (b"\x00", b"\x01"):  # "." and ".."
+            continue
+        name = name.decode("ascii", errors="ignore").split(";")[0].upper()
+        yield name, extent, size, bool(flags & 0x02)
+
+def _find_record(f, lba, length, path):
+    """Walk a slash-separated path from a directory extent"""
+    parts = path.upper().split("/")
+    for i, part in enumerate(parts):
+        for name, extent, size, is_dir in _iter_directory(f, lba, length):
+            if name == part:
+                if i == len(parts) - 1:
+                    return extent, size
+                if not is_dir:
+                    return None
+                lba, length = extent, size
+                break
+        else:
+            return None
+    return None
+
+def _read_file(f, root, path):
+    record = _find_record(f, root[0], root[1], path)
+    if not record or record[1] > MAX_METADATA_SIZE:
+        return None
+    extent, size = record
+    return _read_at(f, extent * SECTOR_SIZE, size)
+
+def read_disc_id(f):
+    """
+    Read the disc ID from an open ISO9660 image
+
+    Only the volume descriptor and the directory records on the way to
+    UMD_DATA.BIN (or PSP_GAME/PARAM.SFO as a fallback) are read.
+
+    Args:
+        f: Seekable binary file object positioned anywhere
+
+    Returns:
+        Disc ID such as "ULUS10565", or None if it cannot be determined
+    """
+    pvd = _read_at(f, PVD_SECTOR * SECTOR_SIZE, SECTOR_SIZE)
+    if len(pvd) < 190 or pvd[0] != 1 or pvd[1:6] != b"CD001":
+        return None
+
+    root = DIRECTORY_RECORD.view(pvd, ROOT_RECORD_OFFSET)
+    root = (root.extent, root.size)
+
+    # UMD_DATA.BIN starts with e.g. "ULUS-10565|..."
+    umd_data = _read_file(f, root, "UMD_DATA.BIN")
+    if umd_data:
+        disc_id = umd_data.split(b"|")[0].decode("ascii", errors="ignore")
+        disc_id = disc_id.replace("-", "").strip().upper()
+        if disc_id:
+            return disc_id
+
+    sfo = _read_file(f, root, "PSP_GAME/PARAM.SFO")
+    if sfo:
+        entries = read_sfo_entries(sfo) or {}
+        disc_id = entries.get("DISC_ID")
+        if disc_id:
+            return disc_id.upper()
+
+    return None
+
+def read_iso_disc_id(iso_path):
+    """Open an ISO/CSO/ZSO image and return its disc ID (None on failure, so one bad image doesn't stop a scan)"""
+    try:
+        with open_image(iso_path) as f:
+            return read_disc_id(f)
+    except IMAGE_ERRORS as e:
+        print(f"Error reading {iso_path}: {e}")
+        return None
+
+def _load_cache():
+    if os.path.exists(ISO_CACHE_PATH):
+        try:
+            with open(ISO_CACHE_PATH, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+def _save_cache(cache):
+    with open(ISO_CACHE_PATH, "w") as f:
+        json.dump(cache, f, indent=4)
+
+def _iter_images(iso_dirs):
+    for root_dir in iso_dirs:
+        if not os.path.isdir(root_dir):
+            continue
+        stack = [root_dir]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(ISO_EXTENSIONS):
+                    yield entry
+
+def scan_iso_dirs(iso_dirs=None):
+    """
+    Find disc IDs for every image under the given directories
+
+    Args:
+        iso_dirs: Directories to search recursively (defaults to the configured ones)
+
+    Returns:
+        Dict mapping disc ID -> image path
+    """
+    if iso_dirs is None:
+        iso_dirs = get_iso_dirs()
+
+    cache = _load_cache()
+    fresh_cache = {}
+    found = {}
+
+    for entry in _iter_images(iso_dirs):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+
+        path = os.path.abspath(entry.path)
+        cached = cache.get(path)
+        if cached and cached["size"] == st.st_size and cached["mtime"] == st.st_mtime:
+            disc_id = cached["disc_id"]
+        else:
+            disc_id = read_iso_disc_id(path)
+
+        fresh_cache[path] = {"size": st.st_size, "mtime": st.st_mtime, "disc_id": disc_id}
+        if disc_id and disc_id not in found:
+            found[disc_id] = path
+
+    if fresh_cache != cache:
+        _save_cache(fresh_cache)
+
+    return found
+
+def update_game_map(iso_dirs=None):
+    """
+    Add discovered images to game_map.json
+
+    Hand-made entries are kept as long as the image they point at still
+    exists; stale or missing entries are filled in from the scan.
+
+    Returns:
+        Number of game map entries added or changed
+    """
+    discovered = scan_iso_dirs(iso_dirs)
+    game_map = load_game_map()
+
+    changes = {}
+    for disc_id, path in discovered.items():
+        current = game_map.get(disc_id)
+        if current and os.path.exists(current):
+            continue
+        if current != path:
+            changes[disc_id] = path
+
+    if changes:
+        patch_game_map(changes)
+    return len(changes)
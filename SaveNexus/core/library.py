@@ -0,0 +1,298 @@
+"""
+Library records, snapshots and scan coordination
+
+Scanners return GameRecord / SaveStateRecord objects: slotted records with
+interned IDs and paths, which take a fraction of the memory of the dicts
+they replace and share strings between scans. They can still be read like
+those dicts (game['disc_id'], game.get('icon_path'), dict(game)).
+
+The agent serves the library from a LibrarySnapshot: a version-numbered,
+read-only view of one scan with its lookup indexes. A scan builds a new
+snapshot and publishes it with a single reference assignment, so request
+handlers never see a half-updated library and never wait for a scan. The
+JSON encoding of a snapshot's games is built once and reused until the
+version changes.
+
+ScanCoordinator runs scans one at a time on its own thread. Concurrent
+requests for a scan share the one in flight; a caller that needs results
+newer than its request (fresh=True) shares the next queued scan instead.
+
+SnapshotHistory keeps the last few versions so a client holding version N
+can be sent only what changed since (library_delta). Versions restart with
+the process, so clients also send back the EPOCH they were served.
+"""
+
+import copy
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+# Identifies this process's version numbering
+EPOCH = os.urandom(4).hex()
+
+HISTORY_SIZE = 8
+
+
+def _intern(value):
+    return sys.intern(value) if value is not None else None
+
+
+class _Record:
+    """Slotted record that can also be read like a dict"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SaveStateRecord(_Record):
+    """One save state file"""
+
+    __slots__ = ('filename', 'path', 'modified', 'size')
+
+    def __init__(self, filename, path, modified, size):
+        self.filename = sys.intern(filename)
+        self.path = sys.intern(path)
+        self.modified = modified
+        self.size = size
+
+
+class GameRecord(_Record):
+    """One game's save (a PSP SAVEDATA folder or a battery save file) and its save states"""
+
+    __slots__ = (
+        'disc_id', 'title', 'save_title', 'icon_path', 'save_path',
+        'emulator', 'platform', 'has_iso', 'save_states'
+    )
+
+    def __init__(self, disc_id, title, save_title, icon_path, save_path,
+                 emulator, platform, has_iso=False, save_states=()):
+        self.disc_id = sys.intern(disc_id)
+        self.title = title
+        self.save_title = save_title
+        self.icon_path = _intern(icon_path)
+        self.save_path = sys.intern(save_path)
+        self.emulator = sys.intern(emulator)
+        self.platform = _intern(platform)
+        self.has_iso = has_iso
+        self.save_states = tuple(save_states)
+
+    def to_dict(self):
+        game = _Record.to_dict(self)
+        game['save_states'] = [state.to_dict() for state in self.save_states]
+        return game
+
+
+class LibrarySnapshot:
+    """The library as of one scan; never modified after creation"""
+
+    def __init__(self, games=(), version=0):
+        self.games = tuple(games)
+        self.version = version
+        self.created = time.time()
+        self._games_json = None
+
+        by_id = {}
+        by_folder = {}
+        for game in self.games:
+            # Several emulators may share an ID; the first scanner's game wins
+            by_id.setdefault(game['disc_id'], game)
+            by_folder.setdefault(save_folder(game['save_path']), game)
+        self.by_id = by_id
+        self.by_folder = by_folder
+
+    def __len__(self):
+        return len(self.games)
+
+    def age(self):
+        return time.time() - self.created
+
+    def rescanned(self):
+        """This snapshot as of now, for a rescan that found nothing new (keeps the cached JSON)"""
+        snapshot = copy.copy(self)
+        snapshot.created = time.time()
+        return snapshot
+
+    def games_json(self):
+        """The games as an encoded JSON array, built on first use"""
+        encoded = self._games_json
+        if encoded is None:
+            encoded = json.dumps(
+                [game.to_dict() if isinstance(game, _Record) else game for game in self.games],
+                separators=(',', ':')
+            ).encode('utf-8')
+            self._games_json = encoded
+        return encoded
+
+
+def save_folder(save_path):
+    """
+    The key clients use for a save: its folder (e.g. ULUS10565DATA00) or
+    battery save file name. Agents can run on Windows, so both separators
+    count.
+    """
+    return save_path.replace('\\', '/').rstrip('/').rsplit('/', 1)[-1]
+
+def game_identity(game):
+    """Stable key of a game entry across scans (machine-qualified when merged from several agents)"""
+    machine = game.get('machine')
+    folder = save_folder(game['save_path'])
+    return f"{machine}/{folder}" if machine else folder
+
+def library_delta(old_games, new_games):
+    """
+    What changed between two game lists
+
+    Returns:
+        {'changed': [new or modified games], 'removed': [identities]}, plus
+        'order' (every identity, in order) when games were added, removed
+        or reordered
+    """
+    old = {game_identity(game): game for game in old_games}
+    changed = []
+    order = []
+    for game in new_games:
+        key = game_identity(game)
+        order.append(key)
+        if old.get(key) != game:
+            changed.append(game)
+
+    current = set(order)
+    delta = {
+        'changed': changed,
+        'removed': [key for key in old if key not in current]
+    }
+    if order != list(old):
+        delta['order'] = order
+    return delta
+
+
+class SnapshotHistory:
+    """The game lists of the last few library versions"""
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.size = size
+        self._versions = OrderedDict()  # version -> games
+        self._lock = Lock()
+
+    def add(self, version, games):
+        with self._lock:
+            self._versions[version] = games
+            self._versions.move_to_end(version)
+            while len(self._versions) > self.size:
+                self._versions.popitem(last=False)
+
+    def delta(self, since, epoch, version, games):
+        """
+        library_delta from version since to games, or None if the client
+        must be sent everything (unknown version or another process's epoch)
+        """
+        if epoch != EPOCH:
+            return None
+        try:
+            since = int(since)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            old_games = self._versions.get(since)
+        if old_games is None:
+            return None
+
+        delta = library_delta(old_games, games) if since != version else {'changed': [], 'removed': []}
+        delta.update(delta=True, since=since, version=version, epoch=EPOCH)
+        return delta
+
+
+def _encode_record(value):
+    if isinstance(value, _Record):
+        return value.to_dict()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def encode_library(snapshot, fields):
+    """
+    JSON body for a library response: fields plus the snapshot's games
+
+    The games come from the snapshot's cached encoding, so only the small
+    per-request fields are serialized. A delta (fields['delta']) is
+    encoded on its own.
+    """
+    body = json.dumps(fields, separators=(',', ':'), default=_encode_record)
+    if fields.get('delta'):
+        return body.encode('utf-8')
+    if body == '{}':
+        return b'{"games":' + snapshot.games_json() + b'}'
+    return b'{"games":' + snapshot.games_json() + b',' + body[1:].encode('utf-8')
+
+
+class ScanCoordinator:
+    """Single-flight execution of a scan function"""
+
+    def __init__(self, scan):
+        self._scan = scan
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='library-scan')
+        self._lock = Lock()
+        self._latest = None  # (future, started event) of the last scan submitted
+
+    def request(self, fresh=False):
+        """
+        Future for a scan
+
+        Joins the scan in flight, or with fresh=True, a scan that has not
+        started yet (queuing one if needed).
+        """
+        with self._lock:
+            if self._latest is not None:
+                future, started = self._latest
+                if not future.done() and not (fresh and started.is_set()):
+                    return future
+
+            started = Event()
+            future = self._executor.submit(self._run, started)
+            self._latest = (future, started)
+            return future
+
+    def _run(self, started):
+        started.set()
+        return self._scan()
+
+    @property
+    def in_flight(self):
+        latest = self._latest
+        return latest is not None and not latest[0].done()
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn on the scan thread, after any scans already queued"""
+        return self._executor.submit(fn, *args, **kwargs)
@@ -1,4 +1,271 @@
-# Edit save file metadata
+"""
+PARAM.SFO metadata editor
 
-def edit_metadata(data):
-    print("Editing metadata")
\ No newline at end of file
+edit_metadata() changes SFO values (TITLE, SAVEDATA_TITLE, PARENTAL_LEVEL,
+...) in a save's PARAM.SFO. Each value has a reserved length in the data
+table; a new value of the same type that fits is written in place through
+mmap, touching only the value bytes and its length field. Adding or
+removing keys, changing a type, or growing a value past its reserved
+length rebuilds the whole file (atomically), keeping every other key's
+reservation.
+
+apply_batch() applies one set of changes to many files as a transaction.
+Every edit is planned (and validated) before anything is written, the
+bytes each edit will overwrite are saved to an undo journal, and any
+failure rolls every file back. A journal left behind by a crash is rolled
+back by recover_batch(), which apply_batch() runs first.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+from core.psp_sfo_parser import (
+    SFO_HEADER, SFO_INDEX_ENTRY, SFO_MAGIC, build_sfo_bytes, encode_sfo_value
+)
+from core.store import atomic_write_bytes
+
+UNDO_JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".savetranslator_sfo_undo.journal")
+
+# SFO integers are uint32
+MAX_INT_VALUE = 0xFFFFFFFF
+
+
+class MetadataEditError(Exception):
+    pass
+
+
+def read_sfo_index(buf):
+    """
+    Locate every entry of an SFO held in a bytes-like buffer
+
+    Returns:
+        dict of key -> {'type', 'length', 'reserved', 'index_offset', 'data_offset'}
+    """
+    if len(buf) < SFO_HEADER.size:
+        raise MetadataEditError("File is too short to be a PARAM.SFO")
+    magic, _, key_table_start, data_table_start, entry_count = SFO_HEADER.unpack_from(buf, 0)
+    if magic != SFO_MAGIC:
+        raise MetadataEditError("Not a PARAM.SFO (bad magic)")
+
+    fields = {}
+    for i in range(entry_count):
+        index_offset = SFO_HEADER.size + i * SFO_INDEX_ENTRY.size
+        if index_offset + SFO_INDEX_ENTRY.size > len(buf):
+            raise MetadataEditError("SFO index runs past the end of the file")
+        key_offset, dtype, length, reserved, data_offset = SFO_INDEX_ENTRY.unpack_from(buf, index_offset)
+
+        key_start = key_table_start + key_offset
+        key_end = buf.find(b"\x00", key_start)
+        if key_end == -1:
+            raise MetadataEditError("Unterminated SFO key")
+        data_start = data_table_start + data_offset
+        if data_start + reserved > len(buf) or length > reserved:
+            raise MetadataEditError("SFO value runs past the end of the file")
+
+        fields[bytes(buf[key_start:key_end]).decode("utf-8", errors="replace")] = {
+            'type': dtype,
+            'length': length,
+            'reserved': reserved,
+            'index_offset': index_offset,
+            'data_offset': data_start
+        }
+    return fields
+
+def check_changes(changes):
+    """Raise MetadataEditError unless every value is None, a str, bytes or an int that fits a uint32"""
+    for key, value in changes.items():
+        if value is None or isinstance(value, (str, bytes)):
+            continue
+        # bool is an int subclass, but True would quietly be stored as 1
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise MetadataEditError(f"Unsupported value for {key}: {type(value).__name__}")
+        if not 0 <= value <= MAX_INT_VALUE:
+            raise MetadataEditError(f"Value for {key} is out of range (0 to {MAX_INT_VALUE})")
+
+def plan_edit(buf, changes):
+    """
+    Work out how to apply changes (key -> str/int/bytes, or None to remove) to an SFO
+
+    Returns:
+        (writes, rebuilt): in-place (offset, bytes) writes, or the complete
+        new file contents when the tables have to be rebuilt (writes is then empty)
+    """
+    check_changes(changes)
+    fields = read_sfo_index(buf)
+    writes = []
+    rebuild = False
+    for key, value in changes.items():
+        field = fields.get(key)
+        if value is None:
+            rebuild = rebuild or field is not None
+            continue
+        dtype, raw = encode_sfo_value(value)
+        if field is None or field['type'] != dtype or len(raw) > field['reserved']:
+            rebuild = True
+            continue
+
+        start = field['data_offset']
+        # Clear what's left of a longer old value; the rest of the reservation is already zero
+        new = raw + b"\x00" * max(0, field['length'] - len(raw))
+        if bytes(buf[start:start + len(new)]) != new:
+            writes.append((start, new))
+        if len(raw) != field['length']:
+            writes.append((field['index_offset'] + 4, struct.pack("<I", len(raw))))
+
+    if not rebuild:
+        return writes, None
+
+    # Untouched keys are copied byte for byte with their own type, even
+    # odd ones (an int that isn't 4 bytes, a string with bytes after the NUL)
+    entries = {}
+    for key, field in fields.items():
+        raw = bytes(buf[field['data_offset']:field['data_offset'] + field['length']])
+        entries[key] = (field['type'], raw)
+    for key, value in changes.items():
+        if value is None:
+            entries.pop(key, None)
+        else:
+            entries[key] = value
+    reserved = {key: field['reserved'] for key, field in fields.items()}
+    return [], build_sfo_bytes(entries, reserved)
+
+def _write_in_place(path, writes):
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), 0) as buf:
+        for offset, data in writes:
+            buf[offset:offset + len(data)] = data
+        buf.flush()
+
+def _plan_file(path, changes):
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                writes, rebuilt = plan_edit(buf, changes)
+                if rebuilt is not None:
+                    undo = [(None, buf[:])]
+                else:
+                    undo = [(offset, buf[offset:offset + len(data)]) for offset, data in writes]
+        except ValueError:
+            raise MetadataEditError("Empty file") from None
+    return writes, rebuilt, undo
+
+def _apply(path, writes, rebuilt):
+    if rebuilt is not None:
+        atomic_write_bytes(path, rebuilt)
+    elif writes:
+        _write_in_place(path, writes)
+
+def _restore(path, undo):
+    """Put back the bytes an edit overwrote; offset None means the whole file"""
+    if undo and undo[0][0] is None:
+        atomic_write_bytes(path, undo[0][1])
+    else:
+        # Undo the writes in reverse, in case two of them overlap
+        _write_in_place(path, list(reversed(undo)))
+
+def edit_metadata(path, changes):
+    """
+    Change SFO values in one PARAM.SFO
+
+    Returns:
+        'in_place', 'rebuilt' or 'unchanged'
+    """
+    writes, rebuilt, _ = _plan_file(path, changes)
+    _apply(path, writes, rebuilt)
+    if rebuilt is not None:
+        return 'rebuilt'
+    return 'in_place' if writes else 'unchanged'
+
+# ===== Transactional batches =====
+
+def _write_journal(journal_path, plans):
+    with open(journal_path, "w") as f:
+        for path, (_, _, undo) in plans.items():
+            records = [[offset, data.hex()] for offset, data in undo]
+            f.write(json.dumps({"path": path, "undo": records}) + "\n")
+        # Without this line the batch never started, so there's nothing to undo
+        f.write(json.dumps({"complete": True}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def recover_batch(journal_path=UNDO_JOURNAL_PATH):
+    """
+    Roll back a batch that was interrupted by a crash
+
+    Returns:
+        Paths restored
+    """
+    try:
+        with open(journal_path, "r") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+    restored = []
+    records = []
+    try:
+        records = [json.loads(line) for line in lines]
+    except ValueError:
+        records = []  # Torn while being written: nothing had been applied yet
+    if records and records[-1].get("complete"):
+        for record in records[:-1]:
+            undo = [(offset, bytes.fromhex(data)) for offset, data in record["undo"]]
+            try:
+                _restore(record["path"], undo)
+                restored.append(record["path"])
+            except OSError as e:
+                print(f"Error restoring {record['path']}: {e}")
+    os.remove(journal_path)
+    return restored
+
+def apply_batch(paths, changes, journal_path=UNDO_JOURNAL_PATH):
+    """
+    Apply the same changes to many PARAM.SFO files, all or nothing
+
+    Returns:
+        {'in_place': n, 'rebuilt': n, 'unchanged': n}
+
+    Raises:
+        MetadataEditError if any file can't be edited; files already
+        edited are rolled back first
+    """
+    recover_batch(journal_path)
+
+    plans = {}
+    for path in paths:
+        try:
+            plans[path] = _plan_file(path, changes)
+        except (OSError, MetadataEditError) as e:
+            raise MetadataEditError(f"{path}: {e}") from None
+
+    summary = {'in_place': 0, 'rebuilt': 0, 'unchanged': 0}
+    pending = {path: plan for path, plan in plans.items() if plan[0] or plan[1] is not None}
+    summary['unchanged'] = len(plans) - len(pending)
+    if not pending:
+        return summary
+
+    _write_journal(journal_path, pending)
+    touched = []
+    try:
+        for path, (writes, rebuilt, _) in pending.items():
+            # Before writing: a failed in-place write can leave the file half edited
+            touched.append(path)
+            _apply(path, writes, rebuilt)
+            summary['rebuilt' if rebuilt is not None else 'in_place'] += 1
+    except (OSError, ValueError) as e:
+        failed = False
+        for done in reversed(touched):
+            try:
+                _restore(done, pending[done][2])
+            except OSError as restore_error:
+                print(f"Error restoring {done}: {restore_error}")
+                failed = True
+        if failed:
+            # Keep the journal so recover_batch() tries again next time
+            raise MetadataEditError(f"{path}: {e}; rollback incomplete") from None
+        os.remove(journal_path)
+        raise MetadataEditError(f"{path}: {e}; rolled back {len(touched)} file(s)") from None
+
+    os.remove(journal_path)
+    return summary
@@ -1,4 +1,148 @@
-# Parse save file contents
+"""
+Parse save file contents
+
+parse_save() picks a format by file name and (where there is one) magic
+number and returns what it could read:
+
+    {'format': 'psp_param_sfo', 'platform': 'PSP', 'size': ..., 'fields': {...}}
+
+A format is a name, a match(name, head) test over the file name and its
+first HEAD_SIZE bytes, how many bytes of the file it needs (None for all
+of it) and a parse(buf, size, path) function over a memoryview of those bytes.
+Layouts are core.schema Schemas, compiled once when their module loads.
+New formats are added with register_format().
+"""
+
+import os
+
+from core.psp_sfo_parser import SFO_HEADER, SFO_MAGIC, read_sfo_entries
+from core.savedata_crypto import HEADER_SIZE, is_encrypted_file, read_file_list
+from core.savestate import CHUNK_HEADER, COMPRESSION_TYPES, HEADER_WINDOW, REVISION_TITLE, TITLE_SIZE
+from core.schema import RAW, ParseError, Schema, c_string
+
+HEAD_SIZE = 16
+
+SAVEDATA_HEADER = Schema('SavedataHeader', [('seed', f'{HEADER_SIZE}s', RAW)])
+STATE_TITLE = Schema('PpstTitle', [('title', f'{TITLE_SIZE}s', c_string)])
+
+# GBA cartridges use one of a few backup chips, told apart by the save size
+GBA_SAVE_TYPES = {
+    512: 'EEPROM 4Kbit',
+    8 * 1024: 'EEPROM 64Kbit',
+    32 * 1024: 'SRAM',
+    64 * 1024: 'Flash 512Kbit',
+    128 * 1024: 'Flash 1Mbit'
+}
+
+FORMATS = []
+
+
+def register_format(name, match, parse, window=None):
+    """
+    Add a save format; formats registered later are tried first
+
+    Args:
+        name: Reported as 'format'
+        match: match(lowercase file name, first HEAD_SIZE bytes) -> bool
+        parse: parse(memoryview, file size, path) -> dict of extra result keys
+        window: Bytes of the file parse needs, or None for the whole file
+    """
+    FORMATS.insert(0, (name, match, parse, window))
+
+def _read(path, size):
+    with open(path, "rb") as f:
+        return f.read() if size is None else f.read(size)
 
 def parse_save(file_path):
-    print(f"Parsing save file: {file_path}")
\ No newline at end of file
+    """
+    Identify and parse a save file
+
+    Returns:
+        dict with 'format', 'size' and the format's fields, or None if the
+        file can't be read or no format matches
+    """
+    try:
+        size = os.path.getsize(file_path)
+        head = _read(file_path, HEAD_SIZE)
+    except OSError as e:
+        print(f"Error reading save file {file_path}: {e}")
+        return None
+
+    name = os.path.basename(file_path).lower()
+    for format_name, match, parse, window in FORMATS:
+        if not match(name, head):
+            continue
+        try:
+            data = head if window is not None and window <= len(head) else _read(file_path, window)
+            with memoryview(data) as buf:
+                result = parse(buf, size, file_path)
+        except (OSError, ParseError) as e:
+            print(f"Error parsing {file_path} as {format_name}: {e}")
+            return None
+        return dict(result, format=format_name, size=size)
+    return None
+
+# ===== Formats =====
+
+def _parse_sfo(buf, size, path):
+    header = SFO_HEADER.view(buf)
+    return {
+        'platform': 'PSP',
+        'version': header.version,
+        'fields': read_sfo_entries(buf.obj) or {}
+    }
+
+def _parse_savedata(buf, size, path):
+    # Whether a data file is encrypted is recorded in its folder's PARAM.SFO (None: no SFO to ask)
+    listed = read_file_list(os.path.dirname(path))
+    name = os.path.basename(path)
+    if listed is None or name not in listed:
+        return {'platform': 'PSP', 'encrypted': False if listed is not None else None}
+    header = SAVEDATA_HEADER.view(buf)
+    return {
+        'platform': 'PSP',
+        'encrypted': True,
+        'seed': header.seed.hex(),
+        'payload_size': size - HEADER_SIZE,
+        'hash': listed[name]
+    }
+
+def _parse_state(buf, size, path):
+    header = CHUNK_HEADER.view(buf)
+    if header.revision <= 0 or header.compression not in COMPRESSION_TYPES:
+        raise ParseError("Not a PPSSPP save state")
+    title = ""
+    if header.revision >= REVISION_TITLE and len(buf) >= HEADER_WINDOW:
+        title = STATE_TITLE.view(buf, CHUNK_HEADER.size).title
+    return {
+        'platform': 'PSP',
+        'revision': header.revision,
+        'compression': COMPRESSION_TYPES[header.compression],
+        'uncompressed_size': header.uncompressed_size,
+        'emulator_version': header.version,
+        'title': title
+    }
+
+def _parse_gba(buf, size, path):
+    return {'platform': 'GBA', 'save_type': GBA_SAVE_TYPES.get(size, 'Unknown')}
+
+def _parse_snes(buf, size, path):
+    # Cartridge SRAM comes in powers of two from 2KB up
+    sram = size >= 2048 and size & (size - 1) == 0
+    return {'platform': 'SNES', 'save_type': 'SRAM' if sram else 'Unknown'}
+
+register_format('snes_srm', lambda name, head: name.endswith('.srm'), _parse_snes, window=0)
+register_format('gba_sav', lambda name, head: name.endswith('.sav'), _parse_gba, window=0)
+register_format(
+    'psp_savedata',
+    lambda name, head: name.endswith('.bin') and is_encrypted_file(name),
+    _parse_savedata,
+    window=SAVEDATA_HEADER.size
+)
+register_format(
+    'ppsspp_state',
+    lambda name, head: name.endswith('.ppst'),
+    _parse_state,
+    window=HEADER_WINDOW
+)
+register_format('psp_param_sfo', lambda name, head: head.startswith(SFO_MAGIC), _parse_sfo)
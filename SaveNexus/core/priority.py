@@ -0,0 +1,54 @@
+"""
+Background thread priority
+
+Housekeeping threads (retention, the integrity scrubber) call
+lower_thread_priority() first so they only use CPU and disk time that
+nothing else wants, e.g. while a game is running.
+"""
+
+import os
+import platform
+import sys
+import threading
+
+# Linux ioprio_set(2): no libc wrapper, so it's called by syscall number
+_IOPRIO_SET = {"x86_64": 251, "aarch64": 30, "i686": 289, "i386": 289, "armv7l": 314}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+
+# Windows SetThreadPriority: lowers CPU, I/O and memory priority together
+_THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+
+def _linux_idle_io(tid):
+    number = _IOPRIO_SET.get(platform.machine())
+    if number is None:
+        return False
+    import ctypes
+    libc = ctypes.CDLL(None, use_errno=True)
+    return libc.syscall(number, _IOPRIO_WHO_PROCESS, tid, _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT) == 0
+
+def lower_thread_priority():
+    """
+    Best effort: run the calling thread at the lowest CPU priority and, on
+    Linux and Windows, the idle I/O priority
+    """
+    if sys.platform.startswith('linux'):
+        tid = threading.get_native_id()
+        try:
+            # On Linux a thread ID works as a PRIO_PROCESS target and only affects this thread
+            os.setpriority(os.PRIO_PROCESS, tid, 19)
+        except (AttributeError, OSError):
+            pass
+        try:
+            _linux_idle_io(tid)
+        except (AttributeError, OSError):
+            pass
+    elif sys.platform == 'win32':
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), _THREAD_MODE_BACKGROUND_BEGIN)
+        except (AttributeError, OSError):
+            pass
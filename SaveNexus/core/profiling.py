@@ -0,0 +1,232 @@
+"""
+On-demand profiling and memory snapshots
+
+Nothing here runs unless asked for: RequestProfiler only installs cProfile
+for the next N requests it has been armed for, and tracemalloc is started
+by the first snapshot and stopped again by clear_snapshots(). cProfile,
+pstats and tracemalloc aren't even imported until then.
+
+Profiles can be rendered as the usual pstats table or as collapsed stacks
+("a;b;c 123" lines, microseconds) for flamegraph.pl / speedscope. cProfile
+records caller -> callee edges rather than full stacks, so collapsed output
+attributes each function's own time to its call paths in proportion to the
+time each caller spent in it.
+"""
+
+import io
+import os
+import time
+from threading import Lock
+
+DEFAULT_SORT = 'cumulative'
+DEFAULT_LIMIT = 40
+TRACEMALLOC_FRAMES = 25
+
+# Collapsed stacks: ignore paths worth less than this many microseconds
+COLLAPSED_MIN_US = 1
+COLLAPSED_MAX_DEPTH = 64
+
+
+def _frame_label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f"{os.path.basename(filename)}:{name}:{line}"
+
+def format_pstats(stats, sort=DEFAULT_SORT, limit=DEFAULT_LIMIT):
+    """pstats table as text"""
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+def format_collapsed(stats):
+    """Collapsed-stack text ("root;caller;func microseconds") from pstats data"""
+    entries = stats.stats
+    lines = {}
+
+    def walk(func, path, weight, depth):
+        callers = entries.get(func, (0, 0, 0, 0, {}))[4]
+        total = sum(edge[3] for edge in callers.values())
+        if not callers or total <= 0 or depth >= COLLAPSED_MAX_DEPTH:
+            stack = ';'.join(_frame_label(f) for f in reversed(path))
+            lines[stack] = lines.get(stack, 0) + weight
+            return
+        for caller, edge in callers.items():
+            share = weight * edge[3] / total
+            if share < COLLAPSED_MIN_US or caller in path:
+                continue
+            walk(caller, path + [caller], share, depth + 1)
+
+    for func, (_, _, self_time, _, _) in entries.items():
+        weight = self_time * 1e6
+        if weight >= COLLAPSED_MIN_US:
+            walk(func, [func], weight, 0)
+
+    ordered = sorted(lines.items(), key=lambda item: item[1], reverse=True)
+    return ''.join(f"{stack} {int(round(us))}\n" for stack, us in ordered if us >= COLLAPSED_MIN_US)
+
+def format_profile(stats, output='pstats', sort=DEFAULT_SORT, limit=DEFAULT_LIMIT):
+    if output == 'collapsed':
+        return format_collapsed(stats)
+    return format_pstats(stats, sort, limit)
+
+def profile_call(fn, *args, **kwargs):
+    """
+    Run fn under cProfile
+
+    Returns:
+        (result, pstats.Stats, elapsed seconds)
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    elapsed = time.perf_counter() - started
+    return result, pstats.Stats(profiler), elapsed
+
+
+class RequestProfiler:
+    """
+    Profile the next N requests and accumulate them into one pstats.Stats
+
+    Only one request is profiled at a time; requests that arrive while
+    another is being profiled run normally and don't count towards N.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._busy = Lock()
+        self.remaining = 0
+        self.profiled = []
+        self._stats = None
+        self._local = {}
+
+    def arm(self, count):
+        with self._lock:
+            self.remaining = max(0, int(count))
+            self.profiled = []
+            self._stats = None
+
+    def reset(self):
+        self.arm(0)
+
+    @property
+    def armed(self):
+        return self.remaining > 0
+
+    def start(self, key):
+        """Begin profiling a request if armed; key identifies the request (e.g. thread id)"""
+        if self.remaining <= 0 or not self._busy.acquire(blocking=False):
+            return False
+        with self._lock:
+            if self.remaining <= 0:
+                self._busy.release()
+                return False
+            self.remaining -= 1
+
+        import cProfile
+        profiler = cProfile.Profile()
+        self._local[key] = (profiler, time.perf_counter())
+        profiler.enable()
+        return True
+
+    def stop(self, key, label):
+        """Finish profiling the request started under key"""
+        state = self._local.pop(key, None)
+        if state is None:
+            return
+        profiler, started = state
+        profiler.disable()
+        import pstats
+        try:
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+                self.profiled.append({'request': label, 'seconds': time.perf_counter() - started})
+        finally:
+            self._busy.release()
+
+    def report(self, output='pstats', sort=DEFAULT_SORT, limit=DEFAULT_LIMIT):
+        """Formatted profile of everything collected so far, or None"""
+        with self._lock:
+            if self._stats is None:
+                return None
+            return format_profile(self._stats, output, sort, limit)
+
+
+# ===== tracemalloc snapshots =====
+
+_snapshots = {}
+_snapshots_lock = Lock()
+
+def take_snapshot(name=None):
+    """Take a tracemalloc snapshot (starting tracing if needed) and store it under name"""
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    with _snapshots_lock:
+        name = name or f"snapshot-{len(_snapshots) + 1}"
+        _snapshots[name] = snapshot
+    return {'name': name, 'traced_bytes': current, 'peak_bytes': peak}
+
+def list_snapshots():
+    with _snapshots_lock:
+        return sorted(_snapshots)
+
+def diff_snapshots(old, new, group_by='lineno', limit=25):
+    """
+    Compare two stored snapshots
+
+    Returns:
+        List of the largest allocation changes, or None if a snapshot is missing
+    """
+    with _snapshots_lock:
+        before = _snapshots.get(old)
+        after = _snapshots.get(new)
+    if before is None or after is None:
+        return None
+
+    diff = []
+    for stat in after.compare_to(before, group_by)[:limit]:
+        diff.append({
+            'location': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            'size_diff': stat.size_diff,
+            'size': stat.size,
+            'count_diff': stat.count_diff,
+            'count': stat.count
+        })
+    return diff
+
+def top_allocations(name, group_by='lineno', limit=25):
+    with _snapshots_lock:
+        snapshot = _snapshots.get(name)
+    if snapshot is None:
+        return None
+    return [{
+        'location': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        'size': stat.size,
+        'count': stat.count
+    } for stat in snapshot.statistics(group_by)[:limit]]
+
+def clear_snapshots():
+    """Drop stored snapshots and stop tracing"""
+    with _snapshots_lock:
+        _snapshots.clear()
+    import tracemalloc
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
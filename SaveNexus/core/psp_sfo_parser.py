@@ -1,54 +1,133 @@
 
 import struct
 
-def parse_param_sfo(file_path):
-    try:
-        with open(file_path, "rb") as f:
-            data = f.read()
+from core.schema import Schema
 
-        print(f"Reading PARAM.SFO: {file_path}")
-        print("Header Bytes:", data[:16].hex())
+SFO_MAGIC = b"PSF\x01"
+SFO_HEADER = Schema('SfoHeader', [
+    ('magic', '4s'),
+    ('version', 'I'),
+    ('key_table_start', 'I'),
+    ('data_table_start', 'I'),
+    ('entry_count', 'I'),
+])
+SFO_INDEX_ENTRY = Schema('SfoIndexEntry', [
+    ('key_offset', 'H'),
+    ('type', 'H'),
+    ('length', 'I'),
+    ('reserved', 'I'),
+    ('data_offset', 'I'),
+])
 
-        # Align to actual header
-        start = data.find(b'PSF\x01')
-        if start == -1:
-            return "Invalid SFO format"
-        data = data[start:]
+SFO_TYPE_BINARY = 0x0004
+SFO_TYPE_STRING = 0x0204
+SFO_TYPE_INT = 0x0404
 
-        if len(data) < 20:
-            return "PARAM.SFO too small"
+def read_sfo_entries(data):
+    """
+    Decode the key/value table of an in-memory PARAM.SFO
 
-        # Corrected variable unpacking
-        #magic, version, key_table_start, data_table_start, entry_count = struct.unpack("<4sHHIII", data[:20])
-        magic, version, key_table_start, data_table_start, entry_count = struct.unpack("<4sHHII", data[:16])
+    Args:
+        data: Raw SFO bytes or an mmap (a leading PSF header is searched for)
 
-        
-        if magic != b'PSF\x01':
-            return "Invalid SFO signature"
+    Returns:
+        Dict of SFO keys to str/int values, or None if no PSF header is found
+    """
+    # Align to actual header
+    start = data.find(SFO_MAGIC)
+    if start == -1 or len(data) - start < SFO_HEADER.size:
+        return None
 
-        entries = {}
-        for i in range(entry_count):
-            entry_base = 20 + i * 16
-            if entry_base + 16 > len(data):
-                continue
-            kofs, dtype, dlen, dlen_total, dofs = struct.unpack("<HHIII", data[entry_base:entry_base+16])
+    _, _, key_table_start, data_table_start, entry_count = SFO_HEADER.struct.unpack_from(data, start)
+    key_table_start += start
+    data_table_start += start
 
+    # Only whole index entries; the table is walked in place rather than copied
+    index_start = start + SFO_HEADER.size
+    entry_count = min(entry_count, (len(data) - index_start) // SFO_INDEX_ENTRY.size)
+    entries = {}
+    with memoryview(data)[index_start:index_start + entry_count * SFO_INDEX_ENTRY.size] as index:
+        for kofs, dtype, dlen, _, dofs in SFO_INDEX_ENTRY.iter_unpack(index):
             key_start = key_table_start + kofs
             key_end = data.find(b'\x00', key_start)
-            key = data[key_start:key_end].decode('utf-8')
-
             val_start = data_table_start + dofs
+            # Skip entries a truncated or corrupt file cuts off
+            if key_end == -1 or val_start + dlen > len(data):
+                continue
+            key = data[key_start:key_end].decode('utf-8', errors='ignore')
             val_raw = data[val_start:val_start + dlen]
 
-            if dtype == 0x0204:  # UTF-8 string
-                value = val_raw.split(b'\x00')[0].decode('utf-8')
-            elif dtype == 0x0404 and dlen == 4:
+            if dtype == SFO_TYPE_STRING:
+                value = val_raw.split(b'\x00')[0].decode('utf-8', errors='ignore')
+            elif dtype == SFO_TYPE_INT and dlen == 4:
                 value = struct.unpack("<I", val_raw)[0]
             else:
                 value = val_raw.hex()
 
             entries[key] = value
 
+    return entries
+
+def _align4(n):
+    return (n + 3) & ~3
+
+def encode_sfo_value(value):
+    """
+    (SFO data type, raw bytes) for a str (UTF-8), int (uint32) or bytes
+    (binary) value; a (type, raw bytes) tuple is already encoded
+    """
+    if isinstance(value, tuple):
+        return value
+    if isinstance(value, int):
+        return SFO_TYPE_INT, struct.pack("<I", value)
+    if isinstance(value, str):
+        return SFO_TYPE_STRING, value.encode("utf-8") + b"\x00"
+    return SFO_TYPE_BINARY, bytes(value)
+
+def build_sfo_bytes(entries, reserved=None):
+    """
+    Serialize a PARAM.SFO
+
+    Args:
+        entries: Dict of key -> str (UTF-8), int (uint32) or bytes (binary)
+            values, or (type, raw bytes) to write a value exactly as read
+        reserved: Optional dict of key -> reserved data length, so values can grow in place
+
+    Returns:
+        SFO file contents as bytes
+    """
+    reserved = reserved or {}
+    keys = sorted(entries)  # The PSP expects keys in ascending order
+
+    key_table = b""
+    data_table = b""
+    index = b""
+    for key in keys:
+        dtype, raw = encode_sfo_value(entries[key])
+
+        total = _align4(max(len(raw), reserved.get(key, 0)))
+        index += SFO_INDEX_ENTRY.pack(len(key_table), dtype, len(raw), total, len(data_table))
+        key_table += key.encode("utf-8") + b"\x00"
+        data_table += raw + b"\x00" * (total - len(raw))
+
+    key_table += b"\x00" * (_align4(len(key_table)) - len(key_table))
+    key_table_start = SFO_HEADER.size + len(index)
+    data_table_start = key_table_start + len(key_table)
+    header = SFO_HEADER.pack(SFO_MAGIC, 0x0101, key_table_start, data_table_start, len(keys))
+    return header + index + key_table + data_table
+
+def parse_param_sfo(file_path):
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+
+        print(f"Reading PARAM.SFO: {file_path}")
+        print("Header Bytes:", data[:16].hex())
+
+        entries = read_sfo_entries(data)
+        if entries is None:
+            return "Invalid SFO format"
+
         game_title = (
             entries.get("TITLE")
             or entries.get("SAVEDATA_TITLE")
@@ -0,0 +1,295 @@
+"""
+Save state retention
+
+PPSSPP never deletes old .ppst files. Retention policies decide, per game,
+which states to keep:
+
+    keep_last     the N newest states
+    keep_daily    the newest state of each of the last N days with states
+    keep_weekly   the newest state of each of the last N ISO weeks with states
+    max_total_mb  cap on the total size of a game's kept states (oldest go first)
+
+A state is kept if any rule keeps it; the newest state and anything written
+in the last GRACE_SECONDS are always kept. Screenshots next to a deleted
+state go with it.
+
+Policies live in the config under "retention":
+    {
+        "enabled": false,
+        "interval_minutes": 60,
+        "max_deletes_per_second": 20,
+        "default": {"keep_last": 10, "keep_daily": 7, "keep_weekly": 4},
+        "games": {"ULUS10565": {"keep_last": 3, "max_total_mb": 200}}
+    }
+Nothing is ever deleted unless "enabled" is true; plan_retention() gives a
+dry-run report either way.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from core.config import load_config
+from core.metrics import Counter
+from core.priority import lower_thread_priority
+from core.savestate import SCREENSHOT_EXTENSIONS
+
+POLICY_KEYS = ("keep_last", "keep_daily", "keep_weekly", "max_total_mb")
+
+DEFAULT_INTERVAL_MINUTES = 60
+DEFAULT_MAX_DELETES_PER_SECOND = 20
+# States this new may still be being written, or just loaded by the user
+GRACE_SECONDS = 10 * 60
+
+DELETED_STATES = Counter('savenexus_retention_deleted_total', 'Save states deleted by retention')
+FREED_BYTES = Counter('savenexus_retention_freed_bytes_total', 'Bytes freed by retention')
+
+
+def retention_settings(config=None):
+    if config is None:
+        config = load_config()
+    return config.get("retention", {})
+
+def policy_for(disc_id, settings):
+    """Effective policy for a game: the default overlaid with the game's own rules"""
+    policy = {key: value for key, value in settings.get("default", {}).items() if key in POLICY_KEYS}
+    game_policy = settings.get("games", {}).get(disc_id)
+    if game_policy is False:
+        return {}
+    for key, value in (game_policy or {}).items():
+        if key in POLICY_KEYS:
+            policy[key] = value
+    return {key: value for key, value in policy.items() if value is not None}
+
+def list_states(savestate_dir):
+    """PPSSPP save states grouped by disc ID, newest first"""
+    states = {}
+    try:
+        with os.scandir(savestate_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.ppst'):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                disc_id = entry.name.split('_', 1)[0]
+                states.setdefault(disc_id, []).append({
+                    'filename': entry.name,
+                    'path': entry.path,
+                    'modified': st.st_mtime,
+                    'size': st.st_size
+                })
+    except OSError:
+        return {}
+
+    for disc_states in states.values():
+        disc_states.sort(key=lambda s: s['modified'], reverse=True)
+    return states
+
+def _newest_per_period(states, count, period):
+    kept = []
+    seen = set()
+    for state in states:
+        key = period(datetime.fromtimestamp(state['modified']))
+        if key in seen:
+            continue
+        if len(seen) >= count:
+            break
+        seen.add(key)
+        kept.append(state)
+    return kept
+
+def select_states(states, policy, now=None):
+    """
+    Split one game's states (newest first) into kept and deleted
+
+    Returns:
+        (keep, delete) lists of state dicts
+    """
+    if not states or not policy:
+        return list(states), []
+
+    now = time.time() if now is None else now
+    keep = {states[0]['path']}
+    keep.update(s['path'] for s in states if now - s['modified'] < GRACE_SECONDS)
+
+    if policy.get("keep_last"):
+        keep.update(s['path'] for s in states[:policy["keep_last"]])
+    if policy.get("keep_daily"):
+        keep.update(s['path'] for s in _newest_per_period(states, policy["keep_daily"], lambda d: d.date()))
+    if policy.get("keep_weekly"):
+        keep.update(s['path'] for s in _newest_per_period(
+            states, policy["keep_weekly"], lambda d: d.isocalendar()[:2]
+        ))
+    if not any(policy.get(key) for key in ("keep_last", "keep_daily", "keep_weekly")):
+        # Only a size cap: everything is a candidate to keep
+        keep.update(s['path'] for s in states)
+
+    if policy.get("max_total_mb"):
+        budget = policy["max_total_mb"] * 1024 * 1024
+        total = 0
+        for state in states:
+            if state['path'] not in keep:
+                continue
+            total += state['size']
+            protected = state is states[0] or now - state['modified'] < GRACE_SECONDS
+            if total > budget and not protected:
+                keep.discard(state['path'])
+                total -= state['size']
+
+    kept = [s for s in states if s['path'] in keep]
+    deleted = [s for s in states if s['path'] not in keep]
+    return kept, deleted
+
+def plan_retention(savestate_dir, settings=None, now=None):
+    """
+    Dry run: what retention would delete right now
+
+    Returns:
+        Report dict with per-game keep/delete lists and totals
+    """
+    if settings is None:
+        settings = retention_settings()
+
+    games = {}
+    total_states = 0
+    total_bytes = 0
+    delete_count = 0
+    freed_bytes = 0
+    for disc_id, states in list_states(savestate_dir).items():
+        policy = policy_for(disc_id, settings)
+        keep, delete = select_states(states, policy, now)
+        total_states += len(states)
+        total_bytes += sum(s['size'] for s in states)
+        if not delete:
+            continue
+        games[disc_id] = {
+            'policy': policy,
+            'keep': [s['filename'] for s in keep],
+            'delete': [s['filename'] for s in delete],
+            'freed_bytes': sum(s['size'] for s in delete),
+            '_delete_states': delete
+        }
+        delete_count += len(delete)
+        freed_bytes += games[disc_id]['freed_bytes']
+
+    return {
+        'savestate_dir': savestate_dir,
+        'generated': time.time(),
+        'states': total_states,
+        'total_bytes': total_bytes,
+        'delete_count': delete_count,
+        'freed_bytes': freed_bytes,
+        'games': games
+    }
+
+def public_report(report):
+    """Report without internal fields, for JSON responses"""
+    if report is None:
+        return None
+    games = {
+        disc_id: {key: value for key, value in game.items() if not key.startswith('_')}
+        for disc_id, game in report['games'].items()
+    }
+    return dict(report, games=games)
+
+
+class RetentionCollector:
+    """Background thread that enforces retention policies"""
+
+    def __init__(self, savestate_dir_getter, on_deleted=None):
+        self._savestate_dir = savestate_dir_getter
+        self.on_deleted = on_deleted
+        self.last_report = None
+        self.last_run = None
+        self.running = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='retention', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self):
+        """Run a collection now instead of waiting for the next interval"""
+        self._wake.set()
+
+    def _loop(self):
+        lower_thread_priority()
+        while not self._stop.is_set():
+            settings = retention_settings()
+            interval = settings.get("interval_minutes", DEFAULT_INTERVAL_MINUTES) * 60
+            forced = self._wake.is_set()
+            self._wake.clear()
+            if settings.get("enabled") or forced:
+                try:
+                    self.collect(settings, dry_run=not settings.get("enabled"))
+                except Exception as e:
+                    print(f"Error enforcing save state retention: {e}")
+            self._wake.wait(interval)
+
+    def collect(self, settings=None, dry_run=False):
+        """Plan and (unless dry_run) delete, throttled to max_deletes_per_second"""
+        if settings is None:
+            settings = retention_settings()
+        savestate_dir = self._savestate_dir()
+        if not savestate_dir:
+            return None
+
+        self.running = True
+        try:
+            report = plan_retention(savestate_dir, settings)
+            report['dry_run'] = dry_run
+            if not dry_run:
+                report['deleted'] = self._delete(report, settings)
+            self.last_report = report
+            self.last_run = time.time()
+            return report
+        finally:
+            self.running = False
+
+    def _delete(self, report, settings):
+        rate = settings.get("max_deletes_per_second", DEFAULT_MAX_DELETES_PER_SECOND)
+        delay = 1.0 / rate if rate and rate > 0 else 0
+        deleted = 0
+        for game in report['games'].values():
+            for state in game['_delete_states']:
+                if self._stop.is_set():
+                    return deleted
+                path = state['path']
+                try:
+                    # Throttled runs reach a state long after planning, and PPSSPP
+                    # overwrites slot files in place: only delete what was planned
+                    st = os.stat(path)
+                    if (st.st_mtime != state['modified'] or st.st_size != state['size']
+                            or time.time() - st.st_mtime < GRACE_SECONDS):
+                        report['skipped'] = report.get('skipped', 0) + 1
+                        continue
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Error deleting save state {path}: {e}")
+                    continue
+                deleted += 1
+                DELETED_STATES.inc()
+                FREED_BYTES.inc(st.st_size)
+                stem = os.path.splitext(path)[0]
+                for ext in SCREENSHOT_EXTENSIONS:
+                    try:
+                        os.remove(stem + ext)
+                    except OSError:
+                        pass
+                if delay:
+                    time.sleep(delay)
+
+        if deleted and self.on_deleted:
+            self.on_deleted()
+        return deleted
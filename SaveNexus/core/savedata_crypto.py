@@ -0,0 +1,64 @@
+"""
+PSP SAVEDATA encryption status
+
+Games that protect their saves have the PSP encrypt the data files
+(DATA.BIN and friends) through the KIRK engine and sceChnnlsv. An
+encrypted file starts with a 16-byte header the key stream is derived
+from, and the folder's PARAM.SFO lists every protected file in
+SAVEDATA_FILE_LIST together with the hash the PSP checks it against. A
+file saved without encryption has an all-zero hash there, or no entry.
+
+SaveNexus reads this layout but does not decrypt: that needs the
+console's KIRK keys, which it doesn't ship.
+"""
+
+import os
+
+from core.psp_sfo_parser import read_sfo_entries
+from core.schema import RAW, Schema, c_string
+
+HEADER_SIZE = 16
+HASH_SIZE = 16
+
+FILE_LIST_KEY = "SAVEDATA_FILE_LIST"
+FILE_LIST_ENTRY = Schema('SavedataFileListEntry', [
+    ('name', '13s', c_string),
+    ('hash', f'{HASH_SIZE}s', RAW),
+    ('padding', '3s'),
+])
+
+# SAVEDATA files the PSP never encrypts
+PLAIN_FILES = {"PARAM.SFO", "ICON0.PNG", "ICON1.PMF", "ICON1.PNG", "PIC1.PNG", "SND0.AT3"}
+
+
+def is_encrypted_file(name):
+    """Whether a SAVEDATA file of this name can be encrypted at all"""
+    return name.upper() not in PLAIN_FILES
+
+def read_file_list(folder):
+    """
+    Files a save folder's PARAM.SFO lists as encrypted
+
+    Returns:
+        dict of file name -> hash (hex), or None if the folder has no
+        readable PARAM.SFO
+    """
+    try:
+        with open(os.path.join(folder, "PARAM.SFO"), "rb") as f:
+            entries = read_sfo_entries(f.read())
+    except OSError:
+        return None
+    if entries is None:
+        return None
+
+    try:
+        # Binary SFO values come back as hex
+        table = bytes.fromhex(entries.get(FILE_LIST_KEY) or "")
+    except (TypeError, ValueError):
+        return {}
+    usable = len(table) - len(table) % FILE_LIST_ENTRY.size
+    listed = {}
+    for entry in FILE_LIST_ENTRY.array(table, 0, usable // FILE_LIST_ENTRY.size):
+        if entry.name and any(entry.hash):
+            listed[entry.name] = entry.hash.hex()
+    return listed
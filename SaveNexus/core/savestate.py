@@ -0,0 +1,148 @@
+"""
+PPSSPP save state metadata
+
+A .ppst file starts with PPSSPP's chunk file header followed (revision 5+)
+by a fixed 128-byte title; the compressed state follows and can be many
+megabytes. Only that header window is mapped and read here. PPSSPP writes
+a screenshot next to each state with the same stem (ULUS10565_1.00_0.jpg),
+which is indexed as the state's thumbnail.
+
+Metadata is cached per (path, mtime) with LRU eviction, so refreshing a
+state list only touches files that changed.
+"""
+
+import mmap
+import os
+from collections import OrderedDict
+from threading import Lock
+
+from core.metrics import cache_counters
+from core.schema import Schema, c_string
+
+CHUNK_HEADER = Schema('PpstChunkHeader', [
+    ('revision', 'i'),
+    ('compression', 'i'),
+    ('compressed_size', 'I'),
+    ('uncompressed_size', 'I'),
+    ('version', '32s', c_string),
+])
+TITLE_SIZE = 128
+# PPSSPP reads revisions from 4 (REVISION_MIN); the title block was added in 5
+REVISION_TITLE = 5
+HEADER_WINDOW = CHUNK_HEADER.size + TITLE_SIZE
+
+COMPRESSION_TYPES = {0: 'none', 1: 'snappy', 2: 'zstd'}
+SCREENSHOT_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+DEFAULT_CACHE_SIZE = 2048
+
+
+def read_state_header(path):
+    """
+    Read the header of a PPSSPP save state
+
+    Returns:
+        dict with revision, compression, compressed_size, uncompressed_size,
+        version and title, or None if the file isn't a readable state
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < CHUNK_HEADER.size:
+                return None
+            with mmap.mmap(f.fileno(), min(size, HEADER_WINDOW), access=mmap.ACCESS_READ) as window:
+                revision, compress, expected, uncompressed, version = CHUNK_HEADER.unpack_from(window, 0)
+                title = ""
+                if revision >= REVISION_TITLE and len(window) >= HEADER_WINDOW:
+                    title = c_string(window[CHUNK_HEADER.size:HEADER_WINDOW])
+    except (OSError, ValueError) as e:
+        print(f"Error reading save state header {path}: {e}")
+        return None
+
+    if revision <= 0 or compress not in COMPRESSION_TYPES:
+        return None
+
+    return {
+        'revision': revision,
+        'compression': COMPRESSION_TYPES[compress],
+        'compressed_size': expected,
+        'uncompressed_size': uncompressed,
+        'version': c_string(version),
+        'title': title
+    }
+
+def find_screenshot(path):
+    """Path of the screenshot PPSSPP saved alongside a state, or None"""
+    stem = os.path.splitext(path)[0]
+    for ext in SCREENSHOT_EXTENSIONS:
+        candidate = stem + ext
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+class StateMetadataCache:
+    """LRU cache of save state headers and thumbnails keyed by (path, mtime)"""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # path -> (mtime, metadata)
+        self._lock = Lock()
+        self._hit, self._miss = cache_counters("savestate")
+
+    def get(self, path, mtime=None):
+        """
+        Metadata for a save state, reading its header on first use
+
+        Returns:
+            dict with 'header' (see read_state_header) and 'thumbnail'
+            (screenshot path or None), or None if the state doesn't exist
+        """
+        if mtime is None:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                return None
+
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached and cached[0] == mtime:
+                self._entries.move_to_end(path)
+                self._hit.inc()
+                metadata = cached[1]
+            else:
+                metadata = None
+
+        if metadata is not None:
+            # PPSSPP writes the screenshot just after the state, so look again
+            if metadata['thumbnail'] is None:
+                metadata['thumbnail'] = find_screenshot(path)
+            return metadata
+
+        self._miss.inc()
+        metadata = {
+            'header': read_state_header(path),
+            'thumbnail': find_screenshot(path)
+        }
+
+        with self._lock:
+            self._entries[path] = (mtime, metadata)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return metadata
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+state_metadata = StateMetadataCache()
+
+def describe_state(state):
+    """Copy of a save state dict (filename, path, modified, size) with header and thumbnail added"""
+    metadata = state_metadata.get(state['path'], state.get('modified'))
+    described = dict(state)
+    described['header'] = metadata['header'] if metadata else None
+    described['thumbnail'] = metadata['thumbnail'] if metadata else None
+    return described
@@ -0,0 +1,386 @@
+"""
+Emulator save scanners
+
+Each scanner knows where one emulator keeps its saves and save states and
+turns them into library entries (GameRecord / SaveStateRecord from
+core.library, serialized in the same shape the local agent has always
+served). Scanners keep their own incremental index so an
+unchanged save is not re-parsed, and LocalAgent runs all of them
+concurrently and merges the results.
+
+To add an emulator, subclass SaveScanner, implement scan(), and register
+it with register_scanner().
+"""
+
+import inspect
+import os
+import re
+
+from core.config import load_config
+from core.detector import detect_format
+from core.game_map import load_game_map
+from core.library import GameRecord, SaveStateRecord
+from core.psp_sfo_parser import read_sfo_entries
+
+# Default PSP save directories (configurable under "scanners" -> "ppsspp")
+PSP_SAVEDATA_DIR = os.path.expanduser("~/Documents/PPSSPP/PSP/SAVEDATA")
+PSP_SAVESTATE_DIR = os.path.expanduser("~/Documents/PPSSPP/PSP/SYSTEM/savestates")
+
+RETROARCH_SAVES_DIR = os.path.expanduser("~/.config/retroarch/saves")
+RETROARCH_STATES_DIR = os.path.expanduser("~/.config/retroarch/states")
+
+MGBA_SAVE_DIRS = [os.path.expanduser("~/.config/mgba/saves")]
+
+DISC_ID_PATTERN = re.compile(r"(ULUS|ULES|NPJH|NPUH|NPUG|UCUS|UCES|NPPA|NPEZ)[0-9]{5}")
+
+
+def _list_dir(path):
+    """os.scandir() as a list, or [] if the directory is missing"""
+    try:
+        with os.scandir(path) as it:
+            return list(it)
+    except OSError:
+        return []
+
+def _walk_files(root, accept):
+    """Yield (DirEntry, stat) for files under root whose lower-cased name passes accept()"""
+    stack = [root]
+    while stack:
+        for entry in _list_dir(stack.pop()):
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif accept(entry.name.lower()):
+                try:
+                    yield entry, entry.stat()
+                except OSError:
+                    continue
+
+def _newest_first(states):
+    return sorted(states, key=lambda state: state.modified, reverse=True)
+
+
+class SaveScanner:
+    """Base class for emulator save scanners"""
+
+    name = None
+
+    def __init__(self):
+        # path -> (stat signature, cached result); owned by this scanner only
+        self._index = {}
+        # Records from the last scan, reused when nothing about them changed
+        # so unchanged scans allocate (almost) nothing: path -> record
+        self._states = {}
+        self._next_states = {}
+        # save path -> (info, GameRecord)
+        self._games = {}
+        self._next_games = {}
+        self.last_stats = {'parsed': 0, 'skipped': 0}
+
+    def scan(self):
+        """Return a list of GameRecords for this emulator"""
+        raise NotImplementedError
+
+    def data_dirs(self):
+        """Directories holding this emulator's saves and states (for integrity scrubbing)"""
+        return []
+
+    def _cached(self, key, signature, build):
+        """Return the cached value for key if its signature is unchanged, else rebuild it"""
+        cached = self._index.get(key)
+        if cached is not None and cached[0] == signature:
+            self.last_stats['skipped'] += 1
+            return cached[1]
+        self.last_stats['parsed'] += 1
+        value = build()
+        self._index[key] = (signature, value)
+        return value
+
+    def _state(self, entry, st):
+        """SaveStateRecord for a state file, the same object as last scan if it is unchanged"""
+        state = self._states.get(entry.path)
+        if state is None or state.modified != st.st_mtime or state.size != st.st_size:
+            state = SaveStateRecord(entry.name, entry.path, st.st_mtime, st.st_size)
+        self._next_states[state.path] = state
+        return state
+
+    def _game(self, info, save_states, has_iso=None):
+        """GameRecord for a cached info dict, the same object as last scan if nothing changed"""
+        save_states = tuple(save_states)
+        if has_iso is None:
+            has_iso = info['has_iso']
+        previous = self._games.get(info['save_path'])
+        if previous is not None and previous[0] is info:
+            game = previous[1]
+            if game.has_iso == has_iso and game.save_states == save_states:
+                self._next_games[game.save_path] = previous
+                return game
+
+        game = GameRecord(save_states=save_states, **dict(info, has_iso=has_iso))
+        self._next_games[game.save_path] = (info, game)
+        return game
+
+    def _prune(self, seen):
+        """Drop index entries for files that are gone; the records seen this scan become the reusable set"""
+        for key in set(self._index) - seen:
+            del self._index[key]
+        self._states, self._next_states = self._next_states, {}
+        self._games, self._next_games = self._next_games, {}
+
+
+class PPSSPPScanner(SaveScanner):
+    """PSP SAVEDATA folders (PARAM.SFO / ICON0.PNG) and .ppst save states"""
+
+    name = 'ppsspp'
+
+    def __init__(self, savedata_dir=PSP_SAVEDATA_DIR, savestate_dir=PSP_SAVESTATE_DIR):
+        super().__init__()
+        self.savedata_dir = savedata_dir
+        self.savestate_dir = savestate_dir
+
+    def data_dirs(self):
+        return [self.savedata_dir, self.savestate_dir]
+
+    def scan(self):
+        self.last_stats = {'parsed': 0, 'skipped': 0}
+        game_map = load_game_map()
+        states_by_disc_id = self._scan_save_states()
+
+        games = []
+        seen = set()
+        for entry in _list_dir(self.savedata_dir):
+            if not entry.is_dir():
+                continue
+
+            param_path = os.path.join(entry.path, "PARAM.SFO")
+            try:
+                param_st = os.stat(param_path)
+                folder_st = entry.stat()
+            except OSError:
+                continue
+
+            # The folder mtime changes when ICON0.PNG is added or removed
+            signature = (param_st.st_mtime, param_st.st_size, folder_st.st_mtime)
+            seen.add(entry.path)
+            info = self._cached(entry.path, signature, lambda: self._parse_game_info(param_path, entry.name))
+            if not info:
+                continue
+
+            games.append(self._game(
+                info, states_by_disc_id.get(info['disc_id'], ()), has_iso=bool(game_map.get(info['disc_id']))
+            ))
+
+        self._prune(seen)
+        return games
+
+    def _parse_game_info(self, param_path, folder_name):
+        """Extract game metadata from PARAM.SFO"""
+        try:
+            with open(param_path, "rb") as f:
+                entries = read_sfo_entries(f.read())
+        except Exception as e:
+            print(f"Error parsing {param_path}: {e}")
+            return None
+
+        if entries is None:
+            return None
+
+        # Extract disc ID from folder name
+        disc_id_match = DISC_ID_PATTERN.match(folder_name.upper())
+        disc_id = disc_id_match.group(0) if disc_id_match else folder_name
+        folder_path = os.path.dirname(param_path)
+        icon_path = os.path.join(folder_path, "ICON0.PNG")
+
+        return {
+            'disc_id': disc_id,
+            'title': entries.get('TITLE', 'Unknown Game'),
+            'save_title': entries.get('SAVEDATA_TITLE', ''),
+            'icon_path': icon_path if os.path.exists(icon_path) else None,
+            'save_path': folder_path,
+            'emulator': self.name,
+            'platform': 'PSP'
+        }
+
+    def _scan_save_states(self):
+        """List the save state directory once and group states by disc ID"""
+        # PPSSPP names save states like: ULUS10565_1.00_0.ppst
+        states = {}
+        for entry in _list_dir(self.savestate_dir):
+            if not entry.name.endswith('.ppst'):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            disc_id = entry.name.split('_', 1)[0]
+            states.setdefault(disc_id, []).append(self._state(entry, st))
+
+        return {disc_id: _newest_first(disc_states) for disc_id, disc_states in states.items()}
+
+
+class RetroArchScanner(SaveScanner):
+    """RetroArch battery saves (.srm) and save states (.state, .stateN, .state.auto)"""
+
+    name = 'retroarch'
+
+    STATE_PATTERN = re.compile(r"^(?P<game>.+)\.state(\d+|\.auto)?$", re.IGNORECASE)
+
+    def __init__(self, saves_dir=RETROARCH_SAVES_DIR, states_dir=RETROARCH_STATES_DIR):
+        super().__init__()
+        self.saves_dir = saves_dir
+        self.states_dir = states_dir
+
+    def data_dirs(self):
+        return [self.saves_dir, self.states_dir]
+
+    def scan(self):
+        self.last_stats = {'parsed': 0, 'skipped': 0}
+        seen = set()
+
+        states = {}
+        for entry, st in _walk_files(self.states_dir, self.STATE_PATTERN.match):
+            game = self.STATE_PATTERN.match(entry.name).group('game')
+            states.setdefault(game, []).append(self._state(entry, st))
+
+        games = []
+        for entry, st in _walk_files(self.saves_dir, lambda name: name.endswith('.srm')):
+            seen.add(entry.path)
+            game = os.path.splitext(entry.name)[0]
+            info = self._cached(entry.path, (st.st_mtime, st.st_size), lambda: {
+                'disc_id': game,
+                'title': game,
+                'save_title': entry.name,
+                'icon_path': None,
+                'save_path': entry.path,
+                'emulator': self.name,
+                'platform': detect_format(entry.path),
+                'has_iso': False
+            })
+            games.append(self._game(info, _newest_first(states.get(game, []))))
+
+        self._prune(seen)
+        return games
+
+
+class MgbaScanner(SaveScanner):
+    """mGBA-style folders of .sav battery saves with .ss0-.ss9 states alongside"""
+
+    name = 'mgba'
+
+    FILE_PATTERN = re.compile(r"\.(sav|ss[0-9])$")
+
+    def __init__(self, save_dirs=None):
+        super().__init__()
+        self.save_dirs = list(save_dirs) if save_dirs is not None else list(MGBA_SAVE_DIRS)
+
+    def data_dirs(self):
+        return list(self.save_dirs)
+
+    def scan(self):
+        self.last_stats = {'parsed': 0, 'skipped': 0}
+        seen = set()
+        games = []
+
+        for save_dir in self.save_dirs:
+            saves = []
+            states = {}
+            for entry, st in _walk_files(save_dir, self.FILE_PATTERN.search):
+                stem, ext = os.path.splitext(entry.name)
+                if ext.lower() == '.sav':
+                    saves.append((entry, st, stem))
+                else:
+                    states.setdefault((os.path.dirname(entry.path), stem), []).append(self._state(entry, st))
+
+            for entry, st, stem in saves:
+                seen.add(entry.path)
+                info = self._cached(entry.path, (st.st_mtime, st.st_size), lambda: {
+                    'disc_id': stem,
+                    'title': stem,
+                    'save_title': entry.name,
+                    'icon_path': None,
+                    'save_path': entry.path,
+                    'emulator': self.name,
+                    'platform': detect_format(entry.path),
+                    'has_iso': False
+                })
+                game_states = states.get((os.path.dirname(entry.path), stem), [])
+                games.append(self._game(info, _newest_first(game_states)))
+
+        self._prune(seen)
+        return games
+
+
+SCANNER_TYPES = {
+    PPSSPPScanner.name: PPSSPPScanner,
+    RetroArchScanner.name: RetroArchScanner,
+    MgbaScanner.name: MgbaScanner,
+}
+
+def register_scanner(scanner_class):
+    """Make a SaveScanner subclass available under its name"""
+    SCANNER_TYPES[scanner_class.name] = scanner_class
+    return scanner_class
+
+def _is_path_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def _scanner_options(name, scanner_class, options):
+    """
+    Constructor keyword arguments from a scanner's config entry
+
+    Unknown keys and values of the wrong type are dropped (the scanner's
+    default is used instead) with a message, so one bad entry doesn't stop
+    the agent from starting.
+    """
+    if options is None or options is True:
+        return {}
+    if not isinstance(options, dict):
+        print(f"Ignoring scanners.{name}: expected an object or false, got {options!r}")
+        return {}
+
+    parameters = inspect.signature(scanner_class.__init__).parameters
+    kwargs = {}
+    for key, value in options.items():
+        parameter = parameters.get(key)
+        if key == 'self' or parameter is None or parameter.kind is not parameter.POSITIONAL_OR_KEYWORD:
+            print(f"Ignoring unknown option scanners.{name}.{key}")
+            continue
+        # Directory options are a path, or a list of paths where the default isn't one
+        if isinstance(parameter.default, str):
+            valid = isinstance(value, str)
+        else:
+            valid = _is_path_list(value)
+        if not valid:
+            print(f"Ignoring scanners.{name}.{key}: {value!r} is not a valid directory setting")
+            continue
+        kwargs[key] = value
+    return kwargs
+
+def build_scanners(config=None):
+    """
+    Create the configured scanners
+
+    The "scanners" config key maps scanner names to constructor keyword
+    arguments, e.g. {"ppsspp": {"savedata_dir": "..."}, "mgba": {"save_dirs": [...]}}.
+    A scanner set to false is disabled. Scanners that are not mentioned
+    (or set to true) run with their default directories; bad options are
+    skipped, see _scanner_options().
+    """
+    if config is None:
+        config = load_config()
+    settings = config.get("scanners", {})
+    if not isinstance(settings, dict):
+        print(f"Ignoring scanners: expected an object, got {settings!r}")
+        settings = {}
+
+    scanners = []
+    for name, scanner_class in SCANNER_TYPES.items():
+        options = settings.get(name, {})
+        if options is False:
+            continue
+        scanners.append(scanner_class(**_scanner_options(name, scanner_class, options)))
+    return scanners
+
+def configured_savestate_dir(config=None):
+    """Save state directory of the configured PPSSPP scanner, or None if it is disabled"""
+    scanner = next((s for s in build_scanners(config) if s.name == 'ppsspp'), None)
+    return scanner.savestate_dir if scanner else None
@@ -0,0 +1,154 @@
+"""
+Declarative binary layouts
+
+A Schema lists a structure's fields as (name, struct format[, decoder])
+and compiles them once into a single struct.Struct plus one small Struct
+per field. Compiled layouts are cached by their field list, so formats
+that share a layout share the compiled readers.
+
+    HEADER = Schema('header', [
+        ('magic', '4s'),
+        ('count', 'I'),
+        ('title', '32s', c_string),
+        ('payload', '64s', RAW),
+    ])
+
+    HEADER.unpack_from(buf, offset)   # every field at once, as a tuple
+    header = HEADER.view(buf, offset)  # lazy record
+    header.count                       # decoded on first access, then cached
+
+A view keeps a memoryview of the buffer instead of copying it, and RAW
+fields come back as memoryview slices, so a view over a large file
+mapping reads only the fields that are actually used. Views of an mmap
+hold its buffer; let them go before closing the mapping.
+"""
+
+import struct
+from functools import lru_cache
+
+# Decoder marker: return the field as a zero-copy memoryview slice
+RAW = object()
+
+
+class ParseError(ValueError):
+    pass
+
+
+def c_string(raw):
+    """Text of a NUL-terminated fixed-size string field"""
+    return bytes(raw).split(b"\x00", 1)[0].decode("utf-8", errors="replace")
+
+@lru_cache(maxsize=None)
+def _compile(byteorder, formats):
+    """Whole-record Struct, and (offset, size, Struct) per field"""
+    whole = struct.Struct(byteorder + "".join(formats))
+    fields = []
+    offset = 0
+    for fmt in formats:
+        reader = struct.Struct(byteorder + fmt)
+        # Fields are packed back to back ('<', '>', '=' and '!' never pad)
+        fields.append((offset, reader.size, reader))
+        offset += reader.size
+    return whole, tuple(fields)
+
+def _field_property(name, offset, size, reader, decoder):
+    slot = '_f_' + name
+    unpack_from = reader.unpack_from
+
+    def get(self):
+        try:
+            return getattr(self, slot)
+        except AttributeError:
+            pass
+        start = self._offset + offset
+        if decoder is RAW:
+            value = self._buf[start:start + size]
+        else:
+            value = unpack_from(self._buf, start)[0]
+            if decoder is not None:
+                value = decoder(value)
+        setattr(self, slot, value)
+        return value
+
+    return property(get)
+
+
+class SchemaView:
+    """Base of the lazy record classes Schema.view() returns"""
+
+    __slots__ = ('_buf', '_offset')
+    schema = None
+
+    def __init__(self, buf, offset):
+        self._buf = buf
+        self._offset = offset
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.schema.names}
+
+    def __repr__(self):
+        return f"<{self.schema.name} at {self._offset}>"
+
+
+class Schema:
+    """
+    A fixed-size binary structure
+
+    Args:
+        name: Used in error messages
+        fields: List of (name, struct format) or (name, struct format, decoder);
+            decoder is a callable applied to the unpacked value, or RAW
+        byteorder: A struct byte order prefix (no native alignment)
+    """
+
+    def __init__(self, name, fields, byteorder="<"):
+        if byteorder not in ("<", ">", "=", "!"):
+            raise ValueError("Schemas need a standard-size byte order")
+        self.name = name
+        self.names = tuple(field[0] for field in fields)
+        self.struct, layout = _compile(byteorder, tuple(field[1] for field in fields))
+        self.size = self.struct.size
+        self.offsets = {field[0]: offset for field, (offset, _, _) in zip(fields, layout)}
+
+        properties = {
+            field[0]: _field_property(field[0], offset, size, reader, field[2] if len(field) > 2 else None)
+            for field, (offset, size, reader) in zip(fields, layout)
+        }
+        properties['__slots__'] = tuple('_f_' + name for name in self.names)
+        properties['schema'] = self
+        self._view_class = type(name, (SchemaView,), properties)
+
+    def _check(self, buf, offset):
+        if offset < 0 or offset + self.size > len(buf):
+            raise ParseError(f"{self.name}: needs {self.size} bytes at offset {offset}, buffer has {len(buf)}")
+
+    def unpack_from(self, buf, offset=0):
+        """Every field as a tuple (decoders are not applied)"""
+        self._check(buf, offset)
+        return self.struct.unpack_from(buf, offset)
+
+    def unpack(self, data):
+        return self.struct.unpack(data)
+
+    def iter_unpack(self, buf):
+        """Tuples for a packed table of these structures (len(buf) must be a multiple of size)"""
+        return self.struct.iter_unpack(buf)
+
+    def pack(self, *values):
+        return self.struct.pack(*values)
+
+    def view(self, buf, offset=0):
+        """Lazy record over buf (bytes, bytearray, mmap or memoryview)"""
+        self._check(buf, offset)
+        if not isinstance(buf, memoryview):
+            buf = memoryview(buf)
+        return self._view_class(buf, offset)
+
+    def array(self, buf, offset, count):
+        """Lazy records for count consecutive structures starting at offset"""
+        if count <= 0:
+            return []
+        self._check(buf, offset + self.size * (count - 1))
+        if not isinstance(buf, memoryview):
+            buf = memoryview(buf)
+        return [self._view_class(buf, offset + i * self.size) for i in range(count)]
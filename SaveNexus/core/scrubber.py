@@ -0,0 +1,331 @@
+"""
+Save integrity scrubber
+
+Re-reads every save and save state in the scanners' directories, hashes it
+(core.checksum.hash_file) and compares it with the checksum recorded the
+last time. The manifest lives in INTEGRITY_PATH (a JsonStore):
+
+    {
+        "files": {path: {"sha256", "size", "mtime", "verified", "status"}},
+        "cursor": last path checked in an unfinished pass, or null,
+        "passes": completed passes,
+        "last_pass": when the last pass finished
+    }
+
+A file whose modification time changed was saved by the emulator, so its
+new checksum is simply recorded. A file whose content changed while its
+modification time and size did not is flagged "corrupt" (bit rot, a bad
+sector, a broken copy); the recorded checksum is kept until the change is
+accepted with accept().
+
+The scrubber runs on a background thread at idle CPU and I/O priority,
+reads through a token bucket capped at max_mb_per_second, and saves its
+cursor as it goes, so a pass interrupted by a restart picks up where it
+stopped. Settings live in the config under "integrity":
+    {"enabled": false, "interval_hours": 24, "max_mb_per_second": 10}
+Scheduled passes only run once "enabled" is true; until then a pass runs
+only when asked for (trigger(), POST /api/integrity/run).
+"""
+
+import bisect
+import os
+import threading
+import time
+
+from core.checksum import hash_file
+from core.config import load_config
+from core.metrics import Counter
+from core.priority import lower_thread_priority
+from core.store import open_store
+
+INTEGRITY_PATH = os.path.join(os.path.expanduser("~"), ".savetranslator_integrity.json")
+
+DEFAULT_INTERVAL_HOURS = 24
+DEFAULT_MAX_MB_PER_SECOND = 10
+# Files written this recently may be in the middle of a save; they're checked next pass
+SETTLE_SECONDS = 60
+# Progress is written to the manifest after this many files or seconds
+FLUSH_EVERY_FILES = 100
+FLUSH_EVERY_SECONDS = 30
+
+STATUS_OK = "ok"
+STATUS_CORRUPT = "corrupt"
+
+SCRUBBED_FILES = Counter(
+    'savenexus_scrub_files_total', 'Files checked by the integrity scrubber', ['result']
+)
+SCRUBBED_BYTES = Counter('savenexus_scrub_bytes_total', 'Bytes hashed by the integrity scrubber')
+
+
+def integrity_settings(config=None):
+    if config is None:
+        config = load_config()
+    return config.get("integrity", {})
+
+def list_files(directories):
+    """Every file under the given directories, sorted"""
+    paths = []
+    for directory in directories:
+        if not directory:
+            continue
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in files)
+    paths.sort()
+    return paths
+
+
+class TokenBucket:
+    """Rate limiter: consume(n) returns once n tokens (bytes) are available"""
+
+    def __init__(self, rate, capacity=None, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self._sleep = sleep
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        if not self.rate or self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going into debt lets a request bigger than the bucket through, followed by a wait
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            self._sleep(wait)
+
+
+class IntegrityScrubber:
+    """Background thread that re-verifies saves and states against recorded checksums"""
+
+    def __init__(self, directories_getter, path=INTEGRITY_PATH):
+        self._directories = directories_getter
+        self.store = open_store(path, "integrity")
+        self.running = False
+        self.progress = None
+        self._files = None  # path -> manifest entry; the scrubber's working copy
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='integrity-scrubber', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self):
+        """Start a pass now (or resume an interrupted one) instead of waiting for the schedule"""
+        # A pass already running covers the request; waking would queue a second full pass
+        if not self.running:
+            self._wake.set()
+
+    def _load(self):
+        with self._lock:
+            if self._files is None:
+                self._files = self.store.copy().get("files", {})
+            return self._files
+
+    def _seconds_until_due(self, settings):
+        if self.store.get("cursor"):
+            return 0  # an interrupted pass
+        last_pass = self.store.get("last_pass")
+        if last_pass is None:
+            return 0
+        interval = settings.get("interval_hours", DEFAULT_INTERVAL_HOURS) * 3600
+        return max(0, last_pass + interval - time.time())
+
+    def _loop(self):
+        lower_thread_priority()
+        while not self._stop.is_set():
+            settings = integrity_settings()
+            forced = self._wake.is_set()
+            self._wake.clear()
+            enabled = settings.get("enabled", False)
+            if forced or (enabled and self._seconds_until_due(settings) == 0):
+                try:
+                    self.scrub(settings)
+                except Exception as e:
+                    print(f"Error checking save integrity: {e}")
+            # Re-read the settings at least hourly so schedule changes apply
+            wait = self._seconds_until_due(settings) if enabled else 3600
+            self._wake.wait(min(max(wait, 1), 3600))
+
+    def scrub(self, settings=None):
+        """
+        Run (or resume) one pass over every file
+
+        Returns:
+            True if the pass finished, False if it was stopped partway
+        """
+        if settings is None:
+            settings = integrity_settings()
+        rate = settings.get("max_mb_per_second", DEFAULT_MAX_MB_PER_SECOND) * 1024 * 1024
+        bucket = TokenBucket(rate, sleep=self._stop.wait)
+
+        files = self._load()
+        paths = list_files(self._directories())
+        cursor = self.store.get("cursor")
+        start = bisect.bisect_right(paths, cursor) if cursor else 0
+
+        self.running = True
+        self.progress = {
+            'started': time.time(),
+            'files': len(paths),
+            'checked': start,
+            'bytes': 0,
+            'current': None
+        }
+        pending = {}
+        last_flush = time.monotonic()
+        try:
+            for path in paths[start:]:
+                if self._stop.is_set():
+                    break
+                self.progress['current'] = path
+                entry = self._check(path, bucket)
+                if self._stop.is_set():
+                    break
+                if entry is not None:
+                    pending[path] = entry
+                cursor = path
+                self.progress['checked'] += 1
+
+                if len(pending) >= FLUSH_EVERY_FILES or time.monotonic() - last_flush > FLUSH_EVERY_SECONDS:
+                    self.store.patch({"files": pending, "cursor": cursor})
+                    pending = {}
+                    last_flush = time.monotonic()
+            else:
+                # Finished: forget files that no longer exist
+                present = set(paths)
+                with self._lock:
+                    for path in [p for p in files if p not in present]:
+                        del files[path]
+                        pending[path] = None
+                self.store.patch({
+                    "files": pending,
+                    "cursor": None,
+                    "passes": self.store.get("passes", 0) + 1,
+                    "last_pass": time.time()
+                })
+                return True
+
+            self.store.patch({"files": pending, "cursor": cursor})
+            return False
+        finally:
+            self.running = False
+            self.progress['current'] = None
+
+    def _check(self, path, bucket):
+        """Hash one file and compare it with its manifest entry; returns the new entry or None"""
+        try:
+            st = os.stat(path)
+            if time.time() - st.st_mtime < SETTLE_SECONDS:
+                SCRUBBED_FILES.labels('skipped').inc()
+                return None
+            digest = hash_file(path, bucket.consume, self._stop.is_set)
+            after = os.stat(path)
+        except OSError as e:
+            print(f"Error checking {path}: {e}")
+            SCRUBBED_FILES.labels('error').inc()
+            return None
+        if digest is None:
+            return None
+        if (after.st_mtime_ns, after.st_size) != (st.st_mtime_ns, st.st_size):
+            # Saved while we were reading it
+            SCRUBBED_FILES.labels('skipped').inc()
+            return None
+
+        SCRUBBED_BYTES.inc(st.st_size)
+        self.progress['bytes'] += st.st_size
+        now = time.time()
+        entry = {
+            "sha256": digest,
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "verified": now,
+            "status": STATUS_OK
+        }
+
+        with self._lock:
+            recorded = self._files.get(path)
+            if recorded is None:
+                result = 'new'
+            elif recorded["mtime"] != st.st_mtime_ns:
+                result = 'updated'
+            elif recorded["sha256"] == digest and recorded["size"] == st.st_size:
+                result = 'ok'
+            else:
+                result = 'corrupt'
+                entry = dict(
+                    recorded,
+                    status=STATUS_CORRUPT,
+                    actual_sha256=digest,
+                    actual_size=st.st_size,
+                    detected=recorded.get("detected") or now,
+                    verified=now
+                )
+            self._files[path] = entry
+        SCRUBBED_FILES.labels(result).inc()
+        return entry
+
+    def issues(self):
+        """Manifest entries of files flagged as corrupt"""
+        files = self._load()
+        with self._lock:
+            return [
+                dict(entry, path=path) for path, entry in files.items()
+                if entry.get("status") != STATUS_OK
+            ]
+
+    def accept(self, paths):
+        """
+        Record the current content of flagged files as correct
+
+        Returns:
+            Paths that were flagged and are now accepted
+        """
+        files = self._load()
+        accepted = {}
+        with self._lock:
+            for path in paths:
+                entry = files.get(path)
+                if not entry or entry.get("status") == STATUS_OK:
+                    continue
+                entry = {
+                    "sha256": entry["actual_sha256"],
+                    "size": entry["actual_size"],
+                    "mtime": entry["mtime"],
+                    "verified": entry["verified"],
+                    "status": STATUS_OK
+                }
+                files[path] = entry
+                accepted[path] = entry
+        if accepted:
+            # A merge patch replaces nested objects key by key; null out the corruption fields
+            self.store.patch({"files": {
+                path: dict(entry, actual_sha256=None, actual_size=None, detected=None)
+                for path, entry in accepted.items()
+            }})
+        return list(accepted)
+
+    def report(self):
+        return {
+            'settings': integrity_settings(),
+            'running': self.running,
+            'progress': dict(self.progress) if self.progress else None,
+            'cursor': self.store.get("cursor"),
+            'passes': self.store.get("passes", 0),
+            'last_pass': self.store.get("last_pass"),
+            'files': len(self._load()),
+            'issues': self.issues()
+        }
@@ -0,0 +1,424 @@
+"""
+Journaled JSON store
+
+Keeps a JSON object file (game_map.json, the config file) in memory and
+applies edits as JSON merge patches (RFC 7386). A patch is appended to
+<file>.journal and fsynced; the file itself is only rewritten when the
+journal is compacted (every COMPACT_EVERY patches, on replace() and at
+exit). Both the file and the journal are replaced atomically (temp file,
+fsync, os.replace), so a crash leaves either the old or the new version.
+
+Each change bumps a version number, exposed as an ETag. patch() and
+replace() take an optional if_match and raise PreconditionFailed when
+another writer got there first.
+
+Replaying merge patches onto a state that already contains them gives the
+same state, so a crash between rewriting the file and resetting the
+journal is harmless. A torn last journal line (a crash mid-append) is
+ignored and cut off before the next append.
+
+Several processes (the desktop app, the daemon, the CLI) can share a
+store: appends, replays and compactions hold an exclusive lock on
+<file>.lock, and a store notices another process's changes by the file's
+and the journal's size and mtime. If the file is edited by hand while the
+store is loaded, it is reloaded and the pending journal is replayed on top
+of it. Reads never write; the journal is only folded into the file by
+writers.
+"""
+
+import atexit
+import copy
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from threading import Lock
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from core.metrics import cache_counters
+
+COMPACT_EVERY = 64
+
+
+class PreconditionFailed(Exception):
+    """The caller's version doesn't match the store's current version"""
+
+    def __init__(self, etag):
+        super().__init__(f"Version mismatch, current version is {etag}")
+        self.etag = etag
+
+
+def apply_merge_patch(target, patch):
+    """Apply a JSON merge patch to the dict target in place and return it"""
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict):
+            current = target.get(key)
+            if not isinstance(current, dict):
+                current = target[key] = {}
+            apply_merge_patch(current, value)
+        else:
+            target[key] = copy.deepcopy(value)
+    return target
+
+def _fsync_directory(path):
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return  # Not possible on Windows; os.replace is still atomic there
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write(path, text, mode="w"):
+    """Write text to path via a synced temp file and os.replace"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(path)
+
+def atomic_write_bytes(path, data):
+    """Binary atomic_write"""
+    atomic_write(path, data, "wb")
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        # Blocks for up to 10 seconds, then raises OSError
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class JsonStore:
+    """A JSON object file with journaled merge-patch updates"""
+
+    def __init__(self, path, name=None, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.compact_every = compact_every
+        self._lock = Lock()
+        self._sync_lock = Lock()
+        self._data = {}
+        self._version = 0
+        self._base_version = 0
+        self._pending = []  # patches in the journal but not yet in the file
+        self._signature = None
+        self._loaded = False
+        self._journal = None
+        self._journal_offset = 0  # end of the last complete journal line
+        self._lock_handle = None
+        self._lock_depth = 0
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._hit, self._miss = cache_counters(name or os.path.basename(path))
+
+    # ===== Inter-process lock =====
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared with other processes using the store (thread lock held)"""
+        if self._lock_depth == 0:
+            if self._lock_handle is None:
+                self._lock_handle = open(self.lock_path, "a+")
+            _lock_file(self._lock_handle)
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                _unlock_file(self._lock_handle)
+
+    # ===== Loading =====
+
+    def _stat_signature(self):
+        return (_stat(self.path), _stat(self.journal_path))
+
+    def _read_file(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        if not isinstance(data, dict):
+            raise ValueError(f"{self.path} does not contain a JSON object")
+        return data
+
+    def _read_journal(self):
+        """
+        Journal contents, ignoring a torn last line
+
+        Returns:
+            (base version, [(version, patch), ...], offset after the last complete line)
+        """
+        base = 0
+        entries = []
+        offset = 0
+        try:
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    offset += len(line)
+                    if "base" in record:
+                        base = record["base"]
+                    else:
+                        entries.append((record["v"], record["patch"]))
+        except FileNotFoundError:
+            pass
+        return base, [(v, p) for v, p in entries if v > base], offset
+
+    def _ensure_current(self):
+        """Load on first use and reload if another process or a hand edit changed the store (lock held)"""
+        if self._loaded and self._stat_signature() == self._signature:
+            self._hit.inc()
+            return
+
+        self._miss.inc()
+        with self._file_lock():
+            signature = self._stat_signature()
+            data = self._read_file()
+            if self._loaded and signature[1] == self._signature[1]:
+                # Only the file changed: edited by hand. Keep the edit, and move to a new version
+                self._version += 1
+            else:
+                if self._journal is not None:
+                    # Another process may have replaced the journal
+                    self._journal.close()
+                    self._journal = None
+                base, entries, self._journal_offset = self._read_journal()
+                self._base_version = base
+                self._pending = [patch for _, patch in entries]
+                version = entries[-1][0] if entries else base
+                self._version = max(version, self._version)
+
+            for patch in self._pending:
+                apply_merge_patch(data, patch)
+            self._data = data
+            self._signature = signature
+            self._loaded = True
+
+    # ===== Journal =====
+
+    def _append(self, record):
+        """Append one journal line and flush it (file lock held); fsync is left to _sync"""
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a")
+            if self._journal.tell() != self._journal_offset:
+                # A torn line from a crash mid-append; later lines would be lost behind it
+                self._journal.truncate(self._journal_offset)
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+        self._journal_offset = self._journal.tell()
+        self._signature = self._stat_signature()
+
+    def _reset_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        text = json.dumps({"base": self._version}) + "\n"
+        atomic_write(self.journal_path, text)
+        self._journal_offset = len(text.encode())
+        self._base_version = self._version
+        self._pending = []
+
+    def _compact(self):
+        """Rewrite the file with the current data and start a fresh journal (lock held)"""
+        with self._file_lock():
+            atomic_write(self.path, json.dumps(self._data, indent=4))
+            self._reset_journal()
+            self._signature = self._stat_signature()
+
+    def _sync(self, seq):
+        """Group commit: one fsync covers every journal line written so far"""
+        with self._sync_lock:
+            if self._synced_seq >= seq:
+                return
+            with self._lock:
+                if self._journal is None:
+                    # Compacted meanwhile; the patch is already in the file
+                    self._synced_seq = max(self._synced_seq, seq)
+                    return
+                self._journal.flush()
+                fd = os.dup(self._journal.fileno())
+                target = self._written_seq
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._synced_seq = target
+
+    # ===== Public API =====
+
+    @property
+    def version(self):
+        with self._lock:
+            self._ensure_current()
+            return self._version
+
+    @property
+    def position(self):
+        """(version, journal offset) of the current data; changes with every edit, nothing is copied"""
+        with self._lock:
+            self._ensure_current()
+            return self._version, self._journal_offset
+
+    @property
+    def etag(self):
+        return f'"{self.version}"'
+
+    def _check(self, if_match):
+        if if_match is None:
+            return
+        current = f'"{self._version}"'
+        tags = {tag.strip() for tag in if_match.split(",")}
+        if "*" not in tags and current not in tags and str(self._version) not in tags:
+            raise PreconditionFailed(current)
+
+    def read(self):
+        """
+        Consistent copy of the data with its ETag
+
+        Returns:
+            (data, etag)
+        """
+        with self._lock:
+            self._ensure_current()
+            return copy.deepcopy(self._data), f'"{self._version}"'
+
+    def copy(self):
+        """Deep copy of the current data"""
+        return self.read()[0]
+
+    def get(self, key, default=None):
+        """One top-level value (not copied)"""
+        with self._lock:
+            self._ensure_current()
+            return self._data.get(key, default)
+
+    def patch(self, patch, if_match=None):
+        """
+        Apply a JSON merge patch
+
+        Returns:
+            New ETag
+        """
+        if not isinstance(patch, dict):
+            raise ValueError("A merge patch for a JSON object must be an object")
+
+        with self._lock, self._file_lock():
+            self._ensure_current()
+            self._check(if_match)
+            if not patch:
+                return f'"{self._version}"'
+
+            self._version += 1
+            apply_merge_patch(self._data, patch)
+            self._pending.append(patch)
+            etag = f'"{self._version}"'
+
+            if len(self._pending) >= self.compact_every:
+                self._compact()
+                return etag
+
+            self._append({"v": self._version, "patch": patch})
+            self._written_seq += 1
+            seq = self._written_seq
+
+        self._sync(seq)
+        return etag
+
+    def replace(self, data, if_match=None):
+        """
+        Replace the whole object
+
+        Returns:
+            New ETag
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Store data must be a JSON object")
+
+        with self._lock, self._file_lock():
+            self._ensure_current()
+            self._check(if_match)
+            self._version += 1
+            self._data = copy.deepcopy(data)
+            self._compact()
+            return f'"{self._version}"'
+
+    def compact(self):
+        """Fold the journal into the file now"""
+        with self._lock:
+            if not self._loaded:
+                return
+            with self._file_lock():
+                self._ensure_current()
+                if self._pending or self._version != self._base_version:
+                    self._compact()
+
+    def close(self):
+        self.compact()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._lock_handle is not None:
+                self._lock_handle.close()
+                self._lock_handle = None
+
+
+_stores = []
+
+def open_store(path, name=None):
+    """Create a JsonStore that is compacted when the process exits"""
+    store = JsonStore(path, name)
+    _stores.append(store)
+    return store
+
+@atexit.register
+def _close_stores():
+    for store in _stores:
+        try:
+            store.close()
+        except Exception as e:
+            print(f"Error saving {store.path}: {e}")
@@ -1,135 +1,293 @@
+import hmac
 import json
 import os
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from threading import Thread
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from threading import Lock, Thread, get_ident
+import time
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from core.launcher import launch_ppsspp
-from core.game_map import get_iso_for_disc_id, load_game_map
-from core.psp_sfo_parser import parse_param_sfo
-from core.config import get_ppsspp_path
+from core.game_map import get_iso_for_disc_id, patch_game_map, read_game_map, save_game_map
+from core.config import config_position, get_ppsspp_path, load_config, patch_config, read_config, save_config
+from core.store import PreconditionFailed, apply_merge_patch
+from core.scanners import build_scanners
+from core.metrics import Counter, Gauge, Histogram, cache_counters, render_prometheus
+from core.savestate import describe_state
+from core.library import EPOCH, LibrarySnapshot, ScanCoordinator, SnapshotHistory, encode_library, save_folder
 
 app = Flask(__name__)
 CORS(app)  # Allow cross-origin requests from web dashboard
 
-# Default PSP save directory (configurable)
-PSP_SAVEDATA_DIR = os.path.expanduser("~/Documents/PPSSPP/PSP/SAVEDATA")
-PSP_SAVESTATE_DIR = os.path.expanduser("~/Documents/PPSSPP/PSP/SYSTEM/savestates")
+# ===== METRICS =====
+
+REQUEST_COUNT = Counter(
+    'savenexus_http_requests_total', 'HTTP requests by endpoint, method and status',
+    ('endpoint', 'method', 'status')
+)
+REQUEST_LATENCY = Histogram(
+    'savenexus_http_request_duration_seconds', 'HTTP request latency by endpoint', ('endpoint',)
+)
+SCAN_DURATION = Histogram(
+    'savenexus_scan_duration_seconds', 'Library scan duration by scanner', ('scanner',),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+SCAN_ENTRIES = Counter(
+    'savenexus_scan_entries_total', 'Save folders/files seen by scanners, parsed or skipped as unchanged',
+    ('scanner', 'result')
+)
+LAUNCHES = Counter('savenexus_launches_total', 'Game launches by result', ('result',))
+LIBRARY_GAMES = Gauge('savenexus_library_games', 'Games currently in the library')
+
+ICON_CACHE_SIZE = 512
+_icon_cache = OrderedDict()  # icon path -> (mtime, bytes)
+_icon_cache_lock = Lock()
+_ICON_HIT, _ICON_MISS = cache_counters('icon')
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+# ===== PROFILING =====
+
+# Created by the first /api/debug/profile call; until then the request hooks cost one check
+_request_profiler = None
+_request_profiler_lock = Lock()
+
+def get_request_profiler():
+    global _request_profiler
+    with _request_profiler_lock:
+        if _request_profiler is None:
+            from core.profiling import RequestProfiler
+            _request_profiler = RequestProfiler()
+        return _request_profiler
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1', '::ffff:127.0.0.1')
+LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+# Requests from other machines must carry the config's "agent_token" in this header
+TOKEN_HEADER = 'X-SaveNexus-Token'
+
+@app.before_request
+def _check_agent_token():
+    """Everything on the agent (launching, config, deletes, downloads) needs the token from off this machine"""
+    if request.remote_addr in LOCAL_ADDRESSES or request.method == 'OPTIONS':
+        return None
+    token = agent.agent_token()
+    supplied = request.headers.get(TOKEN_HEADER, '')
+    if not token or not hmac.compare_digest(supplied.encode(), str(token).encode()):
+        return jsonify({'error': 'Missing or wrong agent token'}), 401
+    return None
+
+@app.before_request
+def _start_request_profile():
+    profiler = _request_profiler
+    if profiler is not None and profiler.armed and not request.path.startswith('/api/debug/'):
+        profiler.start(get_ident())
+
+@app.teardown_request
+def _stop_request_profile(exc):
+    profiler = _request_profiler
+    if profiler is not None:
+        profiler.stop(get_ident(), f"{request.method} {request.full_path.rstrip('?')}")
+
+def localhost_only(view):
+    """Reject debug requests that don't come from this machine"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.remote_addr not in LOCAL_ADDRESSES:
+            return jsonify({'error': 'Debug endpoints are only available from localhost'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.after_request
+def _record_request(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.labels(endpoint).observe(time.perf_counter() - started)
+        REQUEST_COUNT.labels(endpoint, request.method, response.status_code).inc()
+    return response
 
 class LocalAgent:
     """Manages communication between web dashboard and local emulator"""
     
     def __init__(self):
-        self.games_cache = []
-        self.scan_saves()
+        # Replaced as a whole after every scan; handlers read it without locking
+        self.snapshot = LibrarySnapshot()
+        # Settings given on the command line; they win over the config file
+        self.overrides = {}
+        self._token = None  # (config position, overrides, agent_token)
+        self._build_scanners()
+        # Scans (and anything else touching scanner state) run one at a time here
+        self.scans = ScanCoordinator(self._scan)
+        self.history = SnapshotHistory()
+        self.ready = False
+        self.initial_scan_seconds = None
+        self._initial_scan = None
     
-    def scan_saves(self):
-        """Scan PSP save directories and build game library"""
-        games = []
-        
-        if not os.path.exists(PSP_SAVEDATA_DIR):
-            return games
-        
-        for folder in os.listdir(PSP_SAVEDATA_DIR):
-            folder_path = os.path.join(PSP_SAVEDATA_DIR, folder)
-            if not os.path.isdir(folder_path):
-                continue
-            
-            param_path = os.path.join(folder_path, "PARAM.SFO")
-            icon_path = os.path.join(folder_path, "ICON0.PNG")
-            
-            if os.path.exists(param_path):
-                game_info = self._parse_game_info(param_path, folder, icon_path)
-                if game_info:
-                    # Check for save states
-                    game_info['save_states'] = self._get_save_states(game_info['disc_id'])
-                    games.append(game_info)
+    def config(self):
+        """The config with the overrides merged over it"""
+        return apply_merge_patch(load_config(), self.overrides)
+
+    def agent_token(self):
+        """The configured agent_token; the config is only copied again after it changes"""
+        position = config_position()
+        cached = self._token
+        if cached is None or cached[0] != position or cached[1] is not self.overrides:
+            cached = self._token = (position, self.overrides, self.config().get('agent_token'))
+        return cached[2]
+    
+    def _build_scanners(self):
+        self.scanners = build_scanners(self.config())
+        # Threads are only started by the first scan, so an unused pool costs nothing
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self.scanners)), thread_name_prefix='scanner'
+        )
+    
+    def set_overrides(self, overrides):
+        """Replace the overrides (a config merge patch) before the first scan"""
+        self.overrides = overrides
+        self._build_scanners()
+    
+    def reload(self):
+        """
+        Pick up config changes: rebuild the scanners and rescan ISOs and saves
         
-        self.games_cache = games
-        return games
+        Runs on the scan thread, so it never overlaps a scan.
+        """
+        return self.scans.submit(self._reload)
     
-    def _parse_game_info(self, param_path, folder_name, icon_path):
-        """Extract game metadata from PARAM.SFO"""
+    def _reload(self):
+        print("Reloading configuration")
+        old_executor = self._executor
+        self._build_scanners()
+        old_executor.shutdown(wait=False)
+        self.scan_isos()
+        return self._scan()
+    
+    def start_initial_scan(self):
+        """Run the first ISO and save scan in the background"""
+        if self._initial_scan is None:
+            self._initial_scan = self.scans.submit(self._run_initial_scan)
+        return self._initial_scan
+    
+    def _run_initial_scan(self):
+        started = time.perf_counter()
         try:
-            with open(param_path, "rb") as f:
-                data = f.read()
-            
-            # Find PSF header
-            start = data.find(b'PSF\x01')
-            if start == -1:
-                return None
-            
-            data = data[start:]
-            import struct
-            
-            magic, version, key_table_start, data_table_start, entry_count = struct.unpack("<4sHHII", data[:16])
-            
-            entries = {}
-            for i in range(entry_count):
-                entry_base = 20 + i * 16
-                if entry_base + 16 > len(data):
-                    continue
-                    
-                kofs, dtype, dlen, dlen_total, dofs = struct.unpack("<HHIII", data[entry_base:entry_base+16])
-                
-                key_start = key_table_start + kofs
-                key_end = data.find(b'\x00', key_start)
-                key = data[key_start:key_end].decode('utf-8', errors='ignore')
-                
-                val_start = data_table_start + dofs
-                val_raw = data[val_start:val_start + dlen]
-                
-                if dtype == 0x0204:  # UTF-8 string
-                    value = val_raw.split(b'\x00')[0].decode('utf-8', errors='ignore')
-                elif dtype == 0x0404 and dlen == 4:
-                    value = struct.unpack("<I", val_raw)[0]
-                else:
-                    value = val_raw.hex()
-                
-                entries[key] = value
-            
-            # Extract disc ID from folder name
-            import re
-            disc_id_match = re.match(r"(ULUS|ULES|NPJH|NPUH|NPUG|UCUS|UCES|NPPA|NPEZ)[0-9]{5}", folder_name.upper())
-            disc_id = disc_id_match.group(0) if disc_id_match else folder_name
-            
-            return {
-                'disc_id': disc_id,
-                'title': entries.get('TITLE', 'Unknown Game'),
-                'save_title': entries.get('SAVEDATA_TITLE', ''),
-                'icon_path': icon_path if os.path.exists(icon_path) else None,
-                'save_path': os.path.dirname(param_path),
-                'has_iso': bool(get_iso_for_disc_id(disc_id))
-            }
-            
+            self.scan_isos()
+            self._scan()
         except Exception as e:
-            print(f"Error parsing {param_path}: {e}")
-            return None
+            print(f"Error during initial scan: {e}")
+        finally:
+            self.initial_scan_seconds = time.perf_counter() - started
+            self.ready = True
     
-    def _get_save_states(self, disc_id):
-        """Find save states for a game"""
-        save_states = []
-        
-        if not os.path.exists(PSP_SAVESTATE_DIR):
-            return save_states
+    def scan_isos(self):
+        """Map disc IDs to images found in the configured ISO directories"""
+        from core.iso_scanner import update_game_map
+        try:
+            return update_game_map(self.overrides.get("iso_dirs"))
+        except Exception as e:
+            print(f"Error scanning ISO directories: {e}")
+            return 0
+    
+    def scan_saves(self):
+        """Scan now (sharing a scan that hasn't started yet) and return the games found"""
+        return self.scans.request(fresh=True).result().games
+    
+    def refresh_in_background(self, max_age):
+        """Start a scan if the snapshot is older than max_age seconds and none is running"""
+        if self.ready and not self.scans.in_flight and self.snapshot.age() > max_age:
+            self.scans.request()
+    
+    def _scan(self):
+        """Run every emulator scanner concurrently and publish the merged games"""
+        futures = [self._executor.submit(self._run_scanner, scanner) for scanner in self.scanners]
         
-        # PPSSPP names save states like: ULUS10565_1.ppst
-        for file in os.listdir(PSP_SAVESTATE_DIR):
-            if file.startswith(disc_id) and file.endswith('.ppst'):
-                state_path = os.path.join(PSP_SAVESTATE_DIR, file)
-                save_states.append({
-                    'filename': file,
-                    'path': state_path,
-                    'modified': os.path.getmtime(state_path),
-                    'size': os.path.getsize(state_path)
-                })
+        games = []
+        for scanner, future in zip(self.scanners, futures):
+            try:
+                games.extend(future.result())
+            except Exception as e:
+                print(f"Error in {scanner.name} scanner: {e}")
         
-        return sorted(save_states, key=lambda x: x['modified'], reverse=True)
+        # A scan that found nothing new keeps the version (and the encoded
+        # JSON), so clients' deltas stay empty
+        if tuple(games) == self.snapshot.games:
+            snapshot = self.snapshot.rescanned()
+        else:
+            snapshot = LibrarySnapshot(games, self.snapshot.version + 1)
+            self.history.add(snapshot.version, snapshot.games)
+        self.snapshot = snapshot
+        return snapshot
+    
+    def find_game(self, disc_id):
+        return self.snapshot.by_id.get(disc_id)
+    
+    def savestate_dir(self):
+        """PPSSPP save state directory of the configured scanner, if any"""
+        scanner = next((s for s in self.scanners if s.name == 'ppsspp'), None)
+        return scanner.savestate_dir if scanner else None
+    
+    def data_dirs(self):
+        """Every directory the scanners read saves and states from"""
+        return [directory for scanner in self.scanners for directory in scanner.data_dirs()]
+    
+    def _run_scanner(self, scanner):
+        started = time.perf_counter()
+        games = scanner.scan()
+        SCAN_DURATION.labels(scanner.name).observe(time.perf_counter() - started)
+        SCAN_ENTRIES.labels(scanner.name, 'parsed').inc(scanner.last_stats['parsed'])
+        SCAN_ENTRIES.labels(scanner.name, 'skipped').inc(scanner.last_stats['skipped'])
+        return games
 
-# Initialize agent
+# Initialize agent (the first scan is started by run_server / start_local_agent_server)
 agent = LocalAgent()
+LIBRARY_GAMES.set_function(lambda: len(agent.snapshot))
+
+# ===== HOUSEKEEPING =====
+# Retention and the integrity scrubber are off by default: neither is
+# imported until it is enabled in the config or used through the API
+
+_retention_collector = None
+_integrity_scrubber = None
+_housekeeping_lock = Lock()
+
+def get_retention_collector():
+    global _retention_collector
+    with _housekeeping_lock:
+        if _retention_collector is None:
+            from core.retention import RetentionCollector
+            # Deleted states should drop out of the library without waiting for the next scan
+            _retention_collector = RetentionCollector(
+                agent.savestate_dir, on_deleted=lambda: agent.scans.request(fresh=True)
+            )
+        return _retention_collector
+
+def get_integrity_scrubber():
+    global _integrity_scrubber
+    with _housekeeping_lock:
+        if _integrity_scrubber is None:
+            from core.scrubber import IntegrityScrubber
+            _integrity_scrubber = IntegrityScrubber(agent.data_dirs)
+        return _integrity_scrubber
+
+def start_housekeeping(config):
+    """Start the background threads the config enables (each starts only once)"""
+    if config.get("retention", {}).get("enabled"):
+        get_retention_collector().start()
+    if config.get("integrity", {}).get("enabled"):
+        get_integrity_scrubber().start()
+
+def stop_housekeeping():
+    """Stop whichever background threads were created"""
+    for subsystem in (_integrity_scrubber, _retention_collector):
+        if subsystem is not None:
+            subsystem.stop()
 
 # ===== API ENDPOINTS =====
 
@@ -139,25 +297,104 @@ def get_status():
     return jsonify({
         'status': 'online',
         'ppsspp_configured': bool(get_ppsspp_path()),
-        'saves_found': len(agent.games_cache)
+        'saves_found': len(agent.snapshot),
+        'ready': agent.ready,
+        'initial_scan_seconds': agent.initial_scan_seconds
     })
 
+# /api/games answers from the current snapshot and rescans in the background
+# once it is older than this; ?fresh=1 waits for a new scan instead
+SNAPSHOT_MAX_AGE = 1.0
+
 @app.route('/api/games', methods=['GET'])
 def get_games():
-    """Get all available games with saves"""
-    agent.scan_saves()  # Refresh cache
-    return jsonify({
-        'games': agent.games_cache,
-        'total': len(agent.games_cache)
-    })
+    """
+    Get all available games with saves
+    
+    With ?since=<version>&epoch=<epoch> from an earlier response, only the
+    changes since that version are sent (see core.library.library_delta),
+    unless the version is too old, in which case everything is.
+    """
+    if agent.ready and request.args.get('fresh'):
+        agent.scan_saves()
+    else:
+        agent.refresh_in_background(SNAPSHOT_MAX_AGE)
+    
+    snapshot = agent.snapshot
+    fields = None
+    if 'since' in request.args:
+        fields = agent.history.delta(
+            request.args['since'], request.args.get('epoch'), snapshot.version, snapshot.games
+        )
+    if fields is None:
+        fields = {'version': snapshot.version, 'epoch': EPOCH}
+    fields.update(
+        total=len(snapshot),
+        scanned_at=snapshot.created,
+        scanning=agent.scans.in_flight,
+        ready=agent.ready
+    )
+    return Response(encode_library(snapshot, fields), mimetype='application/json')
 
 @app.route('/api/game/<disc_id>', methods=['GET'])
 def get_game_details(disc_id):
     """Get detailed info about a specific game"""
-    game = next((g for g in agent.games_cache if g['disc_id'] == disc_id), None)
+    game = agent.find_game(disc_id)
     if not game:
         return jsonify({'error': 'Game not found'}), 404
-    return jsonify(game)
+    return jsonify(_with_state_metadata(game))
+
+def _with_state_metadata(game):
+    """Game as a dict, with PPSSPP save state headers and thumbnails filled in"""
+    detailed = game.to_dict()
+    if game.emulator == 'ppsspp' and game.save_states:
+        detailed['save_states'] = [describe_state(state) for state in game.save_states]
+    return detailed
+
+@app.route('/api/games/batch', methods=['GET', 'POST'])
+def get_games_batch():
+    """
+    Details and save states for many games in one response
+    
+    POST {"disc_ids": [...], "folders": [...]} or GET ?ids=A,B&folders=X,Y,
+    where folders are save folder names (ULUS10565DATA00), see save_folder()
+    """
+    if request.method == 'POST':
+        data = request.json or {}
+        disc_ids = data.get('disc_ids', [])
+        folders = data.get('folders', [])
+    else:
+        disc_ids = [i for i in request.args.get('ids', '').split(',') if i]
+        folders = [f for f in request.args.get('folders', '').split(',') if f]
+    
+    if not isinstance(disc_ids, list) or not isinstance(folders, list):
+        return jsonify({'error': 'disc_ids and folders must be lists'}), 400
+    
+    snapshot = agent.snapshot
+    by_id = snapshot.by_id
+    by_folder = snapshot.by_folder
+    games = {}
+    missing = []
+    for disc_id in disc_ids:
+        game = by_id.get(disc_id)
+        if game:
+            games[disc_id] = _with_state_metadata(game)
+        else:
+            missing.append(disc_id)
+    
+    folder_games = {}
+    for folder in folders:
+        game = by_folder.get(folder)
+        if game:
+            folder_games[folder] = _with_state_metadata(game)
+        else:
+            missing.append(folder)
+    
+    return jsonify({
+        'games': games,
+        'folders': folder_games,
+        'missing': missing
+    })
 
 @app.route('/api/launch', methods=['POST'])
 def launch_game():
@@ -171,6 +408,7 @@ def launch_game():
     
     iso_path = get_iso_for_disc_id(disc_id)
     if not iso_path or not os.path.exists(iso_path):
+        LAUNCHES.labels('iso_missing').inc()
         return jsonify({'error': f'ISO not found for {disc_id}'}), 404
     
     try:
@@ -183,64 +421,390 @@ def launch_game():
         else:
             launch_ppsspp(iso_path)
         
+        LAUNCHES.labels('success').inc()
         return jsonify({
             'success': True,
             'message': f'Launched {disc_id}'
         })
     except Exception as e:
+        LAUNCHES.labels('failure').inc()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/config', methods=['GET', 'POST'])
-def manage_config():
-    """Get or update configuration"""
+def _versioned_document(read, replace, patch):
+    """
+    GET, POST (replace) and PATCH (JSON merge patch) for a JSON store
+    
+    Responses carry an ETag; writes honour If-Match and answer 412 with the
+    current ETag when the document changed since the client read it.
+    """
     if request.method == 'GET':
-        from core.config import load_config
-        return jsonify(load_config())
+        data, etag = read()
+        response = jsonify(data)
+        response.headers['ETag'] = etag
+        return response
     
-    elif request.method == 'POST':
-        from core.config import save_config
-        config = request.json
-        save_config(config)
-        return jsonify({'success': True})
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    
+    write = replace if request.method == 'POST' else patch
+    try:
+        etag = write(body, request.headers.get('If-Match'))
+    except PreconditionFailed as e:
+        response = jsonify({'error': 'Document was modified by someone else', 'etag': e.etag})
+        response.status_code = 412
+        response.headers['ETag'] = e.etag
+        return response
+    
+    response = jsonify({'success': True, 'etag': etag})
+    response.headers['ETag'] = etag
+    return response
 
-@app.route('/api/game-map', methods=['GET', 'POST'])
+@app.route('/api/config', methods=['GET', 'POST', 'PATCH'])
+def manage_config():
+    """Get, replace or patch configuration"""
+    response = _versioned_document(read_config, save_config, patch_config)
+    if request.method != 'GET':
+        start_housekeeping(agent.config())
+    return response
+
+@app.route('/api/game-map', methods=['GET', 'POST', 'PATCH'])
 def manage_game_map():
-    """Get or update game-to-ISO mappings"""
-    if request.method == 'GET':
-        return jsonify(load_game_map())
-    
-    elif request.method == 'POST':
-        import json
-        game_map_path = os.path.join(os.path.dirname(__file__), '..', 'game_map.json')
-        data = request.json
-        
-        with open(game_map_path, 'w') as f:
-            json.dump(data, f, indent=4)
-        
-        return jsonify({'success': True})
+    """Get, replace or patch game-to-ISO mappings"""
+    return _versioned_document(read_game_map, save_game_map, patch_game_map)
 
 @app.route('/api/icon/<disc_id>', methods=['GET'])
 def get_icon(disc_id):
     """Serve game icon image"""
-    game = next((g for g in agent.games_cache if g['disc_id'] == disc_id), None)
+    game = agent.find_game(disc_id)
     if not game or not game.get('icon_path'):
         return '', 404
     
+    icon_path = game['icon_path']
+    try:
+        mtime = os.stat(icon_path).st_mtime_ns
+    except OSError:
+        return '', 404
+    
+    with _icon_cache_lock:
+        cached = _icon_cache.get(icon_path)
+        if cached and cached[0] == mtime:
+            _icon_cache.move_to_end(icon_path)
+            _ICON_HIT.inc()
+            return Response(cached[1], mimetype='image/png')
+    
+    _ICON_MISS.inc()
+    with open(icon_path, 'rb') as f:
+        data = f.read()
+    with _icon_cache_lock:
+        _icon_cache[icon_path] = (mtime, data)
+        _icon_cache.move_to_end(icon_path)
+        while len(_icon_cache) > ICON_CACHE_SIZE:
+            _icon_cache.popitem(last=False)
+    return Response(data, mimetype='image/png')
+
+@app.route('/api/thumbnail/<disc_id>/<filename>', methods=['GET'])
+def get_state_thumbnail(disc_id, filename):
+    """Serve the screenshot PPSSPP saved with one of a game's save states"""
+    game = agent.find_game(disc_id)
+    state = next((s for s in (game or {}).get('save_states', []) if s['filename'] == filename), None)
+    if not state:
+        return '', 404
+    
+    thumbnail = describe_state(state)['thumbnail']
+    if not thumbnail:
+        return '', 404
+    
     from flask import send_file
-    return send_file(game['icon_path'], mimetype='image/png')
+    return send_file(thumbnail, max_age=3600)
 
 @app.route('/api/refresh', methods=['POST'])
 def refresh_library():
     """Manually refresh game library"""
-    agent.scan_saves()
+    isos_mapped = agent.scans.submit(agent.scan_isos).result()
+    games = agent.scan_saves()
     return jsonify({
         'success': True,
-        'games_found': len(agent.games_cache)
+        'games_found': len(games),
+        'isos_mapped': isos_mapped
     })
 
-def run_server(port=8765):
-    """Start the Flask server in a separate thread"""
-    app.run(host='127.0.0.1', port=port, debug=False, use_reloader=False)
+@app.route('/api/isos/scan', methods=['POST'])
+def scan_isos():
+    """Discover ISOs in the configured directories and update the game map"""
+    isos_mapped = agent.scans.submit(agent.scan_isos).result()
+    agent.scan_saves()  # Refresh has_iso flags
+    return jsonify({
+        'success': True,
+        'isos_mapped': isos_mapped
+    })
+
+@app.route('/api/retention', methods=['GET'])
+def get_retention():
+    """Retention settings, collector state and the last report"""
+    from core.retention import public_report, retention_settings
+    retention_collector = get_retention_collector()
+    return jsonify({
+        'settings': retention_settings(),
+        'running': retention_collector.running,
+        'last_run': retention_collector.last_run,
+        'last_report': public_report(retention_collector.last_report)
+    })
+
+@app.route('/api/retention/plan', methods=['POST'])
+def plan_save_state_retention():
+    """
+    Dry run: which save states retention would delete
+    
+    The body may hold retention settings to preview instead of the saved ones.
+    """
+    from core.retention import plan_retention, public_report
+    savestate_dir = agent.savestate_dir()
+    if not savestate_dir:
+        return jsonify({'error': 'PPSSPP scanner is disabled'}), 404
+    settings = request.get_json(silent=True) or None
+    return jsonify(public_report(plan_retention(savestate_dir, settings)))
+
+@app.route('/api/retention/run', methods=['POST'])
+def run_save_state_retention():
+    """Run the collector now (it only deletes when retention is enabled)"""
+    from core.retention import retention_settings
+    retention_collector = get_retention_collector()
+    retention_collector.start()
+    retention_collector.trigger()
+    return jsonify({'success': True, 'enabled': bool(retention_settings().get('enabled'))}), 202
+
+@app.route('/api/integrity', methods=['GET'])
+def get_integrity():
+    """Scrubber progress and the files whose content no longer matches their checksum"""
+    return jsonify(get_integrity_scrubber().report())
+
+@app.route('/api/integrity/run', methods=['POST'])
+def run_integrity_scrub():
+    """Start (or resume) a scrub pass now"""
+    integrity_scrubber = get_integrity_scrubber()
+    integrity_scrubber.start()
+    integrity_scrubber.trigger()
+    return jsonify({'success': True, 'running': integrity_scrubber.running}), 202
+
+@app.route('/api/integrity/accept', methods=['POST'])
+def accept_integrity_changes():
+    """Record the current content of flagged files as good: {"paths": [...]}"""
+    paths = (request.get_json(silent=True) or {}).get('paths')
+    if not isinstance(paths, list):
+        return jsonify({'error': 'paths must be a list'}), 400
+    return jsonify({'success': True, 'accepted': get_integrity_scrubber().accept(paths)})
+
+@app.route('/api/metadata', methods=['POST'])
+def edit_save_metadata():
+    """
+    Change PARAM.SFO values across PSP saves in one all-or-nothing batch
+    
+    POST {"disc_ids": [...] and/or "folders": [...], "changes": {"TITLE": "...", "PARENTAL_LEVEL": 1}};
+    folders are save folder names (ULUS10565DATA00), and a null value
+    removes the key.
+    """
+    from core.metadata_editor import MetadataEditError, apply_batch, check_changes
+    data = request.get_json(silent=True) or {}
+    changes = data.get('changes')
+    if not isinstance(changes, dict) or not changes:
+        return jsonify({'error': 'changes must be a non-empty object'}), 400
+    try:
+        check_changes(changes)
+    except MetadataEditError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    disc_ids = set(data.get('disc_ids') or [])
+    folders = set(data.get('folders') or [])
+    paths = [
+        os.path.join(game.save_path, 'PARAM.SFO') for game in agent.snapshot.games
+        if game.emulator == 'ppsspp' and (game.disc_id in disc_ids or save_folder(game.save_path) in folders)
+    ]
+    if not paths:
+        return jsonify({'error': 'No matching PSP saves'}), 404
+    
+    try:
+        summary = apply_batch(paths, changes)
+    except MetadataEditError as e:
+        return jsonify({'error': str(e)}), 409
+    agent.scans.request(fresh=True)  # Pick up new titles
+    return jsonify(dict(summary, success=True, files=len(paths)))
+
+@app.route('/api/export', methods=['GET'])
+def export_library():
+    """
+    Download saves and save states as a zip, streamed as it is built
+    
+    ?disc_id=ULUS10565 (repeatable or comma-separated) limits the export to
+    those games; without it the whole library is exported.
+    """
+    from core.export import export_zip
+    
+    wanted = {d for value in request.args.getlist('disc_id') for d in value.split(',') if d}
+    games = agent.snapshot.games
+    if wanted:
+        games = [game for game in games if game.disc_id in wanted]
+    if not games:
+        return jsonify({'error': 'No matching games'}), 404
+    
+    filename = time.strftime('savenexus-export-%Y%m%d-%H%M%S.zip')
+    return Response(export_zip(games), mimetype='application/zip', direct_passthrough=True, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Agent metrics in the Prometheus text exposition format"""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# ===== DEBUG ENDPOINTS (localhost only) =====
+
+@app.route('/api/debug/profile', methods=['GET', 'POST', 'DELETE'])
+@localhost_only
+def debug_profile():
+    """
+    Profile the next N requests with cProfile
+    
+    POST {"requests": N} arms the profiler, GET returns what has been
+    collected (?format=pstats|collapsed, &sort=cumulative, &limit=40),
+    DELETE discards it.
+    """
+    from core import profiling
+    request_profiler = get_request_profiler()
+    if request.method == 'POST':
+        count = (request.json or {}).get('requests', 1)
+        request_profiler.arm(count)
+        return jsonify({'success': True, 'remaining': request_profiler.remaining})
+    
+    if request.method == 'DELETE':
+        request_profiler.reset()
+        return jsonify({'success': True})
+    
+    output = request.args.get('format', 'pstats')
+    report = request_profiler.report(
+        output,
+        request.args.get('sort', profiling.DEFAULT_SORT),
+        request.args.get('limit', profiling.DEFAULT_LIMIT, type=int)
+    )
+    if report is not None and output == 'collapsed':
+        return Response(report, mimetype='text/plain')
+    return jsonify({
+        'remaining': request_profiler.remaining,
+        'profiled': request_profiler.profiled,
+        'report': report
+    })
+
+def _profile_scanners(scanners):
+    from core import profiling
+    timings = []
+    combined = None
+    for scanner in scanners:
+        try:
+            games, stats, elapsed = profiling.profile_call(scanner.scan)
+        except Exception as e:
+            timings.append({'scanner': scanner.name, 'error': str(e)})
+            continue
+        timings.append({
+            'scanner': scanner.name,
+            'seconds': elapsed,
+            'games': len(games),
+            'parsed': scanner.last_stats['parsed'],
+            'skipped': scanner.last_stats['skipped']
+        })
+        if combined is None:
+            combined = stats
+        else:
+            combined.add(stats)
+    return timings, combined
+
+@app.route('/api/debug/profile/scan', methods=['POST'])
+@localhost_only
+def debug_profile_scan():
+    """
+    Run one save scan under cProfile, scanner by scanner on one thread
+    
+    {"cold": true} uses fresh scanners so every save is parsed instead of
+    being served from the incremental index.
+    """
+    from core import profiling
+    options = request.json or {}
+    output = options.get('format', 'pstats')
+    
+    if options.get('cold'):
+        timings, combined = _profile_scanners(build_scanners(agent.config()))
+    else:
+        # The agent's scanners keep state, so don't run them beside a library scan
+        timings, combined = agent.scans.submit(_profile_scanners, agent.scanners).result()
+    
+    report = None
+    if combined is not None:
+        report = profiling.format_profile(
+            combined, output,
+            options.get('sort', profiling.DEFAULT_SORT), options.get('limit', profiling.DEFAULT_LIMIT)
+        )
+    return jsonify({'cold': bool(options.get('cold')), 'scanners': timings, 'report': report})
+
+@app.route('/api/debug/memory', methods=['GET', 'POST', 'DELETE'])
+@localhost_only
+def debug_memory():
+    """
+    tracemalloc snapshots
+    
+    POST {"name": "..."} takes a snapshot (tracing starts on the first one),
+    GET lists snapshots, or shows the top allocations of ?name=..., and
+    DELETE drops all snapshots and stops tracing.
+    """
+    from core import profiling
+    if request.method == 'POST':
+        return jsonify(profiling.take_snapshot((request.json or {}).get('name')))
+    
+    if request.method == 'DELETE':
+        profiling.clear_snapshots()
+        return jsonify({'success': True})
+    
+    name = request.args.get('name')
+    if not name:
+        return jsonify({'snapshots': profiling.list_snapshots()})
+    
+    top = profiling.top_allocations(
+        name, request.args.get('group', 'lineno'), request.args.get('limit', 25, type=int)
+    )
+    if top is None:
+        return jsonify({'error': f'No snapshot named {name}'}), 404
+    return jsonify({'name': name, 'top': top})
+
+@app.route('/api/debug/memory/diff', methods=['GET'])
+@localhost_only
+def debug_memory_diff():
+    """Largest allocation changes between ?from=<snapshot> and ?to=<snapshot>"""
+    from core import profiling
+    old = request.args.get('from')
+    new = request.args.get('to')
+    diff = profiling.diff_snapshots(
+        old, new, request.args.get('group', 'lineno'), request.args.get('limit', 25, type=int)
+    )
+    if diff is None:
+        return jsonify({'error': 'Both snapshots must exist'}), 404
+    return jsonify({'from': old, 'to': new, 'diff': diff})
+
+def run_server(port=8765, host=None):
+    """
+    Start the Flask server in a separate thread
+
+    The agent listens on 127.0.0.1 unless host (or the config's "agent_host")
+    says otherwise, e.g. "0.0.0.0" so a dashboard on another machine can
+    include this one in its "agents" list. Other addresses need an
+    "agent_token" in the config; requests from other machines must send it.
+    """
+    config = agent.config()
+    if host is None:
+        host = config.get("agent_host", "127.0.0.1")
+    if host not in LOOPBACK_HOSTS and not config.get("agent_token"):
+        print(f"Refusing to listen on {host} without an \"agent_token\" in the config; using 127.0.0.1")
+        host = "127.0.0.1"
+    agent.start_initial_scan()
+    start_housekeeping(config)
+    app.run(host=host, port=port, debug=False, use_reloader=False)
 
 def start_local_agent_server(port=8765):
     """Start server in background thread"""
@@ -1,4 +1,154 @@
-# Entry point for the Save Translator app
+"""
+Entry point for the Save Translator app
+
+Runs the local agent headless, without Qt, e.g. on a media server:
+
+    python main.py
+    python main.py --host 0.0.0.0 --port 9000 --iso-dir /mnt/isos
+    python main.py --ppsspp-savedata /srv/psp/SAVEDATA --mgba-dir /srv/gba --disable retroarch
+
+Directories given here take precedence over the config file for this run
+and are not saved to it. Send SIGHUP to re-read the config and rescan;
+SIGINT or SIGTERM stops the agent. The desktop app is enhanced_gui_app.py.
+
+The export command writes saves and states to a zip (see core/export.py)
+without starting the agent; directory options go before it:
+
+    python main.py export library.zip
+    python main.py --ppsspp-savedata /srv/psp/SAVEDATA export - --disc-id ULUS10565 > tactics.zip
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# (scanner, constructor argument) -> command-line option
+SCANNER_OPTIONS = {
+    ('ppsspp', 'savedata_dir'): 'ppsspp_savedata',
+    ('ppsspp', 'savestate_dir'): 'ppsspp_states',
+    ('retroarch', 'saves_dir'): 'retroarch_saves',
+    ('retroarch', 'states_dir'): 'retroarch_states',
+    ('mgba', 'save_dirs'): 'mgba_dirs',
+}
+
+
+def build_parser():
+    from core.scanners import SCANNER_TYPES
+
+    parser = argparse.ArgumentParser(description='SaveNexus headless agent')
+    parser.add_argument('--host', help='Address to listen on (default: the config\'s "agent_host", else 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--iso-dir', action='append', dest='iso_dirs', metavar='DIR',
+                        help='Directory of ISO/CSO images (repeatable)')
+    parser.add_argument('--ppsspp-savedata', metavar='DIR')
+    parser.add_argument('--ppsspp-states', metavar='DIR')
+    parser.add_argument('--retroarch-saves', metavar='DIR')
+    parser.add_argument('--retroarch-states', metavar='DIR')
+    parser.add_argument('--mgba-dir', action='append', dest='mgba_dirs', metavar='DIR',
+                        help='Directory of mGBA saves (repeatable)')
+    parser.add_argument('--disable', action='append', default=[], choices=sorted(SCANNER_TYPES),
+                        metavar='SCANNER', help=f'Turn a scanner off ({", ".join(sorted(SCANNER_TYPES))})')
+
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.add_parser('serve', help='Run the agent (the default)')
+    export_parser = commands.add_parser('export', help='Write saves and states to a zip file')
+    export_parser.add_argument('output', help='Zip file to write, or - for stdout')
+    export_parser.add_argument('--disc-id', action='append', dest='disc_ids', metavar='ID',
+                               help='Only export this game (repeatable)')
+    return parser
+
+def _absolute(value):
+    if isinstance(value, list):
+        return [os.path.abspath(v) for v in value]
+    return os.path.abspath(value)
+
+def config_overrides(args):
+    """Config merge patch for the settings given on the command line"""
+    scanners = {}
+    for (scanner, option), name in SCANNER_OPTIONS.items():
+        value = getattr(args, name)
+        if value:
+            scanners.setdefault(scanner, {})[option] = _absolute(value)
+    for scanner in args.disable:
+        scanners[scanner] = False
+
+    overrides = {}
+    if scanners:
+        overrides['scanners'] = scanners
+    if args.iso_dirs:
+        overrides['iso_dirs'] = _absolute(args.iso_dirs)
+    return overrides
+
+def serve(args):
+    # Flask and the agent's modules are only loaded once the arguments are known to be good
+    from gui import local_server
+
+    agent = local_server.agent
+    agent.set_overrides(config_overrides(args))
+
+    def reload(signum, frame):
+        # Nothing that writes to stdout here: the signal can arrive mid-print
+        agent.reload()
+
+    def stop(signum, frame):
+        local_server.stop_housekeeping()
+        raise SystemExit(0)
+
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, reload)
+    signal.signal(signal.SIGTERM, stop)
+
+    local_server.run_server(args.port, args.host)
+
+def export(args):
+    from core.config import load_config
+    from core.export import ExportError, write_export
+    from core.scanners import build_scanners
+    from core.store import apply_merge_patch
+
+    config = apply_merge_patch(load_config(), config_overrides(args))
+    games = [game for scanner in build_scanners(config) for game in scanner.scan()]
+    if args.disc_ids:
+        wanted = set(args.disc_ids)
+        games = [game for game in games if game['disc_id'] in wanted]
+    if not games:
+        print("No matching games", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    try:
+        if args.output == '-':
+            stats = write_export(games, sys.stdout.buffer)
+        else:
+            try:
+                with open(args.output, 'wb') as f:
+                    stats = write_export(games, f)
+            except BaseException:
+                # Don't leave half an archive behind
+                if os.path.exists(args.output):
+                    os.remove(args.output)
+                raise
+    except ExportError as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"Exported {len(games)} games ({stats['files']} files, {stats['bytes'] / 1e6:.1f} MB) "
+        f"in {elapsed:.1f}s" + (f"; skipped {stats['skipped']} unreadable files" if stats['skipped'] else ""),
+        file=sys.stderr
+    )
+    return 0
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'export':
+        return export(args)
+    return serve(args)
 
 if __name__ == '__main__':
-    print("Save Translator started.")
\ No newline at end of file
+    sys.exit(main())
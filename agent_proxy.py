@@ -0,0 +1,501 @@
+"""
+Caching reverse proxy from the web dashboard server to the local agent
+
+The local agent only listens on 127.0.0.1, so browsers on other devices
+can't reach it directly. flask_app_server.py forwards /api/* through an
+AgentProxy instead:
+  - requests reuse a small pool of keep-alive HTTP connections
+  - GET responses are cached for a short TTL
+  - concurrent misses for the same URL are coalesced into one agent request
+So any number of dashboard clients polling /api/games cost the agent one
+request per refresh window. Large downloads (STREAMED_PREFIXES) bypass all
+of that and are relayed chunk by chunk over their own connection.
+
+AgentFleet puts several agents (one per machine) behind one dashboard:
+status and library requests go to all of them concurrently with a
+per-agent timeout, and an agent that is slow or offline is shown from its
+last good answer instead of holding up the others.
+"""
+
+import http.client
+import json
+import os
+import posixpath
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import quote
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "SaveNexus"))
+
+from core.library import EPOCH, LibrarySnapshot, SnapshotHistory
+
+AGENT_HOST = os.environ.get("SAVENEXUS_AGENT_HOST", "127.0.0.1")
+AGENT_PORT = int(os.environ.get("SAVENEXUS_AGENT_PORT", "8765"))
+# Agents on other machines only answer requests carrying their "agent_token"
+TOKEN_HEADER = "X-SaveNexus-Token"
+
+POOL_SIZE = 8
+REQUEST_TIMEOUT = 10.0
+# How long a combined view waits for any one agent before using its last answer
+FAN_OUT_TIMEOUT = 2.0
+MAX_CACHE_ENTRIES = 1024
+
+# Seconds a GET response may be served from cache, by path prefix (first match wins)
+CACHE_TTLS = (
+    ("/api/icon/", 300.0),
+    ("/api/thumbnail/", 60.0),
+    ("/api/status", 1.0),
+    ("/api/games", 1.0),
+    ("/api/game/", 1.0),
+)
+
+# Paths that must never be reachable through the proxy
+BLOCKED_PREFIXES = ("/api/debug/",)
+
+# What the dashboard relays for anyone: (method, path, or a prefix ending in "/").
+# Everything else (config, retention, metadata edits, savedata) also needs the agent token.
+RELAYED_ENDPOINTS = (
+    ("GET", "/api/status"),
+    ("GET", "/api/games"),
+    ("GET", "/api/games/batch"),
+    ("POST", "/api/games/batch"),
+    ("GET", "/api/game/"),
+    ("GET", "/api/icon/"),
+    ("GET", "/api/thumbnail/"),
+    ("GET", "/api/export"),
+    ("POST", "/api/launch"),
+)
+
+# Responses relayed as they arrive instead of being read into memory (e.g. library exports)
+STREAMED_PREFIXES = ("/api/export",)
+STREAM_CHUNK_SIZE = 256 * 1024
+
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "content-length"
+}
+
+
+class AgentUnavailable(Exception):
+    pass
+
+
+def is_relayed(method, path):
+    """Whether the dashboard forwards this request without the agent token"""
+    # No "/api/game/../config" tricks
+    if posixpath.normpath(path) != path:
+        return False
+    for allowed_method, allowed in RELAYED_ENDPOINTS:
+        if method != allowed_method:
+            continue
+        if path == allowed or (allowed.endswith("/") and path.startswith(allowed)):
+            return True
+    return False
+
+
+class _Flight:
+    """One in-progress agent request that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AgentProxy:
+    """Forwards requests to one local agent over pooled keep-alive connections"""
+
+    def __init__(self, host=AGENT_HOST, port=AGENT_PORT, pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT, token=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.token = token
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._cache = {}  # url -> (expires, (status, headers, body))
+        self._flights = {}  # url -> _Flight
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'upstream': 0, 'errors': 0}
+
+    # ===== Connection pool =====
+
+    def _get_connection(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _put_connection(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _headers(self, headers=None):
+        headers = dict(headers or {})
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        return headers
+
+    def _send(self, method, url, body=None, headers=None):
+        """One request to the agent; retries once on a stale pooled connection"""
+        headers = self._headers(headers)
+        for attempt in range(2):
+            conn = self._get_connection()
+            reused = conn.sock is not None
+            try:
+                conn.request(method, url, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                # A kept-alive socket the agent already closed; try a fresh one
+                if reused and attempt == 0:
+                    continue
+                raise AgentUnavailable(str(e))
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._put_connection(conn)
+
+            with self._lock:
+                self.stats['upstream'] += 1
+            response_headers = [
+                (name, value) for name, value in response.getheaders()
+                if name.lower() not in HOP_BY_HOP_HEADERS
+            ]
+            return response.status, response_headers, data
+
+    # ===== Caching =====
+
+    @staticmethod
+    def cache_ttl(path):
+        for prefix, ttl in CACHE_TTLS:
+            if path.startswith(prefix):
+                return ttl
+        return 0
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, url, now):
+        entry = self._cache.get(url)
+        if entry and entry[0] > now:
+            return entry[1]
+        return None
+
+    def _store(self, url, ttl, result):
+        if len(self._cache) >= MAX_CACHE_ENTRIES:
+            now = time.monotonic()
+            for key in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+                del self._cache[key]
+            if len(self._cache) >= MAX_CACHE_ENTRIES:
+                self._cache.clear()
+        self._cache[url] = (time.monotonic() + ttl, result)
+
+    def get(self, path, query=""):
+        """
+        GET through the cache
+
+        Returns:
+            (status, headers, body, cache state: 'HIT', 'MISS', 'COALESCED' or 'BYPASS')
+        """
+        url = _url(path, query)
+        ttl = self.cache_ttl(path)
+        if ttl <= 0:
+            return self._send("GET", url) + ("BYPASS",)
+
+        with self._lock:
+            result = self._cached(url, time.monotonic())
+            if result is not None:
+                self.stats['hits'] += 1
+                return result + ("HIT",)
+            flight = self._flights.get(url)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[url] = flight
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait(self.timeout)
+            if flight.error is not None or flight.result is None:
+                raise AgentUnavailable(flight.error or "Timed out waiting for the agent")
+            return flight.result + ("COALESCED",)
+
+        try:
+            result = self._send("GET", url)
+            flight.result = result
+            if result[0] == 200:
+                with self._lock:
+                    self._store(url, ttl, result)
+            return result + ("MISS",)
+        except AgentUnavailable as e:
+            flight.error = str(e)
+            with self._lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(url, None)
+            flight.done.set()
+
+    def stream(self, method, path, query="", chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Forward a request without buffering or caching the response
+
+        Returns:
+            (status, headers, iterator over body chunks); the connection is
+            closed once the iterator is exhausted or closed
+        """
+        url = _url(path, query)
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, url, headers=self._headers())
+            response = conn.getresponse()
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            with self._lock:
+                self.stats['errors'] += 1
+            raise AgentUnavailable(str(e))
+
+        with self._lock:
+            self.stats['upstream'] += 1
+        response_headers = [
+            (name, value) for name, value in response.getheaders()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        ]
+
+        def body():
+            try:
+                while True:
+                    chunk = response.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                conn.close()
+
+        return response.status, response_headers, body()
+
+    def forward(self, method, path, query="", body=None, headers=None):
+        """Forward a request; GETs go through the cache, anything else invalidates it"""
+        if method == "GET":
+            return self.get(path, query)
+
+        url = _url(path, query)
+        try:
+            result = self._send(method, url, body, headers)
+        except AgentUnavailable:
+            with self._lock:
+                self.stats['errors'] += 1
+            raise
+        # Launches, refreshes and config changes can alter what GETs return
+        self.invalidate()
+        return result + ("BYPASS",)
+
+
+def _url(path, query=""):
+    """Request target for the agent; paths arrive decoded (spaces, non-ASCII disc IDs)"""
+    path = quote(path, safe='/')
+    return f"{path}?{query}" if query else path
+
+def configured_token():
+    """Token sent to every agent (SAVENEXUS_AGENT_TOKEN, else the config's agent_token)"""
+    token = os.environ.get("SAVENEXUS_AGENT_TOKEN")
+    if token is None:
+        from core.config import load_config
+        token = load_config().get("agent_token")
+    return token or None
+
+def configured_agents():
+    """
+    Agents to serve, as an ordered dict of machine name -> (host, port)
+
+    SAVENEXUS_AGENTS="desk=192.168.1.10:8765,laptop=192.168.1.20" takes
+    precedence over the "agents" config key ({"desk": "192.168.1.10:8765"}).
+    Without either, the single local agent is used.
+    """
+    spec = os.environ.get("SAVENEXUS_AGENTS")
+    if spec:
+        entries = [item.split("=", 1) for item in spec.split(",") if "=" in item]
+    else:
+        from core.config import load_config
+        entries = list(load_config().get("agents", {}).items())
+
+    agents = {}
+    for name, address in entries:
+        host, _, port = address.strip().partition(":")
+        agents[name.strip()] = (host, int(port or AGENT_PORT))
+    return agents or {"local": (AGENT_HOST, AGENT_PORT)}
+
+
+class AgentFleet:
+    """Fans dashboard requests out to several agents and merges the answers"""
+
+    def __init__(self, agents=None, timeout=FAN_OUT_TIMEOUT, token=None):
+        agents = agents if agents is not None else configured_agents()
+        token = token if token is not None else configured_token()
+        self.proxies = {name: AgentProxy(host, port, token=token) for name, (host, port) in agents.items()}
+        self.default = next(iter(self.proxies))
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(4, 2 * len(self.proxies)), thread_name_prefix='agent-fan-out'
+        )
+        self._lock = threading.Lock()
+        self._in_flight = {}  # (machine, path) -> future; one outstanding request per agent and path
+        self._last_good = {}  # (machine, path) -> (received, data, raw body)
+        self._merged = (None, LibrarySnapshot())  # (agent versions, merged library)
+        self.history = SnapshotHistory()
+
+    def _fetch(self, name, path):
+        started = time.monotonic()
+        status, _, body, _ = self.proxies[name].get(path)
+        if status != 200:
+            raise AgentUnavailable(f"HTTP {status}")
+
+        with self._lock:
+            last_good = self._last_good.get((name, path))
+        # A cache hit returns the same body object; don't parse it again
+        if last_good and last_good[2] is body:
+            data = last_good[1]
+        else:
+            data = json.loads(body)
+        with self._lock:
+            self._last_good[(name, path)] = (time.time(), data, body)
+        return data, (time.monotonic() - started) * 1000
+
+    def gather(self, path):
+        """
+        GET path from every agent at once
+
+        Returns:
+            machine -> {'online', 'stale', 'error', 'latency_ms', 'data'}; data
+            is the last good answer when the agent failed or timed out
+        """
+        futures = {}
+        with self._lock:
+            for name in self.proxies:
+                future = self._in_flight.get((name, path))
+                if future is None or future.done():
+                    future = self._executor.submit(self._fetch, name, path)
+                    self._in_flight[(name, path)] = future
+                futures[name] = future
+
+        wait(futures.values(), timeout=self.timeout)
+
+        results = {}
+        for name, future in futures.items():
+            result = {'online': False, 'stale': False, 'error': None, 'latency_ms': None, 'data': None}
+            if future.done() and future.exception() is None:
+                data, latency = future.result()
+                result.update(online=True, latency_ms=latency, data=data)
+            else:
+                result['error'] = str(future.exception()) if future.done() else 'timeout'
+                last_good = self._last_good.get((name, path))
+                if last_good:
+                    result.update(stale=True, data=last_good[1], last_seen=last_good[0])
+            results[name] = result
+        return results
+
+    @staticmethod
+    def _agent_summary(result):
+        return {key: value for key, value in result.items() if key != 'data'}
+
+    def status(self):
+        results = self.gather("/api/status")
+        agents = {}
+        saves_found = 0
+        for name, result in results.items():
+            summary = self._agent_summary(result)
+            if result['online'] and result['data']:
+                summary['ready'] = result['data'].get('ready')
+                saves_found += result['data'].get('saves_found', 0)
+            agents[name] = summary
+        online = sum(1 for result in results.values() if result['online'])
+        return {
+            'status': 'online' if online else 'offline',
+            'online': online,
+            'saves_found': saves_found,
+            'agents': agents
+        }
+
+    @staticmethod
+    def _library_version(result):
+        data = result['data']
+        if not data:
+            return None
+        if data.get('epoch') is not None and data.get('version') is not None:
+            return (data['epoch'], data['version'])
+        return id(data)
+
+    def games(self, since=None, epoch=None):
+        """
+        Every agent's library in one list; games carry 'machine' and a 'key' of machine/disc_id
+
+        The merged list has its own version; with since/epoch from an earlier
+        response only the changes are returned, as for a single agent.
+
+        Returns:
+            (LibrarySnapshot of the merged games, response fields) for
+            core.library.encode_library
+        """
+        results = self.gather("/api/games")
+
+        versions = tuple((name, self._library_version(result)) for name, result in results.items())
+        with self._lock:
+            cached_versions, snapshot = self._merged
+            if cached_versions != versions:
+                merged = []
+                for name, result in results.items():
+                    for game in (result['data'] or {}).get('games', []):
+                        game = dict(game, machine=name, key=f"{name}/{game['disc_id']}")
+                        merged.append(game)
+                if tuple(merged) != snapshot.games:
+                    snapshot = LibrarySnapshot(merged, snapshot.version + 1)
+                    self.history.add(snapshot.version, snapshot.games)
+                self._merged = (versions, snapshot)
+
+        agents = {}
+        for name, result in results.items():
+            summary = self._agent_summary(result)
+            if result['data']:
+                summary['total'] = result['data'].get('total', 0)
+                summary['version'] = result['data'].get('version')
+            agents[name] = summary
+
+        fields = None
+        if since is not None:
+            fields = self.history.delta(since, epoch, snapshot.version, snapshot.games)
+        if fields is None:
+            fields = {'version': snapshot.version, 'epoch': EPOCH}
+        fields.update(
+            total=len(snapshot),
+            ready=any((r['data'] or {}).get('ready') for r in results.values()),
+            agents=agents
+        )
+        return snapshot, fields
+
+    def machine_for_launch(self, disc_id, machine=None):
+        """Agent a launch should go to: the one asked for, else one that has the game's ISO"""
+        if machine:
+            return machine if machine in self.proxies else None
+        if len(self.proxies) == 1:
+            return self.default
+
+        candidates = []
+        with self._lock:
+            for (name, path), (_, data, _) in self._last_good.items():
+                if path != "/api/games":
+                    continue
+                for game in data.get('games', []):
+                    if game['disc_id'] == disc_id:
+                        candidates.append((not game.get('has_iso'), name != self.default, name))
+                        break
+        return min(candidates)[2] if candidates else self.default
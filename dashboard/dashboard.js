@@ -0,0 +1,387 @@
+// Proxied to the local agents by this server
+const API_BASE = '/api';
+let currentGame = null;
+let selectedSave = null;
+// Machine names are only shown when the dashboard spans several agents
+let multipleMachines = false;
+// Version of the library on screen, for asking the server only for changes
+let libraryVersion = null;
+let libraryEpoch = null;
+let loadingGames = false;
+
+async function checkAgentStatus() {
+    try {
+        const response = await fetch(`${API_BASE}/status`);
+        const data = await response.json();
+
+        const statusEl = document.getElementById('localAgentStatus');
+        const machines = Object.keys(data.agents || {}).length;
+        multipleMachines = machines > 1;
+        if (data.status === 'online') {
+            statusEl.textContent = multipleMachines
+                ? `Agents: ${data.online}/${machines} Online`
+                : 'Local Agent: Online';
+            statusEl.className = 'status-badge status-online';
+            loadGames();
+        } else {
+            statusEl.textContent = multipleMachines ? 'Agents: Offline' : 'Local Agent: Offline';
+            statusEl.className = 'status-badge status-offline';
+        }
+    } catch (error) {
+        document.getElementById('localAgentStatus').className = 'status-badge status-offline';
+        document.getElementById('loadingMessage').textContent = 
+            'Local agent offline. Please start the desktop app.';
+    }
+}
+
+async function loadGames() {
+    if (loadingGames) return;
+    loadingGames = true;
+    try {
+        const query = libraryVersion !== null
+            ? `?since=${libraryVersion}&epoch=${encodeURIComponent(libraryEpoch)}`
+            : '';
+        const response = await fetch(`${API_BASE}/games${query}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+        if (data.agents) multipleMachines = Object.keys(data.agents).length > 1;
+
+        const changed = data.version !== libraryVersion || data.epoch !== libraryEpoch;
+        const games = data.delta ? applyLibraryDelta(data) : data.games;
+        libraryVersion = data.version;
+        libraryEpoch = data.epoch;
+
+        document.getElementById('loadingMessage').style.display = 'none';
+        document.getElementById('gamesCount').textContent = `${games.length} Games`;
+
+        if (changed) {
+            displayGames(games);
+            saveLibrarySnapshot(games);
+        }
+    } catch (error) {
+        console.error('Error loading games:', error);
+    } finally {
+        loadingGames = false;
+    }
+}
+
+// Must match core.library.save_folder and game_identity
+function saveFolder(savePath) {
+    return savePath.replace(/\\/g, '/').replace(/\/+$/, '').split('/').pop();
+}
+
+function gameIdentity(game) {
+    const folder = saveFolder(game.save_path);
+    return game.machine ? `${game.machine}/${folder}` : folder;
+}
+
+function applyLibraryDelta(delta) {
+    const byIdentity = new Map(libraryGames.map(game => [gameIdentity(game), game]));
+    delta.removed.forEach(identity => byIdentity.delete(identity));
+    delta.changed.forEach(game => byIdentity.set(gameIdentity(game), game));
+    // Without an order the set of games is unchanged, and so is their order
+    const order = delta.order || libraryGames.map(gameIdentity);
+    return order.map(identity => byIdentity.get(identity)).filter(Boolean);
+}
+
+// ===== Offline library snapshot =====
+// The last library received is kept in IndexedDB and drawn before the
+// agent has answered; loadGames() then fetches only what changed since.
+const DB_NAME = 'savehub';
+const DB_STORE = 'library';
+const SNAPSHOT_KEY = 'snapshot';
+
+function openLibraryDb() {
+    return new Promise((resolve, reject) => {
+        if (!('indexedDB' in window)) {
+            reject(new Error('IndexedDB not available'));
+            return;
+        }
+        const open = indexedDB.open(DB_NAME, 1);
+        open.onupgradeneeded = () => open.result.createObjectStore(DB_STORE);
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+let libraryDb = null;
+
+function libraryStore(mode) {
+    libraryDb = libraryDb || openLibraryDb();
+    return libraryDb.then(db => db.transaction(DB_STORE, mode).objectStore(DB_STORE));
+}
+
+async function restoreLibrarySnapshot() {
+    try {
+        const store = await libraryStore('readonly');
+        const snapshot = await new Promise((resolve, reject) => {
+            const get = store.get(SNAPSHOT_KEY);
+            get.onsuccess = () => resolve(get.result);
+            get.onerror = () => reject(get.error);
+        });
+        // A live answer may have arrived first
+        if (!snapshot || libraryVersion !== null) return;
+
+        libraryVersion = snapshot.version;
+        libraryEpoch = snapshot.epoch;
+        multipleMachines = snapshot.multipleMachines;
+        document.getElementById('loadingMessage').style.display = 'none';
+        document.getElementById('gamesCount').textContent = `${snapshot.games.length} Games`;
+        displayGames(snapshot.games);
+    } catch (error) {
+        console.warn('No offline library snapshot:', error);
+    }
+}
+
+let snapshotTimer = null;
+
+function saveLibrarySnapshot(games) {
+    // Coalesce bursts of updates into one write
+    clearTimeout(snapshotTimer);
+    snapshotTimer = setTimeout(async () => {
+        try {
+            const store = await libraryStore('readwrite');
+            store.put({
+                version: libraryVersion,
+                epoch: libraryEpoch,
+                multipleMachines,
+                games,
+                saved: Date.now()
+            }, SNAPSHOT_KEY);
+        } catch (error) {
+            console.warn('Could not save library snapshot:', error);
+        }
+    }, 1000);
+}
+
+// ===== Game grid: keyed, virtualized rendering =====
+// Only the rows inside (or near) the viewport have DOM nodes. Cards
+// are keyed by disc_id and only rewritten when their data changes,
+// so a refresh that changes nothing touches nothing.
+const CARD_MIN_WIDTH = 280;
+const CARD_HEIGHT = 420;
+const GRID_GAP = 25;
+const OVERSCAN_ROWS = 2;
+
+let libraryGames = [];
+let libraryKeys = [];
+const cardsByKey = new Map();
+let renderQueued = false;
+
+const iconObserver = 'IntersectionObserver' in window
+    ? new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (!entry.isIntersecting) return;
+            const img = entry.target;
+            img.src = img.dataset.src;
+            iconObserver.unobserve(img);
+        });
+    }, { rootMargin: '200px' })
+    : null;
+
+function gameKey(game) {
+    return game.key || game.disc_id;
+}
+
+function agentPath(game, path) {
+    return game.machine
+        ? `${API_BASE}/agents/${encodeURIComponent(game.machine)}/${path}`
+        : `${API_BASE}/${path}`;
+}
+
+function cardSignature(game) {
+    const states = (game.save_states || []).slice(0, 3).map(s => s.filename).join('|');
+    return JSON.stringify([
+        game.title, game.disc_id, game.machine, multipleMachines, game.has_iso, !!game.icon_path, states
+    ]);
+}
+
+function createCard() {
+    const card = document.createElement('div');
+    card.className = 'game-card';
+    card.innerHTML = `
+        <div class="game-icon"></div>
+        <div class="game-info">
+            <div class="game-title"></div>
+            <div class="game-disc-id"></div>
+            <div class="save-states-list"></div>
+            <button class="launch-button"></button>
+        </div>
+    `;
+    const entry = {
+        el: card,
+        icon: card.querySelector('.game-icon'),
+        title: card.querySelector('.game-title'),
+        discId: card.querySelector('.game-disc-id'),
+        states: card.querySelector('.save-states-list'),
+        button: card.querySelector('.launch-button'),
+        game: null,
+        signature: null
+    };
+    card.onclick = () => openLaunchModal(entry.game);
+    return entry;
+}
+
+function releaseIcon(entry) {
+    const img = entry.icon.querySelector('img');
+    if (img && iconObserver) iconObserver.unobserve(img);
+}
+
+function updateCard(entry, game) {
+    entry.game = game;
+    const signature = cardSignature(game);
+    if (signature === entry.signature) return;
+    entry.signature = signature;
+
+    releaseIcon(entry);
+    entry.icon.textContent = '';
+    if (game.icon_path) {
+        const img = document.createElement('img');
+        img.alt = game.title;
+        img.dataset.src = agentPath(game, `icon/${encodeURIComponent(game.disc_id)}`);
+        entry.icon.appendChild(img);
+        if (iconObserver) {
+            iconObserver.observe(img);
+        } else {
+            img.src = img.dataset.src;
+        }
+    } else {
+        entry.icon.textContent = '🎮';
+    }
+
+    entry.title.textContent = game.title;
+    entry.discId.innerHTML = game.has_iso
+        ? ' • <span style="color: #10b981;">✓ ISO Mapped</span>'
+        : ' • <span style="color: #ef4444;">✗ No ISO</span>';
+    entry.discId.prepend(document.createTextNode(
+        multipleMachines && game.machine ? `${game.machine} • ${game.disc_id}` : game.disc_id
+    ));
+
+    entry.states.textContent = '';
+    (game.save_states || []).slice(0, 3).forEach(state => {
+        const item = document.createElement('div');
+        item.className = 'save-state-item';
+        item.textContent = `⚡ ${state.filename}`;
+        entry.states.appendChild(item);
+    });
+    entry.states.style.display = entry.states.childElementCount ? '' : 'none';
+
+    entry.button.disabled = !game.has_iso;
+    entry.button.textContent = game.has_iso ? '🎮 Launch' : '⚠️ No ISO';
+}
+
+function displayGames(games) {
+    const seen = new Map();
+    libraryGames = games;
+    libraryKeys = games.map(game => {
+        // Several save folders can share a disc_id; keep their keys distinct
+        const key = gameKey(game);
+        const count = seen.get(key) || 0;
+        seen.set(key, count + 1);
+        return count ? `${key}#${count}` : key;
+    });
+
+    const grid = document.getElementById('gameLibrary');
+    grid.style.display = games.length ? 'grid' : 'none';
+    document.getElementById('noGames').style.display = games.length ? 'none' : 'block';
+    renderVisibleRows();
+}
+
+function renderVisibleRows() {
+    renderQueued = false;
+    const grid = document.getElementById('gameLibrary');
+    if (!libraryGames.length) {
+        cardsByKey.forEach(entry => {
+            releaseIcon(entry);
+            entry.el.remove();
+        });
+        cardsByKey.clear();
+        return;
+    }
+
+    const columns = Math.max(1, Math.floor((grid.clientWidth + GRID_GAP) / (CARD_MIN_WIDTH + GRID_GAP)));
+    const rowStride = CARD_HEIGHT + GRID_GAP;
+    const totalRows = Math.ceil(libraryGames.length / columns);
+
+    const gridTop = grid.getBoundingClientRect().top;
+    const firstRow = Math.max(0, Math.floor(-gridTop / rowStride) - OVERSCAN_ROWS);
+    const lastRow = Math.min(totalRows, Math.ceil((window.innerHeight - gridTop) / rowStride) + OVERSCAN_ROWS);
+
+    grid.style.paddingTop = `${firstRow * rowStride}px`;
+    grid.style.paddingBottom = `${Math.max(0, totalRows - lastRow) * rowStride}px`;
+
+    const start = firstRow * columns;
+    const end = Math.min(libraryGames.length, Math.max(start, lastRow * columns));
+    const visible = new Set();
+
+    let cursor = grid.firstElementChild;
+    for (let i = start; i < end; i++) {
+        const key = libraryKeys[i];
+        visible.add(key);
+
+        let entry = cardsByKey.get(key);
+        if (!entry) {
+            entry = createCard();
+            cardsByKey.set(key, entry);
+        }
+        updateCard(entry, libraryGames[i]);
+
+        if (entry.el !== cursor) {
+            grid.insertBefore(entry.el, cursor);
+        } else {
+            cursor = cursor.nextElementSibling;
+        }
+    }
+
+    cardsByKey.forEach((entry, key) => {
+        if (!visible.has(key)) {
+            releaseIcon(entry);
+            entry.el.remove();
+            cardsByKey.delete(key);
+        }
+    });
+}
+
+function queueRender() {
+    if (renderQueued) return;
+    renderQueued = true;
+    requestAnimationFrame(renderVisibleRows);
+}
+
+window.addEventListener('scroll', queueRender, { passive: true });
+window.addEventListener('resize', queueRender);
+
+function openLaunchModal(game) {
+    currentGame = game;
+    document.getElementById('modalGameTitle').textContent = game.title;
+    document.getElementById('launchModal').classList.add('active');
+}
+
+function closeLaunchModal() {
+    document.getElementById('launchModal').classList.remove('active');
+}
+
+async function confirmLaunch() {
+    const response = await fetch(`${API_BASE}/launch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ disc_id: currentGame.disc_id, machine: currentGame.machine })
+    });
+
+    const result = await response.json();
+    alert(result.success ? 'Game launched!' : `Error: ${result.error}`);
+    closeLaunchModal();
+}
+
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('/sw.js').catch(error => {
+            console.warn('Service worker not registered:', error);
+        });
+    });
+}
+
+setInterval(checkAgentStatus, 5000);
+// Draw the saved library first, then ask only for what changed
+restoreLibrarySnapshot().then(loadGames);
+checkAgentStatus();
@@ -0,0 +1,83 @@
+// Service worker: keeps the dashboard shell (and game icons) available
+// without the network, so a reload renders immediately from cache.
+// The placeholders below are filled in by dashboard_assets.build_assets();
+// a new build changes this file, which installs a new shell cache.
+const SHELL_VERSION = '__SHELL_VERSION__';
+const SHELL_URLS = __SHELL_URLS__;
+const SHELL_CACHE = `savehub-shell-${SHELL_VERSION}`;
+const ICON_CACHE = 'savehub-icons';
+const MAX_ICONS = 500;
+
+const ICON_PATH = /^\/api\/(agents\/[^/]+\/)?icon\//;
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(SHELL_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(names
+                .filter(name => name.startsWith('savehub-shell-') && name !== SHELL_CACHE)
+                .map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (request.mode === 'navigate' && url.pathname === '/') {
+        event.respondWith(shellFirst(request));
+    } else if (url.pathname.startsWith('/assets/')) {
+        event.respondWith(cacheFirst(SHELL_CACHE, request));
+    } else if (ICON_PATH.test(url.pathname)) {
+        event.respondWith(cacheFirst(ICON_CACHE, request, MAX_ICONS));
+    }
+    // Everything else under /api goes to the network; the page keeps its
+    // own copy of the library in IndexedDB.
+});
+
+// The page from this shell's cache, falling back to the network. The copy
+// is refreshed in the background so the next load picks up a new index.html.
+async function shellFirst(request) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match('/');
+    const network = fetch(request).then(response => {
+        if (response.ok) cache.put('/', response.clone());
+        return response;
+    });
+    if (cached) {
+        network.catch(() => {});
+        return cached;
+    }
+    return network;
+}
+
+async function cacheFirst(cacheName, request, maxEntries) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+
+    const response = await fetch(request);
+    if (response.ok) {
+        await cache.put(request, response.clone());
+        if (maxEntries) trimCache(cache, maxEntries);
+    }
+    return response;
+}
+
+async function trimCache(cache, maxEntries) {
+    const keys = await cache.keys();
+    // Oldest entries come first
+    for (let i = 0; i < keys.length - maxEntries; i++) {
+        await cache.delete(keys[i]);
+    }
+}
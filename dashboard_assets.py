@@ -0,0 +1,173 @@
+"""
+Dashboard asset pipeline
+
+The dashboard's HTML, CSS and JS live in dashboard/. build_assets() reads
+them once, renames the CSS/JS to content-hashed names (dashboard.<hash>.js)
+and rewrites index.html to point at them, then keeps every file in memory
+pre-compressed with gzip (and brotli when the brotli package is installed).
+
+Hashed assets never change under the same URL, so they are served as
+immutable for a year; index.html is revalidated on every load and answered
+with 304 Not Modified while its ETag matches.
+
+sw.js, the service worker, is built with the list of shell URLs to cache
+and a version derived from them, and must be served from /sw.js so its
+scope covers the whole dashboard.
+
+Usage:
+    python dashboard_assets.py [--out dashboard/dist]   # write the built files
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DASHBOARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard")
+
+# Files referenced from index.html that get content-hashed names
+HASHED_FILES = ("dashboard.css", "dashboard.js")
+
+SERVICE_WORKER = "sw.js"
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+}
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Don't bother compressing tiny bodies
+MIN_COMPRESS_SIZE = 256
+
+
+class Asset:
+    """One built file with its precompressed variants"""
+
+    def __init__(self, name, body, cache_control):
+        self.name = name
+        self.content_type = CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {"identity": body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=11)
+
+    def etag(self, encoding):
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.digest}{suffix}"'
+
+    def choose_encoding(self, accept_encoding):
+        """Best precompressed variant the client accepts"""
+        accepted = set()
+        for part in (accept_encoding or "").split(","):
+            name, _, params = part.partition(";")
+            if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(name.strip().lower())
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def matches(self, if_none_match):
+        """True if If-None-Match names any variant of this asset"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        tags = {tag[2:] if tag.startswith("W/") else tag for tag in tags}
+        return any(self.etag(encoding) in tags for encoding in self.variants)
+
+
+def _read(name, source_dir):
+    with open(os.path.join(source_dir, name), "rb") as f:
+        return f.read()
+
+def hashed_name(name, body):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}"
+
+def build_assets(source_dir=DASHBOARD_DIR):
+    """
+    Build the dashboard
+
+    Returns:
+        dict of URL name -> Asset; "index.html", "sw.js" and the hashed CSS/JS names
+    """
+    assets = {}
+    index = _read("index.html", source_dir).decode("utf-8")
+
+    for name in HASHED_FILES:
+        body = _read(name, source_dir)
+        built_name = hashed_name(name, body)
+        assets[built_name] = Asset(built_name, body, IMMUTABLE_CACHE)
+        index = index.replace(f'"{name}"', f'"/assets/{built_name}"')
+
+    assets["index.html"] = Asset("index.html", index.encode("utf-8"), REVALIDATE_CACHE)
+
+    shell_urls = ["/"] + [f"/assets/{name}" for name in sorted(assets) if name != "index.html"]
+    shell_version = hashlib.sha256(
+        b"".join(assets[name].digest.encode("ascii") for name in sorted(assets))
+    ).hexdigest()[:12]
+    worker = _read(SERVICE_WORKER, source_dir).decode("utf-8")
+    worker = worker.replace("'__SHELL_VERSION__'", json.dumps(shell_version))
+    worker = worker.replace("__SHELL_URLS__", json.dumps(shell_urls))
+    assets[SERVICE_WORKER] = Asset(SERVICE_WORKER, worker.encode("utf-8"), REVALIDATE_CACHE)
+    return assets
+
+def asset_response(asset, request):
+    """
+    Flask response for an Asset honouring If-None-Match and Accept-Encoding
+    """
+    from flask import Response
+
+    encoding = asset.choose_encoding(request.headers.get("Accept-Encoding"))
+    headers = {
+        "Cache-Control": asset.cache_control,
+        "ETag": asset.etag(encoding),
+        "Vary": "Accept-Encoding",
+    }
+    if asset.matches(request.headers.get("If-None-Match")):
+        return Response(status=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(asset.variants[encoding], content_type=asset.content_type, headers=headers)
+
+def write_assets(assets, out_dir):
+    """Write built assets and their .gz/.br variants plus a manifest"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    for name, asset in assets.items():
+        suffixes = {"identity": "", "gzip": ".gz", "br": ".br"}
+        for encoding, body in asset.variants.items():
+            with open(os.path.join(out_dir, name + suffixes[encoding]), "wb") as f:
+                f.write(body)
+        manifest[name] = {
+            "etag": asset.digest,
+            "sizes": {encoding: len(body) for encoding, body in asset.variants.items()}
+        }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the SaveHub dashboard assets')
+    parser.add_argument('--source', default=DASHBOARD_DIR)
+    parser.add_argument('--out', default=os.path.join(DASHBOARD_DIR, 'dist'))
+    args = parser.parse_args()
+
+    manifest = write_assets(build_assets(args.source), args.out)
+    print(json.dumps(manifest, indent=4))
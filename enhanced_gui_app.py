@@ -6,29 +6,166 @@ Integrates HTTP server for web dashboard communication
 import os
 import re
 import sys
+from contextlib import nullcontext
+from datetime import datetime
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QFileDialog,
-    QComboBox, QHBoxLayout, QMessageBox, QListWidget, QListWidgetItem
+    QComboBox, QHBoxLayout, QMessageBox, QListView
+)
+from PyQt5.QtGui import QIcon, QPixmap
+from PyQt5.QtCore import (
+    Qt, QTimer, QAbstractListModel, QModelIndex, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
 )
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt, QTimer
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from core.detector import detect_format
-from core.identifier import extract_game_name
-from controller.converter import convert_save
-from core.psp_sfo_parser import parse_param_sfo
 from core.config import set_ppsspp_path, get_ppsspp_path
-from core.launcher import launch_ppsspp
-from core.game_map import get_iso_for_disc_id
 
-# Import local server
-try:
-    from gui.local_server import start_local_agent_server
-    SERVER_AVAILABLE = True
-except ImportError:
-    SERVER_AVAILABLE = False
-    print("Warning: Local server not available")
+# Everything else (Flask, the local server, parsers, converters, launcher) is
+# imported on first use so the window can appear before those modules load.
+
+THUMBNAIL_SIZE = QSize(96, 54)
+
+
+class SaveListModel(QAbstractListModel):
+    """List model for the selected game's save file and save states.
+    
+    Entries are dicts keyed by 'key'; apply_entries() reconciles the current
+    rows against a fresh listing with row-level inserts, moves, removes and
+    dataChanged, so the view keeps its selection and scroll position.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._thumbnails = {}  # (screenshot path, state mtime) -> QIcon
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        entry = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return entry['label']
+        if role == Qt.DecorationRole and entry.get('thumbnail'):
+            return self._thumbnail(entry['thumbnail'], entry.get('modified'))
+        if role == Qt.UserRole:
+            return entry
+        return None
+    
+    def _thumbnail(self, path, modified):
+        """Scaled screenshot icon, loaded once per state version"""
+        key = (path, modified)
+        icon = self._thumbnails.get(key)
+        if icon is None:
+            if len(self._thumbnails) > 256:
+                self._thumbnails.clear()
+            pixmap = QPixmap(path).scaled(THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            icon = QIcon(pixmap)
+            self._thumbnails[key] = icon
+        return icon
+    
+    def apply_entries(self, entries):
+        """Update the model in place to match entries"""
+        wanted = {entry['key'] for entry in entries}
+        
+        for row in reversed(range(len(self._rows))):
+            if self._rows[row]['key'] not in wanted:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                self.endRemoveRows()
+        
+        for row, entry in enumerate(entries):
+            if row < len(self._rows) and self._rows[row]['key'] == entry['key']:
+                self._update_row(row, entry)
+                continue
+            
+            current = next(
+                (r for r in range(row + 1, len(self._rows)) if self._rows[r]['key'] == entry['key']),
+                None
+            )
+            if current is None:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._rows.insert(row, entry)
+                self.endInsertRows()
+            else:
+                self.beginMoveRows(QModelIndex(), current, current, QModelIndex(), row)
+                self._rows.insert(row, self._rows.pop(current))
+                self.endMoveRows()
+                self._update_row(row, entry)
+    
+    def _update_row(self, row, entry):
+        if self._rows[row] != entry:
+            self._rows[row] = entry
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+
+class SaveScanSignals(QObject):
+    # generation, disc_id, entries
+    finished = pyqtSignal(int, str, list)
+
+
+class SaveScanTask(QRunnable):
+    """Lists a game's save states on a QThreadPool worker"""
+    
+    def __init__(self, generation, disc_id, savestate_dir=None):
+        super().__init__()
+        self.generation = generation
+        self.disc_id = disc_id
+        self.savestate_dir = savestate_dir
+        self.signals = SaveScanSignals()
+    
+    def run(self):
+        entries = [{
+            'key': f'save_file:{self.disc_id}',
+            'type': 'save_file',
+            'disc_id': self.disc_id,
+            'label': "💾 Main Save File (Resume from in-game save)"
+        }]
+        
+        savestate_dir = self.savestate_dir
+        if savestate_dir is None:
+            # Wherever the config's "scanners" -> "ppsspp" settings point, like the local agent
+            from core.scanners import configured_savestate_dir
+            savestate_dir = configured_savestate_dir()
+        
+        states = []
+        try:
+            # No directory when the PPSSPP scanner is disabled
+            with os.scandir(savestate_dir) if savestate_dir else nullcontext(()) as it:
+                for entry in it:
+                    if entry.name.startswith(self.disc_id) and entry.name.endswith('.ppst'):
+                        try:
+                            modified = entry.stat().st_mtime
+                        except OSError:
+                            continue
+                        states.append((modified, entry.name, entry.path))
+        except OSError:
+            pass
+        
+        from core.savestate import state_metadata
+        
+        for modified, name, path in sorted(states, reverse=True):
+            time_str = datetime.fromtimestamp(modified).strftime('%Y-%m-%d %H:%M:%S')
+            # Header and screenshot lookups are cached until the state changes
+            metadata = state_metadata.get(path, modified) or {}
+            header = metadata.get('header') or {}
+            label = f"⚡ Save State: {name} ({time_str})"
+            if header.get('version'):
+                label += f" - PPSSPP {header['version']}"
+            entries.append({
+                'key': f'save_state:{path}',
+                'type': 'save_state',
+                'path': path,
+                'modified': modified,
+                'thumbnail': metadata.get('thumbnail'),
+                'label': label
+            })
+        
+        self.signals.finished.emit(self.generation, self.disc_id, entries)
+
 
 class SaveTranslatorApp(QWidget):
     def __init__(self):
@@ -37,15 +174,16 @@ class SaveTranslatorApp(QWidget):
         self.setGeometry(100, 100, 800, 600)
         self.file_path = None
         self.disc_id = None
-        self.current_game_saves = []
-        
-        # Start local server for web dashboard
-        if SERVER_AVAILABLE:
-            start_local_agent_server(port=8765)
-            print("Web dashboard can connect at: http://127.0.0.1:8765")
+        self.saves_model = SaveListModel(self)
+        self.scan_generation = 0
+        self.scan_in_flight = False
+        self.thread_pool = QThreadPool.globalInstance()
         
         self.initUI()
         
+        # Start local server for web dashboard once the event loop is running
+        QTimer.singleShot(0, self.start_agent_server)
+        
         # Auto-refresh save states every 5 seconds
         self.refresh_timer = QTimer()
         self.refresh_timer.timeout.connect(self.auto_refresh_saves)
@@ -111,9 +249,12 @@ class SaveTranslatorApp(QWidget):
         saves_label.setStyleSheet("font-weight: bold; margin-top: 10px;")
         main_layout.addWidget(saves_label)
         
-        self.saves_list = QListWidget()
+        self.saves_list = QListView()
+        self.saves_list.setModel(self.saves_model)
+        self.saves_list.setUniformItemSizes(True)
+        self.saves_list.setIconSize(THUMBNAIL_SIZE)
         self.saves_list.setMinimumHeight(150)
-        self.saves_list.itemDoubleClicked.connect(self.launch_from_list)
+        self.saves_list.doubleClicked.connect(self.launch_from_list)
         main_layout.addWidget(self.saves_list)
         
         # ===== Launch Controls =====
@@ -157,6 +298,19 @@ class SaveTranslatorApp(QWidget):
         
         self.setLayout(main_layout)
 
+    def start_agent_server(self):
+        """Import and start the local agent API without blocking startup"""
+        try:
+            from gui.local_server import start_local_agent_server
+        except ImportError as e:
+            print(f"Warning: Local server not available: {e}")
+            self.server_status.setText("🌐 Web Dashboard: unavailable")
+            self.server_status.setStyleSheet("color: red; padding: 5px;")
+            return
+        
+        start_local_agent_server(port=8765)
+        print("Web dashboard can connect at: http://127.0.0.1:8765")
+
     def choose_file(self):
         """Select PSP save folder"""
         options = QFileDialog.Options()
@@ -168,6 +322,8 @@ class SaveTranslatorApp(QWidget):
             icon_path = os.path.join(file_path, "ICON0.PNG")
             
             if os.path.isfile(param_path):
+                from core.psp_sfo_parser import parse_param_sfo
+                
                 self.file_path = file_path
                 self.file_label.setText(f"Game: {os.path.basename(file_path)}")
                 
@@ -181,6 +337,9 @@ class SaveTranslatorApp(QWidget):
                     self.disc_id = match.group(0)
                 else:
                     self.disc_id = None
+                self.scan_generation += 1
+                if not self.disc_id:
+                    self.saves_model.apply_entries([])
                 
                 self.detect_label.setText(f"Format: PSP\n{game_name}")
                 self.status_label.setText("Status: Folder loaded")
@@ -200,36 +359,25 @@ class SaveTranslatorApp(QWidget):
         self.status_label.setText("Status: No valid save folder selected")
 
     def refresh_saves(self):
-        """Refresh list of save files and save states"""
-        if not self.disc_id:
+        """Refresh list of save files and save states in the background"""
+        if not self.disc_id or self.scan_in_flight:
+            return
+        
+        self.scan_in_flight = True
+        task = SaveScanTask(self.scan_generation, self.disc_id)
+        task.signals.finished.connect(self.on_saves_scanned)
+        self.thread_pool.start(task)
+    
+    def on_saves_scanned(self, generation, disc_id, entries):
+        """Apply a finished save listing (runs on the GUI thread)"""
+        self.scan_in_flight = False
+        if generation != self.scan_generation:
+            # The selected game changed while this scan was running
+            self.refresh_saves()
             return
         
-        self.saves_list.clear()
-        self.current_game_saves = []
-        
-        # Add main save file
-        save_item = QListWidgetItem(f"💾 Main Save File (Resume from in-game save)")
-        save_item.setData(Qt.UserRole, {'type': 'save_file', 'disc_id': self.disc_id})
-        self.saves_list.addItem(save_item)
-        self.current_game_saves.append({'type': 'save_file'})
-        
-        # Find save states
-        savestate_dir = os.path.expanduser("~/Documents/PPSSPP/PSP/SYSTEM/savestates")
-        if os.path.exists(savestate_dir):
-            for file in os.listdir(savestate_dir):
-                if file.startswith(self.disc_id) and file.endswith('.ppst'):
-                    state_path = os.path.join(savestate_dir, file)
-                    modified = os.path.getmtime(state_path)
-                    
-                    from datetime import datetime
-                    time_str = datetime.fromtimestamp(modified).strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    state_item = QListWidgetItem(f"⚡ Save State: {file} ({time_str})")
-                    state_item.setData(Qt.UserRole, {'type': 'save_state', 'path': state_path})
-                    self.saves_list.addItem(state_item)
-                    self.current_game_saves.append({'type': 'save_state', 'path': state_path})
-        
-        self.status_label.setText(f"Status: Found {len(self.current_game_saves)} save(s)")
+        self.saves_model.apply_entries(entries)
+        self.status_label.setText(f"Status: Found {len(entries)} save(s)")
 
     def auto_refresh_saves(self):
         """Auto-refresh if a game is selected"""
@@ -249,7 +397,7 @@ class SaveTranslatorApp(QWidget):
             self.status_label.setText(f"Status: PPSSPP path saved: {exe_path}")
             QMessageBox.information(self, "Success", f"PPSSPP path configured:\n{exe_path}")
 
-    def launch_from_list(self, item):
+    def launch_from_list(self, index):
         """Launch game when double-clicking a save in the list"""
         self.launch_game()
 
@@ -266,6 +414,9 @@ class SaveTranslatorApp(QWidget):
                 "Please set your PPSSPP executable path first")
             return
         
+        from core.game_map import get_iso_for_disc_id
+        from core.launcher import launch_ppsspp
+        
         # Get ISO path
         iso_path = get_iso_for_disc_id(self.disc_id)
         if not iso_path or not os.path.exists(iso_path):
@@ -275,11 +426,11 @@ class SaveTranslatorApp(QWidget):
             return
         
         # Check if a save state is selected
-        selected_item = self.saves_list.currentItem()
+        selected_index = self.saves_list.currentIndex()
         save_state_path = None
         
-        if selected_item:
-            data = selected_item.data(Qt.UserRole)
+        if selected_index.isValid():
+            data = selected_index.data(Qt.UserRole)
             if data and data.get('type') == 'save_state':
                 save_state_path = data.get('path')
         
@@ -312,6 +463,7 @@ class SaveTranslatorApp(QWidget):
             return
 
         try:
+            from controller.converter import convert_save
             output_path = convert_save(self.file_path, target)
             self.status_label.setText(f"Status: Saved to {output_path}")
             QMessageBox.information(self, "Conversion Complete", 
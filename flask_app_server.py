@@ -2,280 +2,144 @@
 Flask Web Application Server
 Serves the web dashboard at http://localhost:5000
 Run separately from the PyQt5 desktop app
-"""
-
-from flask import Flask, render_template_string, send_from_directory
-import os
-
-app = Flask(__name__)
 
-# HTML template (the web dashboard you created)
-DASHBOARD_HTML = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>SaveHub - Emulator Save Manager</title>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-        .container { max-width: 1400px; margin: 0 auto; }
-        header {
-            background: white;
-            padding: 30px;
-            border-radius: 15px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            margin-bottom: 30px;
-        }
-        h1 { color: #667eea; font-size: 2.5em; margin-bottom: 10px; }
-        .status-bar { display: flex; gap: 20px; margin-top: 15px; }
-        .status-badge {
-            padding: 8px 16px;
-            border-radius: 20px;
-            font-size: 0.9em;
-            font-weight: 600;
-        }
-        .status-online { background: #10b981; color: white; }
-        .status-offline { background: #ef4444; color: white; }
-        .game-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(280px, 1fr));
-            gap: 25px;
-            margin-top: 20px;
-        }
-        .game-card {
-            background: white;
-            border-radius: 15px;
-            overflow: hidden;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-            transition: transform 0.3s, box-shadow 0.3s;
-            cursor: pointer;
-        }
-        .game-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-        }
-        .game-icon {
-            width: 100%;
-            height: 180px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-size: 3em;
-        }
-        .game-icon img { width: 100%; height: 100%; object-fit: cover; }
-        .game-info { padding: 20px; }
-        .game-title {
-            font-size: 1.1em;
-            font-weight: 600;
-            color: #1f2937;
-            margin-bottom: 8px;
-        }
-        .game-disc-id { color: #6b7280; font-size: 0.85em; margin-bottom: 12px; }
-        .launch-button {
-            width: 100%;
-            padding: 12px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            border-radius: 8px;
-            font-size: 1em;
-            font-weight: 600;
-            cursor: pointer;
-        }
-        .loading { text-align: center; padding: 40px; color: white; font-size: 1.2em; }
-        .no-games {
-            text-align: center;
-            padding: 60px 20px;
-            background: white;
-            border-radius: 15px;
-            color: #6b7280;
-        }
-        .modal {
-            display: none;
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: rgba(0,0,0,0.7);
-            align-items: center;
-            justify-content: center;
-            z-index: 1000;
-        }
-        .modal.active { display: flex; }
-        .modal-content {
-            background: white;
-            padding: 30px;
-            border-radius: 15px;
-            max-width: 500px;
-            width: 90%;
-        }
-        .save-option {
-            padding: 15px;
-            margin: 10px 0;
-            border: 2px solid #e5e7eb;
-            border-radius: 8px;
-            cursor: pointer;
-        }
-        .save-option:hover { border-color: #667eea; background: #f9fafb; }
-        .save-option.selected { border-color: #667eea; background: #eef2ff; }
-        .btn {
-            padding: 12px 24px;
-            border: none;
-            border-radius: 8px;
-            font-weight: 600;
-            cursor: pointer;
-            margin: 5px;
-        }
-        .btn-primary { background: #667eea; color: white; }
-        .btn-secondary { background: #e5e7eb; color: #4b5563; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <h1>SaveHub</h1>
-            <p>Emulator Save Manager - Web Dashboard</p>
-            <div class="status-bar">
-                <span id="localAgentStatus" class="status-badge status-offline">Local Agent: Checking...</span>
-                <span id="gamesCount" class="status-badge" style="background: #3b82f6; color: white;">0 Games</span>
-            </div>
-        </header>
+/api/* is proxied to the local agent (see agent_proxy.py), so browsers on
+other devices only need to reach this server. With several agents
+configured, /api/status and /api/games combine every machine, /api/launch
+goes to the machine that has the game, and /api/agents/<machine>/... reaches
+one machine directly.
 
-        <div id="loadingMessage" class="loading">Connecting to local agent...</div>
-        <div id="gameLibrary" class="game-grid" style="display: none;"></div>
-        <div id="noGames" class="no-games" style="display: none;">
-            <h2>No Games Found</h2>
-            <p>Make sure your PyQt5 desktop app is running</p>
-        </div>
-    </div>
-
-    <div id="launchModal" class="modal">
-        <div class="modal-content">
-            <h2 id="modalGameTitle">Select Save</h2>
-            <div id="saveOptions"></div>
-            <div>
-                <button class="btn btn-secondary" onclick="closeLaunchModal()">Cancel</button>
-                <button class="btn btn-primary" onclick="confirmLaunch()">Launch</button>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        const API_BASE = 'http://127.0.0.1:8765/api';
-        let currentGame = null;
-        let selectedSave = null;
-
-        async function checkAgentStatus() {
-            try {
-                const response = await fetch(`${API_BASE}/status`);
-                const data = await response.json();
-                
-                const statusEl = document.getElementById('localAgentStatus');
-                if (data.status === 'online') {
-                    statusEl.textContent = 'Local Agent: Online';
-                    statusEl.className = 'status-badge status-online';
-                    loadGames();
-                } else {
-                    statusEl.textContent = 'Local Agent: Offline';
-                    statusEl.className = 'status-badge status-offline';
-                }
-            } catch (error) {
-                document.getElementById('localAgentStatus').className = 'status-badge status-offline';
-                document.getElementById('loadingMessage').textContent = 
-                    'Local agent offline. Please start the desktop app.';
-            }
-        }
+Anyone who can reach the dashboard can browse the library and launch
+games; every other agent endpoint is only relayed for clients that send
+the agent token (see agent_proxy.RELAYED_ENDPOINTS), since the agent
+can't tell them apart from requests made on its own machine.
+"""
 
-        async function loadGames() {
-            try {
-                const response = await fetch(`${API_BASE}/games`);
-                const data = await response.json();
-                
-                document.getElementById('loadingMessage').style.display = 'none';
-                document.getElementById('gamesCount').textContent = `${data.total} Games`;
-                
-                if (data.games.length === 0) {
-                    document.getElementById('noGames').style.display = 'block';
-                    return;
-                }
-                
-                displayGames(data.games);
-            } catch (error) {
-                console.error('Error loading games:', error);
-            }
-        }
+import hmac
 
-        function displayGames(games) {
-            const grid = document.getElementById('gameLibrary');
-            grid.style.display = 'grid';
-            grid.innerHTML = '';
-            
-            games.forEach(game => {
-                const card = document.createElement('div');
-                card.className = 'game-card';
-                card.onclick = () => openLaunchModal(game);
-                
-                card.innerHTML = `
-                    <div class="game-icon">🎮</div>
-                    <div class="game-info">
-                        <div class="game-title">${game.title}</div>
-                        <div class="game-disc-id">${game.disc_id}</div>
-                        <button class="launch-button">Launch</button>
-                    </div>
-                `;
-                
-                grid.appendChild(card);
-            });
-        }
+from flask import Flask, Response, jsonify, request
 
-        function openLaunchModal(game) {
-            currentGame = game;
-            document.getElementById('modalGameTitle').textContent = game.title;
-            document.getElementById('launchModal').classList.add('active');
-        }
+from agent_proxy import (
+    AgentFleet, AgentUnavailable, BLOCKED_PREFIXES, STREAMED_PREFIXES, TOKEN_HEADER,
+    configured_token, is_relayed
+)
+from core.library import encode_library
+from dashboard_assets import asset_response, build_assets
 
-        function closeLaunchModal() {
-            document.getElementById('launchModal').classList.remove('active');
-        }
+app = Flask(__name__)
+agents = AgentFleet()
+AGENT_TOKEN = configured_token()
 
-        async function confirmLaunch() {
-            const response = await fetch(`${API_BASE}/launch`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ disc_id: currentGame.disc_id })
-            });
-            
-            const result = await response.json();
-            alert(result.success ? 'Game launched!' : `Error: ${result.error}`);
-            closeLaunchModal();
-        }
+# Dashboard HTML/CSS/JS from dashboard/, hashed and precompressed once at startup
+ASSETS = build_assets()
 
-        setInterval(checkAgentStatus, 5000);
-        checkAgentStatus();
-    </script>
-</body>
-</html>
-"""
 
 @app.route('/')
 def index():
     """Serve the web dashboard"""
-    return render_template_string(DASHBOARD_HTML)
+    return asset_response(ASSETS['index.html'], request)
+
+@app.route('/sw.js')
+def service_worker():
+    """Serve the service worker from the root so it controls the whole dashboard"""
+    return asset_response(ASSETS['sw.js'], request)
+
+@app.route('/assets/<name>')
+def asset(name):
+    """Serve a content-hashed dashboard asset"""
+    built = ASSETS.get(name)
+    if built is None or name in ('index.html', 'sw.js'):
+        return jsonify({'error': 'Not found'}), 404
+    return asset_response(built, request)
 
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return {'status': 'online', 'service': 'SaveHub Web Dashboard'}
+    return {
+        'status': 'online',
+        'service': 'SaveHub Web Dashboard',
+        'proxy': {name: proxy.stats for name, proxy in agents.proxies.items()}
+    }
+
+@app.route('/api/status', methods=['GET'])
+def agents_status():
+    """Combined status of every configured agent"""
+    return jsonify(agents.status())
+
+@app.route('/api/games', methods=['GET'])
+def all_games():
+    """Every machine's library; slow or offline machines show their last known games"""
+    snapshot, fields = agents.games(request.args.get('since'), request.args.get('epoch'))
+    return Response(encode_library(snapshot, fields), mimetype='application/json')
+
+@app.route('/api/agents', methods=['GET'])
+def list_agents():
+    """Configured machines and their addresses"""
+    return jsonify({
+        name: {'host': proxy.host, 'port': proxy.port, 'default': name == agents.default}
+        for name, proxy in agents.proxies.items()
+    })
+
+@app.route('/api/launch', methods=['POST'])
+def launch_on_agent():
+    """Send a launch to the machine named in the request, or the one that has the game"""
+    data = request.get_json(silent=True) or {}
+    machine = agents.machine_for_launch(data.get('disc_id'), data.get('machine'))
+    if machine is None:
+        return jsonify({'error': f"Unknown machine {data.get('machine')}"}), 404
+    return _forward(machine, '/api/launch')
+
+@app.route('/api/agents/<machine>/<path:subpath>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+def proxy_machine_api(machine, subpath):
+    """Forward an API call to one machine's agent"""
+    if machine not in agents.proxies:
+        return jsonify({'error': f'Unknown machine {machine}'}), 404
+    return _forward(machine, '/api/' + subpath)
+
+@app.route('/api/<path:subpath>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+def proxy_api(subpath):
+    """Forward dashboard API calls to the default agent"""
+    return _forward(agents.default, '/api/' + subpath)
+
+def _forward(machine, path):
+    if path.startswith(BLOCKED_PREFIXES) or not (is_relayed(request.method, path) or _has_token()):
+        return jsonify({'error': 'Not available through the dashboard server'}), 403
+    
+    if path.startswith(STREAMED_PREFIXES):
+        return _stream(machine, path)
+    
+    headers = {}
+    if request.content_type:
+        headers['Content-Type'] = request.content_type
+    # Config and game map writes are conditional on the ETag the client read
+    if request.headers.get('If-Match'):
+        headers['If-Match'] = request.headers['If-Match']
+    
+    try:
+        status, response_headers, body, cache_state = agents.proxies[machine].forward(
+            request.method, path, request.query_string.decode('latin-1'),
+            body=request.get_data() if request.method != 'GET' else None,
+            headers=headers
+        )
+    except AgentUnavailable as e:
+        return jsonify({'error': f'Agent on {machine} unreachable: {e}'}), 502
+    
+    response = Response(body, status=status, headers=response_headers)
+    response.headers['X-Cache'] = cache_state
+    return response
+
+def _has_token():
+    supplied = request.headers.get(TOKEN_HEADER, '')
+    return bool(AGENT_TOKEN) and hmac.compare_digest(supplied.encode(), AGENT_TOKEN.encode())
+
+def _stream(machine, path):
+    try:
+        status, response_headers, body = agents.proxies[machine].stream(
+            request.method, path, request.query_string.decode('latin-1')
+        )
+    except AgentUnavailable as e:
+        return jsonify({'error': f'Agent on {machine} unreachable: {e}'}), 502
+    return Response(body, status=status, headers=response_headers, direct_passthrough=True)
 
 if __name__ == '__main__':
     print("\n" + "="*60)
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "SaveNexus"))
+
+# The config, caches and journals are opened under ~ at import; keep them out of the real one
+os.environ["HOME"] = tempfile.mkdtemp(prefix="savenexus-tests-")
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core.library import GameRecord, LibrarySnapshot, game_identity
+from gui import local_server
+
+REMOTE = {'REMOTE_ADDR': '192.168.1.50'}
+
+
+@pytest.fixture
+def client():
+    return local_server.app.test_client()
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(local_server.agent, 'overrides', {'agent_token': 'secret'})
+    return 'secret'
+
+
+def test_local_requests_need_no_token(client):
+    assert client.get('/api/status').status_code == 200
+
+
+def test_remote_requests_refused_without_configured_token(client):
+    response = client.get('/api/status', environ_base=REMOTE, headers={local_server.TOKEN_HEADER: ''})
+    assert response.status_code == 401
+    assert client.post('/api/launch', json={}, environ_base=REMOTE).status_code == 401
+
+
+def test_remote_requests_need_matching_token(client, token):
+    assert client.get('/api/status', environ_base=REMOTE).status_code == 401
+    wrong = {local_server.TOKEN_HEADER: 'guess'}
+    assert client.patch('/api/config', json={'ppsspp_path': '/bin/sh'}, environ_base=REMOTE, headers=wrong).status_code == 401
+    right = {local_server.TOKEN_HEADER: token}
+    assert client.get('/api/status', environ_base=REMOTE, headers=right).status_code == 200
+
+
+def test_no_public_bind_without_token(monkeypatch):
+    bound = {}
+    monkeypatch.setattr(local_server.app, 'run', lambda host, port, **kwargs: bound.update(host=host))
+    monkeypatch.setattr(local_server.agent, 'start_initial_scan', lambda: None)
+
+    local_server.run_server(8765, '0.0.0.0')
+    assert bound['host'] == '127.0.0.1'
+    monkeypatch.setattr(local_server.agent, 'overrides', {'agent_token': 'secret'})
+    local_server.run_server(8765, '0.0.0.0')
+    assert bound['host'] == '0.0.0.0'
+
+
+def test_metadata_rejects_out_of_range_int(client):
+    response = client.post('/api/metadata', json={'disc_ids': ['ULUS10565'], 'changes': {'PARENTAL_LEVEL': 2 ** 32}})
+    assert response.status_code == 400
+    response = client.post('/api/metadata', json={'disc_ids': ['ULUS10565'], 'changes': {'PARENTAL_LEVEL': True}})
+    assert response.status_code == 400
+
+
+def test_retention_deletes_rescan_the_library(monkeypatch):
+    requests = []
+    monkeypatch.setattr(local_server.agent.scans, 'request', lambda fresh=False: requests.append(fresh))
+    local_server.get_retention_collector().on_deleted()
+    assert requests == [True]
+
+
+def test_no_savedata_decryption_endpoints(client):
+    assert client.post('/api/savedata/inspect', json={}).status_code == 404
+    assert client.get('/api/savedata/ULUS10565DATA00/DATA.BIN').status_code == 404
+
+
+def test_folders_are_keyed_by_save_folder_name(client, monkeypatch):
+    game = GameRecord('ULUS10565', 'Title', 'Save', None, '/saves/SAVEDATA/ULUS10565DATA00', 'ppsspp', 'PSP')
+    monkeypatch.setattr(local_server.agent, 'snapshot', LibrarySnapshot([game], 1))
+
+    body = client.get('/api/games/batch?folders=ULUS10565DATA00,/saves/SAVEDATA/ULUS10565DATA00').get_json()
+    assert list(body['folders']) == ['ULUS10565DATA00']
+    assert body['missing'] == ['/saves/SAVEDATA/ULUS10565DATA00']
+    assert game_identity(dict(game.to_dict(), machine='pc')) == 'pc/ULUS10565DATA00'
+    assert game_identity({'save_path': 'C:\\PSP\\SAVEDATA\\ULUS10565DATA00'}) == 'ULUS10565DATA00'
+
+
+
+def test_optional_subsystems_load_on_first_use():
+    # A fresh interpreter: this one has imported them for other tests
+    code = (
+        "import sys; from gui import local_server; "
+        "local_server.app.test_client().get('/api/status'); "
+        "print(sorted(m for m in ('core.retention', 'core.scrubber', 'core.metadata_editor', 'core.profiling') "
+        "if m in sys.modules))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=os.path.join(root, 'SaveNexus'),
+        capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip().splitlines()[-1] == '[]'
@@ -0,0 +1,78 @@
+import os
+import signal
+import zlib
+
+import pytest
+
+from core.cso_reader import HEADER, CsoReader
+
+BLOCK_SIZE = 2048
+
+
+def write_cso(path, data):
+    """Minimal CSOv1 image: every block deflated"""
+    blocks = [data[i:i + BLOCK_SIZE] for i in range(0, len(data), BLOCK_SIZE)]
+    index_size = (len(blocks) + 1) * 4
+    offset = HEADER.size + index_size
+    index = []
+    payload = b""
+    for block in blocks:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+        raw = compressor.compress(block) + compressor.flush()
+        index.append(offset + len(payload))
+        payload += raw
+    index.append(offset + len(payload))
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(b"CISO", HEADER.size, len(data), BLOCK_SIZE, 1, 0, b"\0\0"))
+        f.write(b"".join(i.to_bytes(4, "little") for i in index))
+        f.write(payload)
+
+
+@pytest.fixture
+def deadline():
+    """Fail instead of hanging if a read never finishes"""
+    def expired(signum, frame):
+        raise TimeoutError("read did not finish")
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.alarm(5)
+    yield
+    signal.alarm(0)
+    signal.signal(signal.SIGALRM, previous)
+
+
+def test_reads_back_image(tmp_path):
+    data = os.urandom(BLOCK_SIZE * 3 + 100)
+    path = tmp_path / "game.cso"
+    write_cso(path, data)
+    with CsoReader(str(path)) as reader:
+        assert reader.read() == data
+        reader.seek(BLOCK_SIZE - 10)
+        assert reader.read(20) == data[BLOCK_SIZE - 10:BLOCK_SIZE + 10]
+
+
+def test_truncated_image_raises(tmp_path, deadline):
+    data = bytes(range(256)) * 40
+    path = tmp_path / "game.cso"
+    write_cso(path, data)
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - 200)
+
+    with CsoReader(str(path)) as reader:
+        with pytest.raises(ValueError, match="truncated/corrupt block"):
+            reader.read()
+
+
+def test_scan_skips_corrupt_image(tmp_path, deadline):
+    from core.iso_scanner import read_iso_disc_id
+
+    path = tmp_path / "game.cso"
+    write_cso(path, bytes(BLOCK_SIZE * 20))
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        # Every deflate stream replaced with garbage
+        payload = HEADER.size + 21 * 4
+        f.seek(payload)
+        f.write(b"\xff" * (size - payload))
+
+    assert read_iso_disc_id(str(path)) is None
@@ -0,0 +1,71 @@
+import gzip
+import re
+
+import flask_app_server
+from dashboard_assets import IMMUTABLE_CACHE, REVALIDATE_CACHE, build_assets, hashed_name
+
+
+def _source(tmp_path, js="console.log('v1');\n" * 50):
+    (tmp_path / "index.html").write_text(
+        '<link rel="stylesheet" href="dashboard.css"><script src="dashboard.js"></script>'
+    )
+    (tmp_path / "dashboard.css").write_text("body { margin: 0; }\n")
+    (tmp_path / "dashboard.js").write_text(js)
+    (tmp_path / "sw.js").write_text("const VERSION = '__SHELL_VERSION__'; const URLS = __SHELL_URLS__;\n")
+    return str(tmp_path)
+
+
+def test_assets_get_content_hashed_names(tmp_path):
+    assets = build_assets(_source(tmp_path))
+    js_name = hashed_name("dashboard.js", (tmp_path / "dashboard.js").read_bytes())
+    assert js_name in assets
+    assert assets[js_name].cache_control == IMMUTABLE_CACHE
+    assert assets["index.html"].cache_control == REVALIDATE_CACHE
+
+    index = assets["index.html"].variants["identity"].decode()
+    assert f'"/assets/{js_name}"' in index
+    assert '"dashboard.js"' not in index
+    worker = assets["sw.js"].variants["identity"].decode()
+    assert f'"/assets/{js_name}"' in worker
+    version = re.search(r'VERSION = "(\w+)"', worker).group(1)
+
+    # A changed script gets a new name, and the service worker a new version
+    changed = build_assets(_source(tmp_path, js="console.log('v2');\n" * 50))
+    assert js_name not in changed
+    assert version not in changed["sw.js"].variants["identity"].decode()
+
+def test_gzip_variant_only_for_bodies_worth_it(tmp_path):
+    assets = build_assets(_source(tmp_path))
+    js = next(asset for name, asset in assets.items() if name.endswith(".js") and name != "sw.js")
+    assert gzip.decompress(js.variants["gzip"]) == js.variants["identity"]
+    css = next(asset for name, asset in assets.items() if name.endswith(".css"))
+    assert set(css.variants) == {"identity"}
+
+def test_choose_encoding():
+    index = build_assets()["index.html"]
+    assert index.choose_encoding("gzip, deflate") == "gzip"
+    assert index.choose_encoding("gzip;q=0, deflate") == "identity"
+    assert index.choose_encoding(None) == "identity"
+
+def test_served_with_etag_and_compression():
+    client = flask_app_server.app.test_client()
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["Cache-Control"] == REVALIDATE_CACHE
+    html = gzip.decompress(response.get_data()).decode()
+
+    etag = response.headers["ETag"]
+    revalidated = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b""
+    # Any variant's tag proves the client has the current content
+    assert client.get("/", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+    script = re.search(r'"/assets/(dashboard\.\w+\.js)"', html).group(1)
+    response = client.get(f"/assets/{script}")
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE
+    assert "Content-Encoding" not in response.headers
+    assert client.get("/assets/dashboard.js").status_code == 404
+    assert client.get("/assets/index.html").status_code == 404
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+import flask_app_server
+from agent_proxy import TOKEN_HEADER, AgentFleet
+from core.config import load_config
+from gui import local_server
+
+
+@pytest.fixture
+def agent_server():
+    server = make_server('127.0.0.1', 0, local_server.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_port
+    server.shutdown()
+    thread.join()
+
+
+@pytest.fixture
+def dashboard(agent_server, monkeypatch):
+    monkeypatch.setattr(flask_app_server, 'agents', AgentFleet({'local': ('127.0.0.1', agent_server)}, token='secret'))
+    monkeypatch.setattr(flask_app_server, 'AGENT_TOKEN', 'secret')
+    return flask_app_server.app.test_client()
+
+
+def test_relays_reads_and_launch(dashboard):
+    assert dashboard.get('/api/agents/local/status').status_code == 200
+    assert dashboard.get('/api/game/NOPE00000').status_code == 404
+    assert dashboard.post('/api/launch', json={}).status_code == 400
+
+
+def test_refuses_agent_writes_without_token(dashboard):
+    before = load_config()
+    response = dashboard.patch('/api/config', json={'ppsspp_path': '/bin/sh'})
+    assert response.status_code == 403
+    assert load_config() == before
+    assert dashboard.post('/api/retention/run').status_code == 403
+    assert dashboard.get('/api/agents/local/config').status_code == 403
+    assert dashboard.get('/api/game/../config').status_code == 403
+    assert dashboard.get('/api/debug/memory', headers={TOKEN_HEADER: 'secret'}).status_code == 403
+
+
+def test_relays_anything_with_token(dashboard):
+    assert dashboard.get('/api/config', headers={TOKEN_HEADER: 'secret'}).status_code == 200
+    assert dashboard.get('/api/config', headers={TOKEN_HEADER: 'guess'}).status_code == 403
+
+
+def test_stale_etag_through_proxy(dashboard):
+    token = {TOKEN_HEADER: 'secret'}
+    read = dashboard.get('/api/config', headers=token)
+    stale = read.headers['ETag']
+
+    first = dashboard.patch('/api/config', json={'test_marker': 1}, headers=dict(token, **{'If-Match': stale}))
+    assert first.status_code == 200
+    current = first.headers['ETag']
+    assert current != stale
+
+    second = dashboard.patch('/api/config', json={'test_marker': 2}, headers=dict(token, **{'If-Match': stale}))
+    assert second.status_code == 412
+    assert second.headers['ETag'] == current
+    assert load_config()['test_marker'] == 1
+
+
+def test_relays_disc_ids_with_spaces_and_non_ascii(dashboard):
+    # Used to fail building the request line: InvalidURL (502) and UnicodeEncodeError (500)
+    assert dashboard.get('/api/game/Super Mario World').status_code == 404
+    assert dashboard.get('/api/game/スーパーマリオ').status_code == 404
+    assert dashboard.get('/api/export all', headers={TOKEN_HEADER: 'secret'}).status_code == 404
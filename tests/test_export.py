@@ -0,0 +1,41 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from core.export import MANIFEST_NAME, ExportError, export_zip, write_export
+
+
+def save_game(tmp_path, size):
+    path = tmp_path / 'ULUS10565.sav'
+    path.write_bytes(os.urandom(size))
+    return {'disc_id': 'ULUS10565', 'title': 'Tactics', 'emulator': 'mgba', 'save_path': str(path)}
+
+
+def test_export_round_trip(tmp_path):
+    game = save_game(tmp_path, 10000)
+    out = io.BytesIO()
+    stats = write_export([game], out, chunk_size=1024)
+    with zipfile.ZipFile(out) as archive:
+        assert archive.read('mgba/saves/ULUS10565.sav') == open(game['save_path'], 'rb').read()
+        assert MANIFEST_NAME in archive.namelist()
+    assert stats['files'] == 1 and stats['skipped'] == 0
+
+
+def test_missing_file_is_skipped(tmp_path):
+    game = save_game(tmp_path, 100)
+    os.remove(game['save_path'])
+    out = io.BytesIO()
+    assert write_export([game], out)['skipped'] == 1
+
+
+def test_file_shrinking_mid_entry_aborts(tmp_path):
+    game = save_game(tmp_path, 10000)
+    chunks = export_zip([game], chunk_size=1024)
+    next(chunks)
+    with open(game['save_path'], 'r+b') as f:
+        f.truncate(3000)
+    with pytest.raises(ExportError, match='shrank'):
+        for _ in chunks:
+            pass
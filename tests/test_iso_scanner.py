@@ -0,0 +1,79 @@
+from core import iso_scanner
+from core.iso_scanner import DIRECTORY_RECORD, ROOT_RECORD_OFFSET, SECTOR_SIZE, read_disc_id, scan_iso_dirs
+from core.psp_sfo_parser import build_sfo_bytes
+
+ROOT_SECTOR = 18
+
+
+def _record(name, extent, size, is_dir=False):
+    length = DIRECTORY_RECORD.size + len(name)
+    length += length % 2  # records are padded to an even length
+    record = DIRECTORY_RECORD.pack(
+        length, 0, extent, b"\0" * 4, size, b"\0" * 4, b"\0" * 7, 0x02 if is_dir else 0, 0, 0, 1, len(name)
+    )
+    return (record + name).ljust(length, b"\0")
+
+def _directory(sector, records):
+    entries = [(b"\x00", sector, SECTOR_SIZE, True), (b"\x01", sector, SECTOR_SIZE, True)] + records
+    return b"".join(_record(*entry) for entry in entries).ljust(SECTOR_SIZE, b"\0")
+
+def build_iso(umd_data=None, sfo=None):
+    """A minimal ISO9660 image: PVD, root directory, optional UMD_DATA.BIN and PSP_GAME/PARAM.SFO"""
+    sectors = {}
+    root = []
+    if umd_data is not None:
+        sectors[19] = umd_data
+        root.append((b"UMD_DATA.BIN;1", 19, len(umd_data)))
+    if sfo is not None:
+        sectors[21] = sfo
+        sectors[20] = _directory(20, [(b"PARAM.SFO;1", 21, len(sfo))])
+        root.append((b"PSP_GAME", 20, SECTOR_SIZE, True))
+    sectors[ROOT_SECTOR] = _directory(ROOT_SECTOR, root)
+
+    pvd = bytearray(SECTOR_SIZE)
+    pvd[0:6] = b"\x01CD001"
+    root_record = _record(b"\x00", ROOT_SECTOR, SECTOR_SIZE, True)
+    pvd[ROOT_RECORD_OFFSET:ROOT_RECORD_OFFSET + len(root_record)] = root_record
+    sectors[16] = bytes(pvd)
+
+    image = bytearray(SECTOR_SIZE * (max(sectors) + 1))
+    for sector, data in sectors.items():
+        image[sector * SECTOR_SIZE:sector * SECTOR_SIZE + len(data)] = data
+    return bytes(image)
+
+
+def test_disc_id_from_umd_data(tmp_path):
+    path = tmp_path / "game.iso"
+    path.write_bytes(build_iso(umd_data=b"ULUS-10565|0001|G"))
+    with open(path, "rb") as f:
+        assert read_disc_id(f) == "ULUS10565"
+
+def test_disc_id_from_param_sfo(tmp_path):
+    path = tmp_path / "game.iso"
+    path.write_bytes(build_iso(sfo=build_sfo_bytes({"DISC_ID": "npjh50505", "TITLE": "Game"})))
+    with open(path, "rb") as f:
+        assert read_disc_id(f) == "NPJH50505"
+
+def test_not_an_iso(tmp_path):
+    path = tmp_path / "game.iso"
+    path.write_bytes(b"\0" * SECTOR_SIZE * 20)
+    with open(path, "rb") as f:
+        assert read_disc_id(f) is None
+    with open(__file__, "rb") as f:
+        assert read_disc_id(f) is None
+
+def test_scan_caches_by_size_and_mtime(tmp_path, monkeypatch):
+    monkeypatch.setattr(iso_scanner, "ISO_CACHE_PATH", str(tmp_path / "cache.json"))
+    games = tmp_path / "games" / "psp"
+    games.mkdir(parents=True)
+    (games / "a.iso").write_bytes(build_iso(umd_data=b"ULUS-10565|0001|G"))
+    (games / "notes.txt").write_text("not an image")
+
+    reads = []
+    read_iso_disc_id = iso_scanner.read_iso_disc_id
+    monkeypatch.setattr(iso_scanner, "read_iso_disc_id", lambda path: reads.append(path) or read_iso_disc_id(path))
+
+    expected = {"ULUS10565": str(games / "a.iso")}
+    assert scan_iso_dirs([str(tmp_path / "games")]) == expected
+    assert scan_iso_dirs([str(tmp_path / "games")]) == expected
+    assert reads == [str(games / "a.iso")]
@@ -0,0 +1,196 @@
+import json
+import threading
+
+import pytest
+
+from core.library import (
+    EPOCH, GameRecord, LibrarySnapshot, SaveStateRecord, ScanCoordinator, SnapshotHistory, library_delta
+)
+from core.psp_sfo_parser import build_sfo_bytes
+from core.scanners import PPSSPPScanner
+from gui import local_server
+
+
+class BlockingScan:
+    """A scan that waits for release() and counts how often it ran"""
+
+    def __init__(self):
+        self.calls = 0
+        self.running = threading.Event()
+        self._release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.running.set()
+        assert self._release.wait(5)
+        return self.calls
+
+    def release(self):
+        self._release.set()
+
+
+def test_concurrent_requests_share_one_scan():
+    scan = BlockingScan()
+    coordinator = ScanCoordinator(scan)
+    futures = []
+    threads = [threading.Thread(target=lambda: futures.append(coordinator.request())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert coordinator.in_flight
+    scan.release()
+    assert {future.result(5) for future in futures} == {1}
+    assert scan.calls == 1
+    assert not coordinator.in_flight
+
+def test_fresh_requests_share_the_next_scan():
+    scan = BlockingScan()
+    coordinator = ScanCoordinator(scan)
+    first = coordinator.request()
+    assert scan.running.wait(5)
+
+    # Started before these requests: it may have missed what they want to see
+    assert coordinator.request() is first
+    fresh = coordinator.request(fresh=True)
+    assert fresh is not first
+    assert coordinator.request(fresh=True) is fresh
+    assert coordinator.request() is fresh
+
+    scan.release()
+    assert first.result(5) == 1
+    assert fresh.result(5) == 2
+    assert scan.calls == 2
+
+def test_finished_scan_is_not_reused():
+    scan = BlockingScan()
+    scan.release()
+    coordinator = ScanCoordinator(scan)
+    assert coordinator.request().result(5) == 1
+    assert coordinator.request().result(5) == 2
+
+def test_submit_runs_after_queued_scans():
+    scan = BlockingScan()
+    coordinator = ScanCoordinator(scan)
+    coordinator.request()
+    order = []
+    job = coordinator.submit(lambda: order.append(scan.calls))
+    scan.release()
+    job.result(5)
+    assert order == [1]
+
+
+def _game(folder, title='Title'):
+    return {'disc_id': folder[:9], 'title': title, 'save_path': f'/saves/{folder}'}
+
+def test_delta_lists_changed_removed_and_order():
+    a, b, c = _game('ULUS10565DATA00'), _game('ULUS10565DATA01'), _game('NPJH50505DATA00')
+    assert library_delta([a, b], [a, b]) == {'changed': [], 'removed': []}
+
+    renamed = _game('ULUS10565DATA01', 'Renamed')
+    assert library_delta([a, b], [a, renamed]) == {'changed': [renamed], 'removed': []}
+    assert library_delta([a, b], [c, a]) == {
+        'changed': [c], 'removed': ['ULUS10565DATA01'], 'order': ['NPJH50505DATA00', 'ULUS10565DATA00']
+    }
+
+def test_history_only_answers_known_versions_of_this_process():
+    a, b = _game('ULUS10565DATA00'), _game('ULUS10565DATA01')
+    history = SnapshotHistory(size=2)
+    history.add(1, (a,))
+    history.add(2, (a, b))
+
+    delta = history.delta('1', EPOCH, 2, (a, b))
+    assert delta['changed'] == [b]
+    assert (delta['delta'], delta['since'], delta['version'], delta['epoch']) == (True, 1, 2, EPOCH)
+    assert history.delta(2, EPOCH, 2, (a, b))['changed'] == []
+    assert history.delta(1, 'another-process', 2, (a, b)) is None
+    assert history.delta('nope', EPOCH, 2, (a, b)) is None
+
+    history.add(3, (b,))
+    assert history.delta(1, EPOCH, 3, (b,)) is None  # evicted
+
+def test_games_endpoint_sends_deltas(monkeypatch):
+    a, b = _game('ULUS10565DATA00'), _game('ULUS10565DATA01')
+    history = SnapshotHistory()
+    history.add(1, (a,))
+    history.add(2, (a, b))
+    monkeypatch.setattr(local_server.agent, 'snapshot', LibrarySnapshot((a, b), 2))
+    monkeypatch.setattr(local_server.agent, 'history', history)
+    monkeypatch.setattr(local_server.agent, 'refresh_in_background', lambda max_age: None)
+    client = local_server.app.test_client()
+
+    full = json.loads(client.get('/api/games').get_data())
+    assert (full['version'], full['epoch'], full['games']) == (2, EPOCH, [a, b])
+
+    delta = json.loads(client.get(f'/api/games?since=1&epoch={EPOCH}').get_data())
+    assert delta['delta'] is True
+    assert delta['changed'] == [b]
+    assert 'games' not in delta
+
+    stale = json.loads(client.get('/api/games?since=1&epoch=restarted').get_data())
+    assert 'delta' not in stale
+    assert stale['games'] == [a, b]
+
+
+def _record(folder='ULUS10565DATA00'):
+    state = SaveStateRecord('ULUS10565_1.00_0.ppst', '/states/ULUS10565_1.00_0.ppst', 1700000000.0, 1024)
+    return GameRecord(
+        'ULUS10565', 'Title', 'Save', None, '/saves/' + folder, 'ppsspp', 'PSP', save_states=[state]
+    )
+
+def test_records_read_like_dicts():
+    game = _record()
+    assert game['disc_id'] == game.get('disc_id') == 'ULUS10565'
+    assert 'save_states' in game and 'machine' not in game
+    assert game.get('machine', 'local') == 'local'
+    with pytest.raises(KeyError):
+        game['machine']
+    assert dict(game)['save_path'] == '/saves/ULUS10565DATA00'
+    assert game.to_dict()['save_states'] == [{
+        'filename': 'ULUS10565_1.00_0.ppst', 'path': '/states/ULUS10565_1.00_0.ppst',
+        'modified': 1700000000.0, 'size': 1024
+    }]
+    assert json.loads(LibrarySnapshot([game]).games_json()) == [game.to_dict()]
+
+def test_records_are_slotted_interned_and_compared_by_value():
+    game, again = _record(), _record()
+    assert not hasattr(game, '__dict__')
+    with pytest.raises(AttributeError):
+        game.machine = 'pc'
+    assert game.save_path is again.save_path
+    assert game.save_states[0].path is again.save_states[0].path
+    assert game == again
+    assert game != _record('ULUS10565DATA01')
+
+def test_snapshot_indexes_and_cached_json():
+    first, second = _record(), _record('ULUS10565DATA01')
+    snapshot = LibrarySnapshot([first, second], 3)
+    assert snapshot.by_id['ULUS10565'] is first
+    assert snapshot.by_folder['ULUS10565DATA01'] is second
+
+    encoded = snapshot.games_json()
+    assert snapshot.games_json() is encoded
+    rescanned = snapshot.rescanned()
+    assert rescanned.version == 3
+    assert rescanned.games_json() is encoded
+
+def test_unchanged_rescan_reuses_records(tmp_path):
+    save = tmp_path / 'SAVEDATA' / 'ULUS10565DATA00'
+    save.mkdir(parents=True)
+    (save / 'PARAM.SFO').write_bytes(build_sfo_bytes({'TITLE': 'T', 'SAVEDATA_TITLE': 'S', 'DISC_ID': 'ULUS10565'}))
+    states = tmp_path / 'states'
+    states.mkdir()
+    (states / 'ULUS10565_1.00_0.ppst').write_bytes(b'state')
+    scanner = PPSSPPScanner(str(tmp_path / 'SAVEDATA'), str(states))
+
+    first = scanner.scan()
+    second = scanner.scan()
+    assert scanner.last_stats == {'parsed': 0, 'skipped': 1}
+    assert second[0] is first[0]
+    assert second[0].save_states[0] is first[0].save_states[0]
+
+    (states / 'ULUS10565_1.00_1.ppst').write_bytes(b'newer')
+    third = scanner.scan()
+    assert len(third[0].save_states) == 2
+    assert any(state is first[0].save_states[0] for state in third[0].save_states)
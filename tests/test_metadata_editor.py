@@ -0,0 +1,61 @@
+import pytest
+
+from core import metadata_editor
+from core.metadata_editor import MetadataEditError, apply_batch, edit_metadata, plan_edit, read_sfo_index
+from core.psp_sfo_parser import SFO_TYPE_INT, SFO_TYPE_STRING, build_sfo_bytes, read_sfo_entries
+
+SFO = build_sfo_bytes({'TITLE': 'Tactics', 'PARENTAL_LEVEL': 1})
+
+
+@pytest.mark.parametrize('value', [2 ** 32, -1, True, 1.5])
+def test_rejects_values_that_are_not_uint32(value):
+    with pytest.raises(MetadataEditError):
+        plan_edit(SFO, {'PARENTAL_LEVEL': value})
+
+
+def test_int_edit_in_place(tmp_path):
+    path = tmp_path / 'PARAM.SFO'
+    path.write_bytes(SFO)
+    edit_metadata(str(path), {'PARENTAL_LEVEL': 2 ** 32 - 1})
+    assert read_sfo_entries(path.read_bytes())['PARENTAL_LEVEL'] == 2 ** 32 - 1
+
+
+def test_rebuild_keeps_each_fields_type(tmp_path):
+    path = tmp_path / 'PARAM.SFO'
+    odd_int = (SFO_TYPE_INT, b'\x02\x00')
+    odd_string = (SFO_TYPE_STRING, b'Tactics\x00junk')
+    path.write_bytes(build_sfo_bytes({'TITLE': odd_string, 'VERSION': odd_int, 'PARENTAL_LEVEL': 1}))
+
+    assert edit_metadata(str(path), {'SAVEDATA_TITLE': 'Chapter 2'}) == 'rebuilt'
+    data = path.read_bytes()
+    fields = read_sfo_index(data)
+    assert fields['VERSION']['type'] == SFO_TYPE_INT
+    start = fields['VERSION']['data_offset']
+    assert data[start:start + fields['VERSION']['length']] == b'\x02\x00'
+    start = fields['TITLE']['data_offset']
+    assert data[start:start + fields['TITLE']['length']] == b'Tactics\x00junk'
+    assert read_sfo_entries(data)['SAVEDATA_TITLE'] == 'Chapter 2'
+
+
+def test_batch_rolls_back_the_file_that_failed(tmp_path, monkeypatch):
+    paths = []
+    for name in ('A', 'B'):
+        path = tmp_path / name
+        path.write_bytes(SFO)
+        paths.append(str(path))
+
+    write_in_place = metadata_editor._write_in_place
+    failures = [paths[1]]
+    def torn_write(path, writes):
+        if path in failures:
+            failures.remove(path)
+            write_in_place(path, writes[:1])
+            raise OSError("disk full")
+        write_in_place(path, writes)
+    monkeypatch.setattr(metadata_editor, '_write_in_place', torn_write)
+
+    journal = str(tmp_path / 'undo.journal')
+    with pytest.raises(MetadataEditError):
+        apply_batch(paths, {'TITLE': 'Tact', 'PARENTAL_LEVEL': 9}, journal_path=journal)
+    for path in paths:
+        assert open(path, 'rb').read() == SFO
@@ -0,0 +1,47 @@
+from core.metrics import Counter, Gauge, Histogram, render_prometheus
+from gui import local_server
+
+
+def test_prometheus_text_format():
+    requests = Counter('test_requests_total', 'Requests', ('path',), register=False)
+    requests.labels('/a "quoted"\npath').inc()
+    requests.labels('/b').inc(2)
+    games = Gauge('test_games', 'Games', register=False)
+    games.set_function(lambda: 3)
+    latency = Histogram('test_seconds', 'Latency', buckets=(0.1, 1.0), register=False)
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+
+    assert render_prometheus([requests, games, latency]).splitlines() == [
+        '# HELP test_requests_total Requests',
+        '# TYPE test_requests_total counter',
+        'test_requests_total{path="/a \\"quoted\\"\\npath"} 1',
+        'test_requests_total{path="/b"} 2',
+        '# HELP test_games Games',
+        '# TYPE test_games gauge',
+        'test_games 3',
+        '# HELP test_seconds Latency',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1"} 2',
+        'test_seconds_bucket{le="+Inf"} 3',
+        'test_seconds_sum 5.55',
+        'test_seconds_count 3',
+    ]
+
+def test_label_values_of_any_type_share_a_child():
+    statuses = Counter('test_status_total', 'Statuses', ('status',), register=False)
+    statuses.labels(200).inc()
+    statuses.labels('200').inc()
+    assert render_prometheus([statuses]).splitlines()[-1] == 'test_status_total{status="200"} 2'
+
+def test_agent_metrics_endpoint():
+    client = local_server.app.test_client()
+    client.get('/api/status')
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert 'savenexus_http_requests_total{endpoint="/api/status",method="GET",status="200"}' in body
+    assert '# TYPE savenexus_http_request_duration_seconds histogram' in body
+    assert 'savenexus_library_games ' in body
@@ -0,0 +1,36 @@
+from core.parser import parse_save
+from core.psp_sfo_parser import build_sfo_bytes
+
+
+def test_parses_sfo(tmp_path):
+    path = tmp_path / 'PARAM.SFO'
+    path.write_bytes(build_sfo_bytes({'TITLE': 'Tactics', 'PARENTAL_LEVEL': 1}))
+    result = parse_save(str(path))
+    assert result['format'] == 'psp_param_sfo'
+    assert result['fields'] == {'TITLE': 'Tactics', 'PARENTAL_LEVEL': 1}
+
+
+def test_truncated_sfo_keeps_what_is_readable(tmp_path):
+    data = build_sfo_bytes({'PARENTAL_LEVEL': 1, 'TITLE': 'Tactics'})
+    path = tmp_path / 'PARAM.SFO'
+    for size in range(len(data)):
+        path.write_bytes(data[:size])
+        result = parse_save(str(path))
+        assert result is None or isinstance(result['fields'], dict)
+
+
+def test_savedata_encryption_comes_from_the_file_list(tmp_path):
+    from core.savedata_crypto import FILE_LIST_ENTRY, FILE_LIST_KEY
+
+    digest = bytes(range(1, 17))
+    table = FILE_LIST_ENTRY.pack(b'DATA.BIN', digest, b'\0' * 3)
+    (tmp_path / 'PARAM.SFO').write_bytes(build_sfo_bytes({'TITLE': 'Tactics', FILE_LIST_KEY: table}))
+    (tmp_path / 'DATA.BIN').write_bytes(bytes(range(16)) + b'\xaa' * 100)
+    (tmp_path / 'PLAIN.BIN').write_bytes(b'\xaa' * 100)
+
+    encrypted = parse_save(str(tmp_path / 'DATA.BIN'))
+    assert encrypted['encrypted'] is True
+    assert encrypted['seed'] == bytes(range(16)).hex()
+    assert encrypted['payload_size'] == 100
+    assert encrypted['hash'] == digest.hex()
+    assert parse_save(str(tmp_path / 'PLAIN.BIN'))['encrypted'] is False
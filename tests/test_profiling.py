@@ -0,0 +1,64 @@
+import re
+
+from core import profiling
+from gui import local_server
+
+
+def _leaf():
+    return sum(i * i for i in range(20000))
+
+def _outer():
+    return _leaf() + _leaf()
+
+
+def test_collapsed_stacks_follow_call_paths():
+    result, stats, elapsed = profiling.profile_call(_outer)
+    assert result == 2 * _leaf()
+    assert elapsed > 0
+    stacks = profiling.format_profile(stats, 'collapsed').splitlines()
+    assert any(
+        re.search(r'test_profiling\.py:_outer:\d+;test_profiling\.py:_leaf:\d+', line) for line in stacks
+    )
+    assert all(int(line.rsplit(' ', 1)[1]) >= profiling.COLLAPSED_MIN_US for line in stacks)
+    assert '_leaf' in profiling.format_profile(stats, 'pstats', limit=5)
+
+def test_profiles_only_the_armed_number_of_requests():
+    client = local_server.app.test_client()
+    assert client.post('/api/debug/profile', json={'requests': 2}).get_json()['remaining'] == 2
+    for _ in range(3):
+        client.get('/api/status')
+
+    body = client.get('/api/debug/profile').get_json()
+    assert body['remaining'] == 0
+    assert [entry['request'] for entry in body['profiled']] == ['GET /api/status'] * 2
+    assert 'function calls' in body['report']
+    collapsed = client.get('/api/debug/profile?format=collapsed')
+    assert collapsed.mimetype == 'text/plain'
+
+    client.delete('/api/debug/profile')
+    assert client.get('/api/debug/profile').get_json()['report'] is None
+
+def test_debug_endpoints_are_localhost_only(monkeypatch):
+    monkeypatch.setattr(local_server.agent, 'overrides', {'agent_token': 'secret'})
+    client = local_server.app.test_client()
+    remote = {'REMOTE_ADDR': '192.168.1.50'}
+    token = {local_server.TOKEN_HEADER: 'secret'}
+    assert client.post('/api/debug/profile', json={'requests': 1}, environ_base=remote, headers=token).status_code == 403
+    assert client.get('/api/debug/memory', environ_base=remote, headers=token).status_code == 403
+
+def test_memory_snapshots_diff_and_clear():
+    client = local_server.app.test_client()
+    try:
+        assert client.post('/api/debug/memory', json={'name': 'before'}).get_json()['name'] == 'before'
+        kept = [bytearray(1024) for _ in range(200)]
+        client.post('/api/debug/memory', json={'name': 'after'})
+
+        assert client.get('/api/debug/memory').get_json()['snapshots'] == ['after', 'before']
+        assert client.get('/api/debug/memory?name=after').get_json()['top']
+        diff = client.get('/api/debug/memory/diff?from=before&to=after').get_json()['diff']
+        assert diff
+        assert client.get('/api/debug/memory/diff?from=before&to=nope').status_code == 404
+        del kept
+    finally:
+        client.delete('/api/debug/memory')
+    assert client.get('/api/debug/memory').get_json()['snapshots'] == []
@@ -0,0 +1,74 @@
+import os
+import time
+
+from core.retention import GRACE_SECONDS, RetentionCollector, plan_retention, select_states
+
+DAY = 24 * 60 * 60
+SETTINGS = {"default": {"keep_last": 2}, "max_deletes_per_second": 0}
+
+
+def _state(directory, name, age, size=16):
+    path = directory / name
+    path.write_bytes(b'\0' * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+def _states(*ages):
+    now = time.time()
+    return [{'path': str(i), 'modified': now - age, 'size': 1} for i, age in enumerate(ages)]
+
+
+def test_plan_keeps_the_policy_and_deletes_the_rest(tmp_path):
+    for slot, age in enumerate((1, 2, 3, 4)):
+        _state(tmp_path, f'ULUS10565_1.00_{slot}.ppst', age * DAY)
+    _state(tmp_path, 'NPJH50505_1.00_0.ppst', 5 * DAY)
+
+    report = plan_retention(str(tmp_path), SETTINGS)
+    assert report['states'] == 5
+    assert report['delete_count'] == 2
+    game = report['games']['ULUS10565']
+    assert game['keep'] == ['ULUS10565_1.00_0.ppst', 'ULUS10565_1.00_1.ppst']
+    assert game['delete'] == ['ULUS10565_1.00_2.ppst', 'ULUS10565_1.00_3.ppst']
+    assert 'NPJH50505' not in report['games']
+
+def test_newest_state_is_always_kept():
+    states = _states(DAY, 2 * DAY)
+    keep, delete = select_states(states, {"max_total_mb": 0.000001})
+    assert keep == states[:1]
+    assert delete == states[1:]
+
+def test_states_in_the_grace_window_are_kept():
+    states = _states(60, GRACE_SECONDS / 2, DAY, 2 * DAY)
+    keep, delete = select_states(states, {"keep_last": 1})
+    assert keep == states[:2]
+    assert delete == states[2:]
+
+def test_delete_skips_states_rewritten_since_planning(tmp_path):
+    for slot, age in enumerate((1, 2, 3, 4)):
+        _state(tmp_path, f'ULUS10565_1.00_{slot}.ppst', age * DAY)
+    (tmp_path / 'ULUS10565_1.00_3.jpg').write_bytes(b'jpg')
+    collector = RetentionCollector(lambda: str(tmp_path))
+    report = plan_retention(str(tmp_path), SETTINGS)
+
+    # The user saves into slot 2 while the throttled run is still going
+    _state(tmp_path, 'ULUS10565_1.00_2.ppst', 0, size=32)
+    assert collector._delete(report, SETTINGS) == 1
+    assert report['skipped'] == 1
+    assert sorted(os.listdir(tmp_path)) == [
+        'ULUS10565_1.00_0.ppst', 'ULUS10565_1.00_1.ppst', 'ULUS10565_1.00_2.ppst'
+    ]
+
+def test_delete_skips_states_that_entered_the_grace_window(tmp_path):
+    path = _state(tmp_path, 'ULUS10565_1.00_1.ppst', DAY)
+    _state(tmp_path, 'ULUS10565_1.00_0.ppst', 0)
+    collector = RetentionCollector(lambda: str(tmp_path))
+    report = plan_retention(str(tmp_path), {"default": {"keep_last": 1}}, now=time.time() + 2 * DAY)
+
+    assert report['delete_count'] == 1
+    # Same mtime and size as planned, but now too recent to delete
+    mtime = time.time()
+    os.utime(path, (mtime, mtime))
+    report['games']['ULUS10565']['_delete_states'][0]['modified'] = os.stat(path).st_mtime
+    assert collector._delete(report, SETTINGS) == 0
+    assert path.exists()
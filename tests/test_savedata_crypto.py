@@ -0,0 +1,20 @@
+from core.psp_sfo_parser import build_sfo_bytes
+from core.savedata_crypto import FILE_LIST_ENTRY, FILE_LIST_KEY, read_file_list
+
+HASH = bytes(range(1, 17))
+
+
+def file_list(*entries):
+    return b"".join(FILE_LIST_ENTRY.pack(name.encode(), digest, b"\0" * 3) for name, digest in entries)
+
+
+def test_lists_files_with_a_hash(tmp_path):
+    table = file_list(("DATA.BIN", HASH), ("PLAIN.BIN", bytes(16)))
+    (tmp_path / "PARAM.SFO").write_bytes(build_sfo_bytes({'TITLE': 'Tactics', FILE_LIST_KEY: table}))
+    assert read_file_list(str(tmp_path)) == {'DATA.BIN': HASH.hex()}
+
+
+def test_unprotected_and_missing_saves(tmp_path):
+    (tmp_path / "PARAM.SFO").write_bytes(build_sfo_bytes({'TITLE': 'Tactics'}))
+    assert read_file_list(str(tmp_path)) == {}
+    assert read_file_list(str(tmp_path / "missing")) is None
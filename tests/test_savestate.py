@@ -0,0 +1,23 @@
+from core.parser import parse_save
+from core.savestate import CHUNK_HEADER, TITLE_SIZE
+
+
+def write_state(path, revision, title=None):
+    data = CHUNK_HEADER.pack(revision, 2, 0, 1 << 20, b'v1.17')
+    if title is not None:
+        data += title.ljust(TITLE_SIZE, b'\0')
+    # Compressed state, starting with a zstd frame magic
+    path.write_bytes(data + b'\x28\xb5\x2f\xfd' * 64)
+
+
+def test_title_from_revision_5(tmp_path):
+    path = tmp_path / 'ULUS10565_1.00_0.ppst'
+    write_state(path, 5, b'Tactics')
+    assert parse_save(str(path))['title'] == 'Tactics'
+
+
+def test_revision_4_has_no_title(tmp_path):
+    path = tmp_path / 'ULUS10565_1.00_0.ppst'
+    write_state(path, 4)
+    result = parse_save(str(path))
+    assert result['revision'] == 4 and result['title'] == ''
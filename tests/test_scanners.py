@@ -0,0 +1,26 @@
+from core.scanners import MgbaScanner, PPSSPPScanner, build_scanners
+
+
+def test_bad_scanner_options_fall_back_to_defaults(capsys):
+    scanners = build_scanners({"scanners": {
+        "ppsspp": {"savedata_dir": "/saves", "savestate_dir": 42, "typo_dir": "/x"},
+        "retroarch": True,
+        "mgba": {"save_dirs": "/not/a/list"},
+    }})
+    by_name = {scanner.name: scanner for scanner in scanners}
+    assert set(by_name) == {"ppsspp", "retroarch", "mgba"}
+
+    ppsspp = by_name["ppsspp"]
+    assert ppsspp.savedata_dir == "/saves"
+    assert ppsspp.savestate_dir == PPSSPPScanner().savestate_dir
+    assert by_name["mgba"].save_dirs == MgbaScanner().save_dirs
+
+    output = capsys.readouterr().out
+    assert "scanners.ppsspp.typo_dir" in output
+    assert "scanners.ppsspp.savestate_dir" in output
+    assert "scanners.mgba.save_dirs" in output
+
+def test_disabled_and_listed_scanners():
+    scanners = build_scanners({"scanners": {"retroarch": False, "mgba": {"save_dirs": ["/a", "/b"]}}})
+    assert [scanner.name for scanner in scanners] == ["ppsspp", "mgba"]
+    assert scanners[1].save_dirs == ["/a", "/b"]
@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+
+from core import scrubber as scrubber_module
+from core.scrubber import STATUS_CORRUPT, IntegrityScrubber
+
+
+def test_trigger_during_a_pass_does_not_queue_another(tmp_path):
+    scrubber = IntegrityScrubber(lambda: [], path=str(tmp_path / 'integrity.json'))
+    scrubber.running = True
+    scrubber.trigger()
+    assert not scrubber._wake.is_set()
+
+    scrubber.running = False
+    scrubber.trigger()
+    assert scrubber._wake.is_set()
+
+
+def test_scheduled_passes_are_off_unless_enabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(scrubber_module, 'integrity_settings', lambda: {})
+    scrubber = IntegrityScrubber(lambda: [], path=str(tmp_path / 'integrity.json'))
+    passes = []
+    ran = threading.Event()
+    monkeypatch.setattr(scrubber, 'scrub', lambda settings: passes.append(settings) or ran.set())
+
+    scrubber.start()
+    time.sleep(0.2)
+    assert passes == []
+    scrubber.trigger()
+    assert ran.wait(5)
+    scrubber.stop()
+    assert len(passes) == 1
+
+
+def test_flipped_byte_is_reported(tmp_path):
+    saves = tmp_path / 'saves'
+    saves.mkdir()
+    save = saves / 'DATA.BIN'
+    save.write_bytes(b'\x00' * 4096)
+    old = time.time() - 3600
+    os.utime(save, (old, old))
+    scrubber = IntegrityScrubber(lambda: [str(saves)], path=str(tmp_path / 'integrity.json'))
+    assert scrubber.scrub({"max_mb_per_second": 0})
+    assert scrubber.issues() == []
+
+    # Bit rot: the content changes, the mtime and size don't
+    stat = os.stat(save)
+    with open(save, 'r+b') as f:
+        f.seek(1000)
+        f.write(b'\x01')
+    os.utime(save, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert scrubber.scrub({"max_mb_per_second": 0})
+
+    issues = scrubber.issues()
+    assert [issue['path'] for issue in issues] == [str(save)]
+    assert issues[0]['status'] == STATUS_CORRUPT
+    assert issues[0]['actual_sha256'] != issues[0]['sha256']
+    assert scrubber.report()['issues'] == issues
+
+    assert scrubber.accept([str(save)]) == [str(save)]
+    assert scrubber.issues() == []
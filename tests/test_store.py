@@ -0,0 +1,84 @@
+import json
+import os
+
+from core.store import JsonStore
+
+
+def _journal(path):
+    with open(str(path) + ".journal") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_journal_is_replayed_on_load(tmp_path):
+    path = str(tmp_path / 'map.json')
+    store = JsonStore(path)
+    store.patch({'a': 1})
+    store.patch({'b': {'c': 2}})
+    etag = store.patch({'a': None})
+    assert not os.path.exists(path)  # not compacted yet
+
+    # A crash here: the next process rebuilds everything from the journal
+    reopened = JsonStore(path)
+    assert reopened.read() == ({'b': {'c': 2}}, etag)
+
+def test_torn_journal_line_is_ignored_and_cut_off(tmp_path):
+    path = str(tmp_path / 'map.json')
+    JsonStore(path).patch({'a': 1})
+    with open(path + ".journal", "a") as f:
+        f.write('{"v": 2, "patch": {"b"')
+
+    store = JsonStore(path)
+    assert store.read() == ({'a': 1}, '"1"')
+    store.patch({'c': 3})
+    assert _journal(path)[-1] == {'v': 2, 'patch': {'c': 3}}
+    assert JsonStore(path).copy() == {'a': 1, 'c': 3}
+
+def test_compaction_folds_the_journal_into_the_file(tmp_path):
+    path = str(tmp_path / 'map.json')
+    store = JsonStore(path, compact_every=3)
+    store.patch({'a': 1})
+    store.patch({'b': 2})
+    assert not os.path.exists(path)
+
+    store.patch({'a': None})
+    with open(path) as f:
+        assert json.load(f) == {'b': 2}
+    assert _journal(path) == [{'base': 3}]
+    assert JsonStore(path).read() == ({'b': 2}, '"3"')
+
+def test_reads_never_compact(tmp_path):
+    path = str(tmp_path / 'map.json')
+    JsonStore(path).patch({'a': 1})
+    before = os.stat(path + ".journal").st_mtime_ns
+
+    store = JsonStore(path)
+    assert store.copy() == {'a': 1}
+    assert store.get('a') == 1
+    assert not os.path.exists(path)
+    assert os.stat(path + ".journal").st_mtime_ns == before
+
+def test_sees_other_writers(tmp_path):
+    path = str(tmp_path / 'map.json')
+    first = JsonStore(path, compact_every=2)
+    second = JsonStore(path, compact_every=2)
+    first.patch({'a': 1})
+    assert second.copy() == {'a': 1}
+
+    second.patch({'b': 2})  # compacts
+    position = first.position
+    assert first.read() == ({'a': 1, 'b': 2}, '"2"')
+    first.patch({'c': 3})
+    assert first.position != position
+    assert second.copy() == {'a': 1, 'b': 2, 'c': 3}
+
+def test_hand_edit_is_kept_with_pending_journal(tmp_path):
+    path = str(tmp_path / 'map.json')
+    store = JsonStore(path)
+    store.replace({'a': 1})
+    store.patch({'b': 2})
+    with open(path, "w") as f:
+        json.dump({'a': 'edited', 'padding': 'so the size changes'}, f)
+
+    data, etag = store.read()
+    assert data == {'a': 'edited', 'padding': 'so the size changes', 'b': 2}
+    assert etag == '"3"'